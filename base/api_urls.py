@@ -2,10 +2,12 @@ from django.urls import path
 from .api_views import (
     UserViewSet,
     LoginViewSet,
+    TokenViewSet,
     PostViewSet,
     CommentViewSet,
     CategoryViewSet,
-    TagViewSet
+    TagViewSet,
+    ExportViewSet,
 )
 
 # ======USER AUTH ======
@@ -17,6 +19,14 @@ login_view = LoginViewSet.as_view({
     "post": "create",
 })
 
+logout_view = TokenViewSet.as_view({
+    "post": "logout",
+})
+
+token_rotate_view = TokenViewSet.as_view({
+    "post": "rotate",
+})
+
 # ====== POSTS ======
 post_list = PostViewSet.as_view({
     "get": "list",
@@ -25,9 +35,17 @@ post_list = PostViewSet.as_view({
 post_detail = PostViewSet.as_view({
     "get": "retrieve",
     "put": "update",
-    "patch": "update",
+    "patch": "partial_update",
     "delete": "destroy",
 })
+post_comments = PostViewSet.as_view({
+    "get": "comments",
+})
+post_bulk = PostViewSet.as_view({
+    "post": "bulk_create",
+    "patch": "bulk_update",
+    "delete": "bulk_destroy",
+})
 
 # ====== COMMENTS ======
 comment_list = CommentViewSet.as_view({
@@ -37,9 +55,14 @@ comment_list = CommentViewSet.as_view({
 comment_detail = CommentViewSet.as_view({
     "get": "retrieve",
     "put": "update",
-    "patch": "update",
+    "patch": "partial_update",
     "delete": "destroy",
 })
+comment_bulk = CommentViewSet.as_view({
+    "post": "bulk_create",
+    "patch": "bulk_update",
+    "delete": "bulk_destroy",
+})
 
 # ====== CATEGORIES ======
 category_list = CategoryViewSet.as_view({
@@ -49,9 +72,14 @@ category_list = CategoryViewSet.as_view({
 category_detail = CategoryViewSet.as_view({
     "get": "retrieve",
     "put": "update",
-    "patch": "update",
+    "patch": "partial_update",
     "delete": "destroy",
 })
+category_bulk = CategoryViewSet.as_view({
+    "post": "bulk_create",
+    "patch": "bulk_update",
+    "delete": "bulk_destroy",
+})
 
 # ====== TAGS ======
 tag_list = TagViewSet.as_view({
@@ -61,9 +89,19 @@ tag_list = TagViewSet.as_view({
 tag_detail = TagViewSet.as_view({
     "get": "retrieve",
     "put": "update",
-    "patch": "update",
+    "patch": "partial_update",
     "delete": "destroy",
 })
+tag_bulk = TagViewSet.as_view({
+    "post": "bulk_create",
+    "patch": "bulk_update",
+    "delete": "bulk_destroy",
+})
+
+# ====== EXPORT ======
+export_view = ExportViewSet.as_view({
+    "get": "list",
+})
 
 
 urlpatterns = [
@@ -71,20 +109,30 @@ urlpatterns = [
     # ====== AUTH ======
     path("register/", register_view, name="api-register"),
     path("login/", login_view, name="api-login"),
+    path("logout/", logout_view, name="api-logout"),
+    path("token/rotate/", token_rotate_view, name="api-token-rotate"),
 
     # ====== POSTS ======
     path("posts/", post_list, name="api-posts-list"),
+    path("posts/bulk/", post_bulk, name="api-posts-bulk"),
     path("posts/<int:pk>/", post_detail, name="api-posts-detail"),
+    path("posts/<int:pk>/comments/", post_comments, name="api-posts-comments"),
 
     # ====== COMMENTS ======
     path("comments/", comment_list, name="api-comments-list"),
+    path("comments/bulk/", comment_bulk, name="api-comments-bulk"),
     path("comments/<int:pk>/", comment_detail, name="api-comments-detail"),
 
     # ====== CATEGORIES ======
     path("categories/", category_list, name="api-categories-list"),
+    path("categories/bulk/", category_bulk, name="api-categories-bulk"),
     path("categories/<int:pk>/", category_detail, name="api-categories-detail"),
 
     # ====== TAGS ======
     path("tags/", tag_list, name="api-tags-list"),
+    path("tags/bulk/", tag_bulk, name="api-tags-bulk"),
     path("tags/<int:pk>/", tag_detail, name="api-tags-detail"),
+
+    # ====== EXPORT ======
+    path("export/<str:kind>.<str:fmt>", export_view, name="api-export"),
 ]
\ No newline at end of file
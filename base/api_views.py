@@ -2,20 +2,40 @@ from rest_framework.viewsets import ModelViewSet, GenericViewSet
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework import filters
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import Throttled
 
-from django.contrib.auth import authenticate
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.db.models import Count, Max, Sum
+from django.utils.text import slugify
 
+from .authentication import issue_token, rotate_token
 from .models import User, Post, Comment, Category, Tag
+from .passwords import Overloaded, admit, authenticate_user, hash_password
+from .pagination import PostCursorPagination
 from .serializers import (
     UserSerializer,
     PostSerializer,
+    PostListSerializer,
     CommentSerializer,
     CategorySerializer,
-    TagSerializer
+    TagSerializer,
+    serialize_comment_tree,
+    requested_fields,
 )
+from .queries import post_thread, api_posts, api_comments, post_relations
+from .search import search_page
+from .counters import comment_added, delete_comment, refresh_counters
+from .conditional import make_etag, not_modified, set_validators
+from .caching import version_key, get_versions, bump, recently_bumped
+from .routers import use_primary
+from .bulk import BulkMixin
+from . import fastjson
+from .export import ExportError, export_lines
+from .signals import bump_posts, reindex_posts, touch_posts
 
 
 # ======================================================
@@ -38,11 +58,16 @@ class UserViewSet(ModelViewSet):
         """
         serializer = self.get_serializer(data=request.data)
 
-        if serializer.is_valid():
-            user = serializer.save()
-            user.set_password(request.data["password"])  # Hash the password for secure storage
-            user.save()
+        try:
+            admit(request)
+            valid = serializer.is_valid()
+            if valid:
+                # Hashed on the pool, stored with the single INSERT
+                serializer.save(password=hash_password(serializer.validated_data["password"]))
+        except Overloaded as error:
+            raise Throttled(wait=error.retry_after)
 
+        if valid:
             return Response(
                 {"message": "User registered successfully"},
                 status=status.HTTP_201_CREATED
@@ -72,11 +97,15 @@ class LoginViewSet(GenericViewSet):
         username = request.data.get("username")
         password = request.data.get("password")
 
-        user = authenticate(username=username, password=password)
+        try:
+            admit(request, username)
+            user = authenticate_user(request, username, password)
+        except Overloaded as error:
+            raise Throttled(wait=error.retry_after)
 
         if user:
-            # Generate or retrieve authentication token
-            token, _ = Token.objects.get_or_create(user=user)
+            # Reuse the current token, or issue a new one once it expired
+            token = issue_token(user)
             return Response(
                 {
                     "message": "Login successful",
@@ -91,10 +120,35 @@ class LoginViewSet(GenericViewSet):
         )
 
 
+# ======================================================
+# Token API - logout and rotation
+# ======================================================
+class TokenViewSet(GenericViewSet):
+    """
+    API endpoint for managing the caller's token.
+    """
+    queryset = Token.objects.all()
+    permission_classes = [IsAuthenticated]
+
+    def logout(self, request):
+        """
+        Revoke the token used for this request.
+        """
+        Token.objects.filter(key=request.auth.key).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def rotate(self, request):
+        """
+        Replace the token used for this request with a new one.
+        """
+        token = rotate_token(request.user)
+        return Response({"token": token.key}, status=status.HTTP_200_OK)
+
+
 # ======================================================
 # Post API - CRUD for Blog Posts
 # ======================================================
-class PostViewSet(ModelViewSet):
+class PostViewSet(BulkMixin, ModelViewSet):
     """
     API endpoint for managing blog posts.
     - Authors can create, update, and delete posts.
@@ -103,26 +157,92 @@ class PostViewSet(ModelViewSet):
     queryset = Post.objects.all().order_by("-publication_date")
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = PostCursorPagination
+    bulk_update_fields = ("title", "content", "status", "categories", "tags")
 
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
-    search_fields = ["title", "content", "author__username", "categories__name"]
+    filter_backends = [DjangoFilterBackend]
     filterset_fields = ["tags", "publication_date"]
-    
+
+    def get_serializer_class(self):
+        # Lists carry an excerpt instead of the full content
+        return PostListSerializer if self.action == "list" else PostSerializer
+
     # list
     def list(self, request):
         """
         List posts for the user.
         - Readers see only published posts.
         - Authors see only their own posts.
+        Results are cursor paginated, newest first, and the page
+        carries an ETag so unchanged pages answer 304.
+        With ?search= the best full-text matches are returned instead,
+        ranked by relevance with a highlighted snippet, paged by offset.
+        ?fields=id,title,... limits each post to the given fields.
         """
         posts = Post.objects.filter(status="published")
 
         # authors can see their own drafts
         if request.user.is_authenticated and request.user.role == "author":
             posts = Post.objects.filter(author=request.user)
+        fields = requested_fields(request)
+
+        search = request.query_params.get("search")
+        if search:
+            pagination = self.paginator
+            pagination.request = request
+            page = search_page(
+                api_posts(posts, fields), search, pagination.get_page_size(request),
+                request.query_params.get(pagination.cursor_query_param),
+            )
+            data = self.get_serializer(page.object_list, many=True).data
+            for item, post in zip(data, page):
+                item["snippet"] = post.search_snippet
+            return Response({
+                "next": pagination.get_link(page.next_cursor),
+                "previous": pagination.get_link(page.previous_cursor),
+                "results": data,
+            })
+
+        if fastjson.enabled(request):
+            return self.fast_list(request, posts, fields)
+
+        page = self.paginate_queryset(api_posts(posts, fields))
+
+        # Validators come from the page rows, checked before serializing
+        etag = make_etag(
+            "posts", [(post.pk, post.updated_at) for post in page],
+            self.paginator.page.next_cursor, self.paginator.page.previous_cursor,
+        )
+        last_modified = max((post.updated_at for post in page), default=None)
+        cached = not_modified(request, etag, last_modified)
+        if cached is not None:
+            return cached
 
-        serializer = self.get_serializer(posts, many=True)
-        return Response(serializer.data)
+        serializer = self.get_serializer(page, many=True)
+        return set_validators(self.get_paginated_response(serializer.data), etag, last_modified)
+
+    def fast_list(self, request, posts, fields):
+        """
+        list() from .values() rows, encoded without the serializer.
+        """
+        rows = self.paginate_queryset(fastjson.post_rows(posts, fields))
+        page = self.paginator.page
+
+        etag = make_etag(
+            "posts", [(row["id"], row["updated_at"]) for row in rows],
+            page.next_cursor, page.previous_cursor,
+        )
+        last_modified = max((row["updated_at"] for row in rows), default=None)
+        cached = not_modified(request, etag, last_modified)
+        if cached is not None:
+            return cached
+
+        response = fastjson.json_response({
+            "next": self.paginator.get_link(page.next_cursor),
+            "previous": self.paginator.get_link(page.previous_cursor),
+            "results": fastjson.post_items(rows, fields),
+        }, ", ".join(self.allowed_methods))
+        return set_validators(response, etag, last_modified)
     
     # Create
     def create(self, request, *args, **kwargs):
@@ -143,15 +263,25 @@ class PostViewSet(ModelViewSet):
     def retrieve(self, request, pk=None):
         """
         Retrieve a single post by its ID.
+        Answers 304 when the client's ETag or date is still current.
         """
-        post = Post.objects.get(pk=pk)
+        updated_at = Post.objects.filter(pk=pk).values_list("updated_at", flat=True).first()
+        if updated_at is None:
+            raise Http404
+
+        etag = make_etag("post", pk, updated_at)
+        cached = not_modified(request, etag, updated_at)
+        if cached is not None:
+            return cached
+
+        post = get_object_or_404(post_relations(Post.objects.all(), requested_fields(request)), pk=pk)
         serializer = self.get_serializer(post)
-        return Response(serializer.data)
+        return set_validators(Response(serializer.data), etag, updated_at)
 
     #Update
-    def update(self, request, pk=None):
+    def update(self, request, pk=None, partial=False):
         """
-        Update a post.
+        Update a post (PUT), or only the given fields (PATCH).
         Only the original author is allowed to edit.
         """
         post = Post.objects.get(pk=pk)
@@ -159,7 +289,7 @@ class PostViewSet(ModelViewSet):
         if request.user != post.author:
             return Response({"error": "You can edit only your own posts"}, status=403)
 
-        serializer = self.get_serializer(post, data=request.data)
+        serializer = self.get_serializer(post, data=request.data, partial=partial)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data)
@@ -180,12 +310,39 @@ class PostViewSet(ModelViewSet):
         post.delete()
         return Response({"message": "Post deleted successfully"})
 
+    # Comment thread
+    def comments(self, request, pk=None):
+        """
+        Return the full comment tree of a post.
+        Top-level comments come newest first, each with nested replies.
+        """
+        post = get_object_or_404(Post, pk=pk)
+        return Response(serialize_comment_tree(post_thread(post)))
+
+    # Bulk hooks
+    def get_bulk_queryset(self):
+        # Authors can change only their own posts
+        return Post.objects.filter(author=self.request.user)
+
+    def get_bulk_create_kwargs(self):
+        return {"author": self.request.user}
+
+    def check_bulk_create(self, request):
+        if request.user.role != "author":
+            return Response({"error": "Only authors can create posts"}, status=403)
+        return None
+
+    def after_bulk_write(self, posts):
+        post_ids = [post.pk for post in posts]
+        reindex_posts(post_ids)
+        bump_posts(post_ids)
+
 
 # ======================================================
 # Comment API - Threaded Comments
 # Readers can comment
 # ======================================================
-class CommentViewSet(GenericViewSet):
+class CommentViewSet(BulkMixin, GenericViewSet):
     """
     API endpoint for managing comments.
     Users can create, edit, delete, and view their own comments.
@@ -193,15 +350,33 @@ class CommentViewSet(GenericViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated]
+    bulk_update_fields = ("content",)
 
     # LIST comments for logged-in user
     def list(self, request):
         """
         List comments authored by the logged-in user.
+        Answers 304 when none of them changed.
         """
         comments = Comment.objects.filter(author=request.user)
-        serializer = self.get_serializer(comments, many=True)
-        return Response(serializer.data)
+
+        # Count and id sum catch deletions, the latest update catches edits,
+        # the author's version a rename before their comments are touched
+        summary = comments.aggregate(count=Count("pk"), ids=Sum("pk"), latest=Max("updated_at"))
+        author = get_versions(version_key("user", request.user.pk))
+        etag = make_etag("comments", request.user.pk, *summary.values(), *author.values())
+        cached = not_modified(request, etag, summary["latest"])
+        if cached is not None:
+            return cached
+
+        if fastjson.enabled(request):
+            fields = requested_fields(request)
+            rows = fastjson.comment_rows(api_comments(comments), fields)
+            response = fastjson.json_response(fastjson.comment_items(rows, fields), ", ".join(self.allowed_methods))
+            return set_validators(response, etag, summary["latest"])
+
+        serializer = self.get_serializer(api_comments(comments), many=True)
+        return set_validators(Response(serializer.data), etag, summary["latest"])
 
     # CREATE comment
     def create(self, request):
@@ -211,7 +386,9 @@ class CommentViewSet(GenericViewSet):
         serializer = self.get_serializer(data=request.data)
 
         if serializer.is_valid():
-            serializer.save(author=request.user)
+            with transaction.atomic():
+                comment = serializer.save(author=request.user)
+                comment_added(comment)
             return Response(serializer.data, status=201)
 
         return Response(serializer.errors, status=400)
@@ -220,15 +397,27 @@ class CommentViewSet(GenericViewSet):
     def retrieve(self, request, pk=None):
         """
         Retrieve a specific comment by ID.
+        Answers 304 when the client's ETag or date is still current.
         """
-        comment = Comment.objects.get(pk=pk)
+        row = Comment.objects.filter(pk=pk).values_list("updated_at", "author_id").first()
+        if row is None:
+            raise Http404
+
+        updated_at, author_id = row
+        author = get_versions(version_key("user", author_id))
+        etag = make_etag("comment", pk, updated_at, *author.values())
+        cached = not_modified(request, etag, updated_at)
+        if cached is not None:
+            return cached
+
+        comment = get_object_or_404(api_comments(Comment.objects.all()), pk=pk)
         serializer = self.get_serializer(comment)
-        return Response(serializer.data)
+        return set_validators(Response(serializer.data), etag, updated_at)
 
     # UPDATE
-    def update(self, request, pk=None):
+    def update(self, request, pk=None, partial=False):
         """
-        Edit an existing comment.
+        Edit an existing comment; PATCH may leave fields out.
         Only the original author is allowed to update it.
         """
         comment = Comment.objects.get(pk=pk)
@@ -236,13 +425,16 @@ class CommentViewSet(GenericViewSet):
         if comment.author != request.user:
             return Response({"error": "You can update only your own comments"}, status=403)
 
-        serializer = self.get_serializer(comment, data=request.data)
+        serializer = self.get_serializer(comment, data=request.data, partial=partial)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data)
 
         return Response(serializer.errors, status=400)
 
+    def partial_update(self, request, pk=None):
+        return self.update(request, pk, partial=True)
+
     # DELETE
     def destroy(self, request, pk=None):
         """
@@ -254,14 +446,82 @@ class CommentViewSet(GenericViewSet):
         if comment.author != request.user:
             return Response({"error": "You can delete only your own comments"}, status=403)
 
-        comment.delete()
+        delete_comment(comment)
         return Response({"message": "Comment deleted"})
 
+    # Bulk hooks
+    def get_bulk_queryset(self):
+        return Comment.objects.filter(author=self.request.user)
+
+    def get_bulk_create_kwargs(self):
+        return {"author": self.request.user}
+
+    def after_bulk_write(self, comments):
+        post_ids = {comment.post_id for comment in comments}
+        refresh_counters(post_ids)
+        bump(version_key("feed"), *(
+            key for pk in post_ids for key in (version_key("thread", pk), version_key("post", pk))
+        ))
+
+    def after_bulk_delete(self, comments):
+        # Deleting cascades to replies; the delete signals bump the caches
+        refresh_counters({comment.post_id for comment in comments})
+
+
+# ======================================================
+# Streaming export
+# ======================================================
+class ExportViewSet(GenericViewSet):
+    """
+    API endpoint streaming posts or comments as NDJSON or CSV.
+    Rows are read in chunks and written as they are produced,
+    so exports of any size run in constant memory.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request, kind, fmt):
+        """
+        Export `kind` ("posts" or "comments") in `fmt` ("ndjson" or "csv").
+        Query params: author, status, tag, since, until.
+        """
+        params = request.query_params
+        try:
+            lines, content_type = export_lines(
+                kind, fmt, user=request.user,
+                **{name: params.get(name) for name in ("author", "status", "tag", "since", "until")},
+            )
+        except ExportError as exc:
+            return Response({"error": str(exc)}, status=400)
+
+        response = StreamingHttpResponse(lines, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{kind}.{fmt}"'
+        return response
+
+
+# ======================================================
+# Conditional list for small lookup tables
+# ======================================================
+def versioned_list(viewset, request, kind, *args, **kwargs):
+    """
+    Run ModelViewSet.list behind an ETag taken from a cache version,
+    so an unchanged table is answered without touching the database.
+    """
+    key = version_key(kind)
+    versions = get_versions(key)
+    etag = make_etag(kind, versions[key])
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    # A replica may not have the rows behind a fresh version yet
+    with use_primary(recently_bumped(versions)):
+        response = ModelViewSet.list(viewset, request, *args, **kwargs)
+    return set_validators(response, etag)
+
 
 # ======================================================
 # Category API
 # ======================================================
-class CategoryViewSet(ModelViewSet):
+class CategoryViewSet(BulkMixin, ModelViewSet):
     """
     API endpoint for listing and managing categories.
     Open access because categories do not contain sensitive data.
@@ -269,16 +529,56 @@ class CategoryViewSet(ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
+    bulk_update_fields = ("name",)
+
+    def list(self, request, *args, **kwargs):
+        """
+        List all categories.
+        The ETag follows the category version bumped on every change.
+        """
+        return versioned_list(self, request, "categories", *args, **kwargs)
+
+    # Bulk hooks
+    def before_bulk_create(self, categories):
+        for category in categories:
+            category.slug = category.slug or slugify(category.name)
+
+    def after_bulk_write(self, categories):
+        # Category names are indexed with their posts
+        post_ids = list(Post.objects.filter(categories__in=categories).values_list("pk", flat=True).distinct())
+        reindex_posts(post_ids)
+        touch_posts(post_ids)
+        bump(version_key("categories"))
+        bump_posts(post_ids)
 
 
 # ======================================================
 # Tag API
 # ======================================================
-class TagViewSet(ModelViewSet):
+class TagViewSet(BulkMixin, ModelViewSet):
     """
     API endpoint for listing and managing tags.
     Open access for viewing and creating tags.
     """
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
-    permission_classes = [AllowAny]
\ No newline at end of file
+    permission_classes = [AllowAny]
+    bulk_update_fields = ("name",)
+
+    def list(self, request, *args, **kwargs):
+        """
+        List all tags.
+        The ETag follows the tag version bumped on every change.
+        """
+        return versioned_list(self, request, "tags", *args, **kwargs)
+
+    # Bulk hooks
+    def before_bulk_create(self, tags):
+        for tag in tags:
+            tag.slug = slugify(tag.name)
+
+    def after_bulk_write(self, tags):
+        post_ids = list(Post.objects.filter(tags__in=tags).values_list("pk", flat=True).distinct())
+        touch_posts(post_ids)
+        bump(version_key("tags"))
+        bump_posts(post_ids)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BaseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'base'
+
+    def ready(self):
+        # Register signal handlers, job tasks and system checks
+        from . import checks, metrics, signals, tasks  # noqa: F401
@@ -0,0 +1,20 @@
+from django.urls import path
+
+from . import async_views
+
+
+# Async (ASGI) read path and login, mounted under /async/
+urlpatterns = [
+
+    # ====== PAGES ======
+    path("", async_views.home, name="async-home"),
+    path("post/<int:pk>/", async_views.post_detail, name="async-post-detail"),
+
+    # ====== API ======
+    path("api/login/", async_views.login, name="async-api-login"),
+    path("api/posts/", async_views.post_list, name="async-api-posts-list"),
+    path("api/posts/<int:pk>/", async_views.post_retrieve, name="async-api-posts-detail"),
+    path("api/posts/<int:pk>/comments/", async_views.post_comments_tree, name="async-api-posts-comments"),
+    path("api/comments/", async_views.comment_list, name="async-api-comments-list"),
+    path("api/comments/<int:pk>/", async_views.comment_retrieve, name="async-api-comments-detail"),
+]
@@ -0,0 +1,356 @@
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Count, Max, Sum
+from django.http import Http404, HttpResponse
+from django.shortcuts import aget_object_or_404, render
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+
+from . import fastjson, views
+from .authentication import aauthenticate_token, issue_token
+from .models import Post, Comment
+from .passwords import Overloaded, aadmit, aauthenticate_user
+from .pagination import KeysetPaginator, InvalidCursor, PostCursorPagination
+from .search import asearch_page
+from .caching import (
+    version_key, aget_versions, fragment_key,
+    aattach_card_versions, cache_page_on_version, recently_bumped,
+)
+from .routers import use_primary
+from .conditional import make_etag, not_modified, set_validators
+from .queries import feed_posts, post_comments, aload_threads, apost_thread, api_posts, api_comments, post_relations
+from .serializers import (
+    PostSerializer, PostListSerializer, CommentSerializer, serialize_comment_tree, requested_fields,
+)
+
+
+# ======================================================
+# Async read path
+# ASGI-native versions of the busiest read-only pages and
+# API endpoints. They query through the async ORM, so a
+# request waiting on the database holds no thread.
+# Writes stay on the sync views.
+# ======================================================
+def async_login_required(view):
+    """
+    Async counterpart of login_required for the page views.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path(), "login")
+
+        # Templates read request.user; hand them the user already loaded,
+        # the lazy one would query synchronously
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+# ======================================================
+# HOME VIEW (async)
+# ======================================================
+@async_login_required
+@cache_page_on_version(version_key("feed"))
+async def home(request):
+    """
+    Async version of views.home: same template, same caching.
+    """
+    posts = feed_posts()
+
+    search = request.GET.get("search")
+    if search:
+        page_obj = await asearch_page(posts, search, 5, request.GET.get("cursor"))
+    else:
+        paginator = KeysetPaginator(posts, 5)
+        try:
+            page_obj = await paginator.aget_page(request.GET.get("cursor"))
+        except InvalidCursor:
+            page_obj = await paginator.aget_page()
+        await aattach_card_versions(page_obj.object_list)
+
+    # Everything the template reads is loaded, so rendering runs no queries
+    return render(request, "home.html", {
+        "page_obj": page_obj,
+        "search": search,
+        "cache_timeout": settings.CACHE_TIMEOUT,
+    })
+
+
+# ======================================================
+# POST DETAIL VIEW (async)
+# ======================================================
+@async_login_required
+async def post_detail(request, pk):
+    """
+    Async version of views.post_detail.
+    Shares the cached comment section with the sync view;
+    posting a comment is handed to the sync view.
+    """
+    if request.method != "GET":
+        return await sync_to_async(views.post_detail)(request, pk)
+
+    post = await aget_object_or_404(Post, id=pk)
+
+    page_number = request.GET.get("cpage")
+    thread_version_key = version_key("thread", post.pk)
+    thread_version = (await aget_versions(thread_version_key))[thread_version_key]
+    thread_key = fragment_key("thread", post.pk, thread_version, page_number)
+    thread_html = await cache.aget(thread_key)
+
+    if thread_html is None:
+        with use_primary(recently_bumped({thread_version_key: thread_version})):
+            comments_list = post_comments(post)
+            paginator = Paginator(comments_list, 5)
+            # Count through the async ORM; the paginator keeps the value
+            paginator.count = await comments_list.acount()
+            comments = paginator.get_page(page_number)
+            comments.object_list = await aload_threads([comment async for comment in comments.object_list])
+
+            thread_html = render_to_string("comment_thread.html", {"comments": comments})
+            await cache.aset(thread_key, thread_html, settings.CACHE_TIMEOUT)
+
+    return render(request, "post_detail.html", {
+        "post": post,
+        "thread_html": mark_safe(thread_html),
+    })
+
+
+# ======================================================
+# Read-only API (async)
+# Same URL shapes, authentication and JSON as the DRF
+# viewsets, which cannot run as coroutines.
+# ======================================================
+def json_response(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), content_type="application/json", status=status)
+
+
+async def token_user(request):
+    """
+    Return the active user for the request's "Token <key>" header,
+    None when the header is missing, or False for a bad token.
+    """
+    header = request.headers.get("Authorization", "").split()
+    if not header or header[0].lower() != "token":
+        return None
+    if len(header) != 2:
+        return False
+    try:
+        user, _ = await aauthenticate_token(header[1])
+    except AuthenticationFailed:
+        return False
+    return user
+
+
+# Async API views answer reads only
+ALLOWED_METHODS = "GET, HEAD"
+
+
+def async_api_view(view):
+    """
+    GET-only, token-authenticated API view with DRF-style errors.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            response = json_response({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+            response["Allow"] = ALLOWED_METHODS
+            return response
+
+        user = await token_user(request)
+        if not user:
+            detail = "Invalid token." if user is False else "Authentication credentials were not provided."
+            response = json_response({"detail": detail}, status=401)
+            response["WWW-Authenticate"] = "Token"
+            return response
+
+        request.user = user
+        try:
+            return await view(request, *args, **kwargs)
+        except (Http404, Post.DoesNotExist, Comment.DoesNotExist):
+            return json_response({"detail": "Not found."}, status=404)
+    return wrapper
+
+
+@async_api_view
+async def post_list(request):
+    """
+    Async version of PostViewSet.list.
+    """
+    posts = Post.objects.filter(status="published")
+    if request.user.role == "author":
+        posts = Post.objects.filter(author=request.user)
+    fields = requested_fields(request)
+    context = {"request": request}
+
+    pagination = PostCursorPagination()
+    pagination.request = request
+
+    search = request.GET.get("search")
+    if search:
+        page = await asearch_page(
+            api_posts(posts, fields), search, pagination.page_size_from(request.GET),
+            request.GET.get(pagination.cursor_query_param),
+        )
+        data = PostListSerializer(page.object_list, many=True, context=context).data
+        for item, post in zip(data, page):
+            item["snippet"] = post.search_snippet
+        return json_response({
+            "next": pagination.get_link(page.next_cursor),
+            "previous": pagination.get_link(page.previous_cursor),
+            "results": data,
+        })
+
+    # The fast path pages over .values() rows
+    fast = fastjson.enabled()
+    rows = fastjson.post_rows(posts, fields) if fast else api_posts(posts, fields)
+
+    paginator = KeysetPaginator(rows, pagination.page_size_from(request.GET))
+    try:
+        page = await paginator.aget_page(request.GET.get(pagination.cursor_query_param))
+    except InvalidCursor:
+        return json_response({"detail": "Invalid cursor"}, status=400)
+
+    if fast:
+        stamps = [(row["id"], row["updated_at"]) for row in page]
+    else:
+        stamps = [(post.pk, post.updated_at) for post in page]
+    etag = make_etag("posts", stamps, page.next_cursor, page.previous_cursor)
+    last_modified = max((updated_at for _, updated_at in stamps), default=None)
+    cached = not_modified(request, etag, last_modified)
+    if cached is not None:
+        return cached
+
+    data = {
+        "next": pagination.get_link(page.next_cursor),
+        "previous": pagination.get_link(page.previous_cursor),
+    }
+    if fast:
+        data["results"] = await fastjson.apost_items(page.object_list, fields)
+        return set_validators(fastjson.json_response(data, ALLOWED_METHODS), etag, last_modified)
+    data["results"] = PostListSerializer(page.object_list, many=True, context=context).data
+    return set_validators(json_response(data), etag, last_modified)
+
+
+@async_api_view
+async def post_retrieve(request, pk):
+    """
+    Async version of PostViewSet.retrieve.
+    """
+    updated_at = await Post.objects.filter(pk=pk).values_list("updated_at", flat=True).afirst()
+    if updated_at is None:
+        raise Http404
+
+    etag = make_etag("post", pk, updated_at)
+    cached = not_modified(request, etag, updated_at)
+    if cached is not None:
+        return cached
+
+    post = await post_relations(Post.objects.all(), requested_fields(request)).aget(pk=pk)
+    data = PostSerializer(post, context={"request": request}).data
+    return set_validators(json_response(data), etag, updated_at)
+
+
+@async_api_view
+async def post_comments_tree(request, pk):
+    """
+    Async version of PostViewSet.comments.
+    """
+    post = await Post.objects.aget(pk=pk)
+    return json_response(serialize_comment_tree(await apost_thread(post)))
+
+
+@async_api_view
+async def comment_list(request):
+    """
+    Async version of CommentViewSet.list.
+    """
+    comments = Comment.objects.filter(author=request.user)
+
+    summary = await comments.aaggregate(count=Count("pk"), ids=Sum("pk"), latest=Max("updated_at"))
+    author = await aget_versions(version_key("user", request.user.pk))
+    etag = make_etag("comments", request.user.pk, *summary.values(), *author.values())
+    cached = not_modified(request, etag, summary["latest"])
+    if cached is not None:
+        return cached
+
+    if fastjson.enabled():
+        fields = requested_fields(request)
+        rows = [row async for row in fastjson.comment_rows(api_comments(comments), fields)]
+        return set_validators(
+            fastjson.json_response(fastjson.comment_items(rows, fields), ALLOWED_METHODS), etag, summary["latest"]
+        )
+
+    data = CommentSerializer(
+        [comment async for comment in api_comments(comments)], many=True, context={"request": request}
+    ).data
+    return set_validators(json_response(data), etag, summary["latest"])
+
+
+@async_api_view
+async def comment_retrieve(request, pk):
+    """
+    Async version of CommentViewSet.retrieve.
+    """
+    row = await Comment.objects.filter(pk=pk).values_list("updated_at", "author_id").afirst()
+    if row is None:
+        raise Http404
+
+    updated_at, author_id = row
+    author = await aget_versions(version_key("user", author_id))
+    etag = make_etag("comment", pk, updated_at, *author.values())
+    cached = not_modified(request, etag, updated_at)
+    if cached is not None:
+        return cached
+
+    comment = await api_comments(Comment.objects.all()).aget(pk=pk)
+    data = CommentSerializer(comment, context={"request": request}).data
+    return set_validators(json_response(data), etag, updated_at)
+
+
+# ======================================================
+# Login API (async)
+# Password checks are awaited on the hashing pool, so a
+# login storm ties up neither the event loop nor threads.
+# ======================================================
+@csrf_exempt
+async def login(request):
+    """
+    Async version of LoginViewSet.create.
+    """
+    if request.method != "POST":
+        return json_response({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return json_response({"detail": "JSON parse error."}, status=400)
+    else:
+        data = request.POST
+    username, password = data.get("username"), data.get("password")
+
+    try:
+        await aadmit(request, username)
+        user = await aauthenticate_user(request, username, password)
+    except Overloaded as error:
+        response = json_response(
+            {"detail": f"Request was throttled. Expected available in {error.retry_after} seconds."}, status=429
+        )
+        response["Retry-After"] = str(error.retry_after)
+        return response
+
+    if user is None:
+        return json_response({"error": "Invalid username or password"}, status=401)
+    token = await sync_to_async(issue_token)(user)
+    return json_response({"message": "Login successful", "token": token.key})
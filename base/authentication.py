@@ -0,0 +1,135 @@
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+
+# ======================================================
+# Token cache
+# Resolved tokens are kept in the shared cache, so an API
+# call does not need a database round trip to learn who
+# is calling. Signals delete entries when a token is
+# deleted or its user changes, for every worker at once.
+# ======================================================
+def token_cache_key(key):
+    # Never use the secret itself as a cache key
+    return "auth-token:" + hashlib.sha256(key.encode()).hexdigest()
+
+
+def forget_token(key):
+    """
+    Drop a token now and again on commit, so no request can re-cache
+    the old row while the change is still uncommitted.
+    """
+    cache.delete(token_cache_key(key))
+    transaction.on_commit(lambda: cache.delete(token_cache_key(key)))
+
+
+def forget_user(user_id):
+    keys = [token_cache_key(key) for key in Token.objects.filter(user_id=user_id).values_list("key", flat=True)]
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+# ======================================================
+# Expiry and rotation
+# ======================================================
+def seconds_left(token):
+    """
+    Seconds until the token expires; None when tokens never expire.
+    """
+    if not settings.AUTH_TOKEN_TTL:
+        return None
+    expires = token.created + timedelta(seconds=settings.AUTH_TOKEN_TTL)
+    return (expires - timezone.now()).total_seconds()
+
+
+def is_expired(token):
+    left = seconds_left(token)
+    return left is not None and left <= 0
+
+
+def rotate_token(user):
+    """
+    Replace the user's token with a new one.
+    """
+    with transaction.atomic():
+        Token.objects.filter(user=user).delete()
+        return Token.objects.create(user=user)
+
+
+def issue_token(user):
+    """
+    The user's current token, or a new one if it is missing or expired.
+    """
+    token = Token.objects.filter(user=user).first()
+    if token is None or is_expired(token):
+        token = rotate_token(user)
+    return token
+
+
+# ======================================================
+# Authentication
+# ======================================================
+def check_token(token):
+    if is_expired(token):
+        raise AuthenticationFailed("Token has expired.")
+    if not token.user.is_active:
+        raise AuthenticationFailed("User inactive or deleted.")
+    return token.user, token
+
+
+def remember(token):
+    # Rows read inside a transaction may still roll back
+    if connection.in_atomic_block:
+        return
+    left = seconds_left(token)
+    timeout = settings.AUTH_TOKEN_CACHE_SECONDS if left is None else min(settings.AUTH_TOKEN_CACHE_SECONDS, left)
+    if timeout > 0:
+        cache.set(token_cache_key(token.key), token, timeout)
+
+
+def cached(key):
+    # Unpickled from the cache: every request gets fresh token and user objects
+    return cache.get(token_cache_key(key))
+
+
+async def acached(key):
+    return await cache.aget(token_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication backed by the shared token cache,
+    rejecting tokens older than AUTH_TOKEN_TTL.
+    """
+    def authenticate_credentials(self, key):
+        token = cached(key)
+        if token is None:
+            try:
+                token = Token.objects.select_related("user").get(key=key)
+            except Token.DoesNotExist:
+                raise AuthenticationFailed("Invalid token.")
+            remember(token)
+        return check_token(token)
+
+
+async def aauthenticate_token(key):
+    """
+    CachedTokenAuthentication.authenticate_credentials() for async views.
+    """
+    token = await acached(key)
+    if token is None:
+        try:
+            token = await Token.objects.select_related("user").aget(key=key)
+        except Token.DoesNotExist:
+            raise AuthenticationFailed("Invalid token.")
+        remember(token)
+    return check_token(token)
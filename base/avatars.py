@@ -0,0 +1,166 @@
+import hashlib
+import io
+import logging
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils.html import escape
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import User
+
+
+logger = logging.getLogger(__name__)
+
+# Square edge lengths rendered for every picture, in pixels
+AVATAR_SIZES = (40, 128, 512)
+
+# Preferred format first; the last one is the fallback for old browsers
+AVATAR_FORMATS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 6},
+    "jpeg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+}
+
+AVATAR_DIR = "avatars"
+
+
+# ======================================================
+# Rendering
+# Variants are stored under the hash of their own bytes,
+# so a URL never changes meaning and can be cached for
+# good. Pillow writes no EXIF, ICC or XMP unless asked.
+# ======================================================
+def square(image, size):
+    return ImageOps.fit(image, (size, size), method=Image.LANCZOS)
+
+
+def encode(image, options):
+    if options["format"] == "JPEG" and image.mode != "RGB":
+        # JPEG has no alpha: flatten onto white
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A") if "A" in image.getbands() else None)
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, **options)
+    return buffer.getvalue()
+
+
+def store(content, extension, storage):
+    name = f"{AVATAR_DIR}/{hashlib.sha256(content).hexdigest()[:32]}.{extension}"
+    if not storage.exists(name):
+        name = storage.save(name, ContentFile(content))
+    return name
+
+
+def render_variants(source, storage):
+    """
+    Resize an uploaded picture to every AVATAR_SIZES square in every
+    AVATAR_FORMATS format and store the files.
+    Returns {format: {size: name}} with sizes as strings (JSON keys).
+    """
+    with Image.open(source) as image:
+        # JPEGs decode at a reduced scale when that is still big enough
+        image.draft("RGB", (max(AVATAR_SIZES), max(AVATAR_SIZES)))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+
+    variants = {extension: {} for extension in AVATAR_FORMATS}
+    for size in AVATAR_SIZES:
+        resized = square(image, size)
+        for extension, options in AVATAR_FORMATS.items():
+            variants[extension][str(size)] = store(encode(resized, options), extension, storage)
+    return variants
+
+
+# ======================================================
+# Processing
+# Runs as a background job after the upload commits and
+# records the variants with the picture they belong to.
+# Until then templates show the original picture.
+# ======================================================
+def process_avatar(user_id):
+    """
+    Render and record the variants of a user's current picture.
+    """
+    user = User.objects.filter(pk=user_id).first()
+    if user is None or not user.profile_picture:
+        return
+    source = user.profile_picture.name
+    try:
+        with user.profile_picture.open("rb") as picture:
+            variants = render_variants(picture, user.profile_picture.storage)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        logger.warning("Could not render avatar variants for %s", source, exc_info=True)
+        return
+
+    user.avatar_variants = {"source": source, **variants}
+    with transaction.atomic():
+        # Skip if the picture changed again while rendering
+        if User.objects.select_for_update().filter(pk=user_id, profile_picture=source).exists():
+            user.save(update_fields=["avatar_variants"])
+
+
+def needs_processing(user):
+    name = user.profile_picture.name if user.profile_picture else ""
+    return bool(name) and (user.avatar_variants or {}).get("source") != name
+
+
+def variant_urls(user, extension):
+    """
+    [(url, size), ...] for one format of a processed picture.
+    """
+    if not user.profile_picture or needs_processing(user):
+        return []
+    storage = user.profile_picture.storage
+    return [(storage.url(name), int(size)) for size, name in user.avatar_variants.get(extension, {}).items()]
+
+
+# ======================================================
+# Initials avatars
+# Users without a picture get an SVG of their initials on
+# a colour picked from their name, rendered once, stored
+# like the variants above and remembered per process.
+# ======================================================
+INITIALS_COLOURS = (
+    "#1abc9c", "#16a085", "#2ecc71", "#27ae60", "#3498db", "#2980b9", "#9b59b6", "#8e44ad",
+    "#34495e", "#e67e22", "#d35400", "#e74c3c", "#c0392b", "#7f8c8d", "#f39c12", "#2c3e50",
+)
+
+INITIALS_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="128" height="128" viewBox="0 0 128 128">'
+    '<rect width="128" height="128" fill="{colour}"/>'
+    '<text x="64" y="64" dy=".35em" fill="#fff" font-family="system-ui,sans-serif" font-size="52" '
+    'font-weight="600" text-anchor="middle">{initials}</text></svg>'
+)
+
+
+def initials(username):
+    """
+    "jane_doe" -> "JD", "jane" -> "JA".
+    """
+    words = [word for word in re.split(r"[\W_]+", username) if word] or [username or "?"]
+    letters = words[0][0] + words[1][0] if len(words) > 1 else words[0][:2]
+    return letters.upper()
+
+
+def initials_svg(username, seed=""):
+    digest = hashlib.sha256(f"{seed}:{username}".encode()).digest()
+    return INITIALS_SVG.format(
+        colour=INITIALS_COLOURS[digest[0] % len(INITIALS_COLOURS)], initials=escape(initials(username)),
+    ).encode()
+
+
+@lru_cache(maxsize=4096)
+def initials_avatar(username, seed=""):
+    """
+    The storage name of `username`'s initials avatar.
+    """
+    return store(initials_svg(username, seed), "svg", default_storage)
+
+
+def initials_url(username):
+    return default_storage.url(initials_avatar(username, settings.AVATAR_COLOUR_SEED))
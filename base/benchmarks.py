@@ -0,0 +1,325 @@
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from .counters import refresh_counters
+from .models import User, Post, Comment, Category, Tag
+from .pagination import encode_cursor
+from .search import get_backend
+
+
+# Corpus built when no sizes are given
+DEFAULT_CORPUS = {
+    "users": 200,
+    "posts": 3000,
+    "comments": 20000,
+    "hot_comments": 10000,
+    "depth": 4,
+    "tags": 50,
+    "categories": 10,
+    "tags_per_post": 3,
+    "categories_per_post": 2,
+    "seed": 1,
+}
+
+# Word every SEARCH_SHARE-th post title carries, so search has real hits
+SEARCH_WORD = "latency"
+SEARCH_SHARE = 50
+
+WORDS = (
+    "django python query index cache page thread reply author draft post comment "
+    "server client request response model view template database table column "
+    "search tag category feed cursor batch worker import export replica primary"
+).split()
+
+
+class BenchmarkError(Exception):
+    """
+    Raised when a scenario cannot run against the corpus.
+    """
+
+
+# ======================================================
+# Corpus generator
+# Deterministic for a given seed, written with bulk
+# inserts; counters and the search index are refreshed
+# once at the end as the bulk paths do.
+# ======================================================
+def sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def thread_levels(total, depth):
+    """
+    Split `total` comments over `depth` levels, each half the size of
+    the level above, so threads thin out as they deepen.
+    """
+    weights = [2 ** (depth - level - 1) for level in range(depth)]
+    sizes = [total * weight // sum(weights) for weight in weights]
+    sizes[0] += total - sum(sizes)
+    return sizes
+
+
+def create_comments(rng, posts, authors, total, depth):
+    """
+    Create `total` comments spread over `posts`, nested up to `depth` levels.
+    Each level is inserted after the one above, so parents have ids.
+    """
+    parents = []
+    for level, size in enumerate(thread_levels(total, depth)):
+        comments = []
+        for _ in range(size):
+            parent = rng.choice(parents) if level else None
+            comments.append(Comment(
+                post_id=parent.post_id if parent else rng.choice(posts).pk,
+                parent_comment=parent,
+                author=rng.choice(authors),
+                content=sentence(rng, 20),
+            ))
+        parents = Comment.objects.bulk_create(comments, batch_size=1000)
+
+
+def build_corpus(users, posts, comments, hot_comments, depth, tags, categories,
+                 tags_per_post, categories_per_post, seed):
+    """
+    Fill the database with a synthetic blog. Returns the "hot" post,
+    which holds `hot_comments` comments on top of the rest.
+    """
+    rng = random.Random(seed)
+    password = make_password(None)
+
+    people = User.objects.bulk_create(
+        User(
+            username=f"user{i}", email=f"user{i}@example.com", password=password,
+            role="author" if i % 5 == 0 else "reader",
+        )
+        for i in range(users)
+    )
+    authors = people[::5]
+    tag_objs = Tag.objects.bulk_create(Tag(name=f"tag {i}", slug=f"tag-{i}") for i in range(tags))
+    category_objs = Category.objects.bulk_create(
+        Category(name=f"category {i}", slug=f"category-{i}") for i in range(categories)
+    )
+
+    post_objs = Post.objects.bulk_create(
+        (
+            Post(
+                title=sentence(rng, 6) + (f" {SEARCH_WORD}" if i % SEARCH_SHARE == 0 else ""),
+                content=sentence(rng, 80),
+                author=rng.choice(authors),
+                status="draft" if i % 10 == 9 else "published",
+            )
+            for i in range(posts)
+        ),
+        batch_size=1000,
+    )
+    Post.tags.through.objects.bulk_create(
+        (
+            Post.tags.through(post_id=post.pk, tag_id=tag.pk)
+            for post in post_objs
+            for tag in rng.sample(tag_objs, min(tags_per_post, len(tag_objs)))
+        ),
+        batch_size=1000,
+    )
+    Post.categories.through.objects.bulk_create(
+        (
+            Post.categories.through(post_id=post.pk, category_id=category.pk)
+            for post in post_objs
+            for category in rng.sample(category_objs, min(categories_per_post, len(category_objs)))
+        ),
+        batch_size=1000,
+    )
+
+    hot = Post.objects.create(title="Hot post", content=sentence(rng, 80), author=authors[0], status="published")
+    create_comments(rng, post_objs, people, comments, depth)
+    create_comments(rng, [hot], people, hot_comments, depth)
+
+    post_ids = [post.pk for post in post_objs] + [hot.pk]
+    for start in range(0, len(post_ids), 1000):
+        refresh_counters(post_ids[start:start + 1000])
+    get_backend().index_posts(post_ids)
+    return hot
+
+
+# ======================================================
+# Scenarios
+# Each takes the run context and returns a zero-argument
+# callable making one request through the test client.
+# ======================================================
+def feed_cursor(page, per_page=5):
+    """
+    The home feed cursor that opens page `page`.
+    """
+    try:
+        last = (
+            Post.objects.filter(status="published")
+            .order_by("-publication_date", "-id")
+            .values_list("publication_date", "pk")[(page - 1) * per_page - 1]
+        )
+    except IndexError:
+        raise BenchmarkError(f"The corpus has fewer than {page} feed pages")
+    return encode_cursor(*last)
+
+
+def home_page(context, page):
+    url = reverse("home")
+    if page > 1:
+        url += f"?cursor={feed_cursor(page)}"
+    return lambda: context.client.get(url)
+
+
+def hot_post_detail(context):
+    url = reverse("post_detail", args=[context.hot.pk])
+    return lambda: context.client.get(url)
+
+
+def hot_post_comments_api(context):
+    url = reverse("api-posts-comments", args=[context.hot.pk])
+    return lambda: context.client.get(url, headers=context.headers)
+
+
+def search_page(context):
+    url = f"{reverse('home')}?search={SEARCH_WORD}"
+    return lambda: context.client.get(url)
+
+
+def api_search(context):
+    url = f"{reverse('api-posts-list')}?search={SEARCH_WORD}"
+    return lambda: context.client.get(url, headers=context.headers)
+
+
+def api_post_list(context):
+    url = reverse("api-posts-list")
+    return lambda: context.client.get(url, headers=context.headers)
+
+
+def api_comment_list(context):
+    url = reverse("api-comments-list")
+    return lambda: context.client.get(url, headers=context.headers)
+
+
+def fast_json(scenario, enabled):
+    """
+    Run `scenario` with the fast JSON path on or off, for comparison.
+    """
+    def build(context):
+        request = scenario(context)
+
+        def run():
+            with override_settings(API_FAST_JSON=enabled):
+                return request()
+        return run
+    return build
+
+
+def bulk_comments(context):
+    url = reverse("api-comments-bulk")
+    items = [{"post": context.hot.pk, "content": f"Bulk comment {i}"} for i in range(100)]
+    return lambda: context.client.post(url, items, content_type="application/json", headers=context.headers)
+
+
+SCENARIOS = {
+    "home_page_1": lambda context: home_page(context, 1),
+    "home_page_500": lambda context: home_page(context, 500),
+    "hot_post_detail": hot_post_detail,
+    "hot_post_comments_api": hot_post_comments_api,
+    "search_page": search_page,
+    "api_search": api_search,
+    "api_post_list": fast_json(api_post_list, True),
+    "api_post_list_serializer": fast_json(api_post_list, False),
+    "api_comment_list": fast_json(api_comment_list, True),
+    "api_comment_list_serializer": fast_json(api_comment_list, False),
+    "bulk_comments": bulk_comments,
+}
+
+
+class RunContext:
+    def __init__(self, user, hot):
+        self.hot = hot
+        self.client = Client()
+        self.client.force_login(user)
+        self.headers = {"Authorization": f"Token {Token.objects.get_or_create(user=user)[0].key}"}
+
+
+def measure(request, repeat):
+    """
+    Run one scenario: a warm-up, `repeat` timed runs, and one run
+    under tracemalloc for the peak Python memory.
+    """
+    response = request()
+    if response.status_code >= 400:
+        raise BenchmarkError(f"Scenario answered {response.status_code}")
+
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        request()
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        request()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        request()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "queries": len(queries),
+        "ms": round(statistics.median(timings) * 1000, 2),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def run_scenarios(hot, names=None, repeat=5):
+    """
+    Measure the named scenarios (all by default) as a reader, with
+    caching off so every run does the full work.
+    Returns {name: measurements}.
+    """
+    user = User.objects.filter(role="reader").order_by("pk").first()
+    dummy_cache = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+    results = {}
+    with override_settings(CACHES=dummy_cache):
+        context = RunContext(user, hot)
+        for name in names or SCENARIOS:
+            results[name] = measure(SCENARIOS[name](context), repeat)
+    return results
+
+
+# ======================================================
+# Baseline comparison
+# ======================================================
+def compare(results, baseline, time_tolerance=0.25, memory_tolerance=0.25, slack_ms=2.0):
+    """
+    Return a list of regressions against `baseline` (as saved from an
+    earlier run). Query counts must not grow; time and memory may
+    grow by their tolerance, time also by `slack_ms` to absorb noise.
+    """
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if current["queries"] > before["queries"]:
+            regressions.append(f"{name}: {before['queries']} -> {current['queries']} queries")
+        if current["ms"] > before["ms"] * (1 + time_tolerance) + slack_ms:
+            regressions.append(f"{name}: {before['ms']} -> {current['ms']} ms")
+        if current["peak_kib"] > before["peak_kib"] * (1 + memory_tolerance):
+            regressions.append(f"{name}: {before['peak_kib']} -> {current['peak_kib']} KiB peak")
+    return regressions
@@ -0,0 +1,316 @@
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+
+# Upper bound on items per request, keeping one transaction short
+BULK_MAX_ITEMS = 1000
+
+BULK_ACTIONS = ("bulk_create", "bulk_update", "bulk_destroy")
+
+
+def is_id(value):
+    # JSON ids are plain integers; lists, dicts and booleans are not
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+# ======================================================
+# Batch lookups
+# Related primary keys across a whole batch are loaded
+# in one query per relation, then validated against
+# those rows instead of one SELECT per key.
+# ======================================================
+class Preloaded:
+    """
+    Stands in for a related field's queryset, answering the field's
+    get(pk=...) from rows loaded once for the batch.
+    """
+    def __init__(self, queryset, pks):
+        self.model = queryset.model
+        keys = set()
+        for pk in pks:
+            try:
+                keys.add(self.key(pk))
+            except ValueError:
+                pass
+        self.rows = queryset.in_bulk(keys) if keys else {}
+
+    def key(self, pk):
+        try:
+            return self.model._meta.pk.to_python(pk)
+        except ValidationError as exc:
+            raise ValueError(pk) from exc
+
+    def get(self, pk):
+        # Raises what a queryset would, so the field reports its usual errors
+        try:
+            return self.rows[self.key(pk)]
+        except KeyError:
+            raise self.model.DoesNotExist from None
+
+
+# ======================================================
+# Bulk API mixin
+# Every item is validated first; the batch is written in
+# one transaction only when all items are valid, otherwise
+# nothing is written and the errors are listed per item.
+# ======================================================
+class BulkMixin:
+    """
+    Adds bulk_create (POST a list), bulk_update (PATCH a list of
+    objects with "id") and bulk_destroy (DELETE {"ids": [...]}).
+    """
+    # Fields a bulk PATCH may change
+    bulk_update_fields = ()
+
+    # ---------- hooks ----------
+    def get_bulk_queryset(self):
+        """
+        Objects the caller may update or delete in bulk.
+        """
+        return self.get_queryset()
+
+    def get_bulk_create_kwargs(self):
+        """
+        Extra field values for every created object (e.g. the author).
+        """
+        return {}
+
+    def check_bulk_create(self, request):
+        """
+        Return an error Response to refuse the batch, or None.
+        """
+        return None
+
+    def before_bulk_create(self, objs):
+        pass
+
+    def after_bulk_write(self, objs):
+        """
+        Side effects that model signals would have run (bulk writes send none).
+        """
+        pass
+
+    def after_bulk_delete(self, objs):
+        pass
+
+    # ---------- helpers ----------
+    def bulk_items(self, items):
+        if not isinstance(items, list):
+            return Response({"error": "Expected a list of items"}, status=status.HTTP_400_BAD_REQUEST)
+        if not items:
+            return Response({"error": "No items given"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > BULK_MAX_ITEMS:
+            return Response(
+                {"error": f"At most {BULK_MAX_ITEMS} items per request"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return None
+
+    def bulk_errors(self, errors):
+        # List serializers report either a list or an {index: errors} dict
+        items = errors.items() if isinstance(errors, dict) else enumerate(errors)
+        return Response(
+            {"errors": [{"index": i, "errors": e} for i, e in items if e]},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    def integrity_error(self, exc):
+        return Response(
+            {"errors": [{"index": None, "errors": {"non_field_errors": [str(exc)]}}]},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    def get_permissions(self):
+        # Bulk writes are never anonymous, whatever single writes allow
+        permissions = super().get_permissions()
+        if self.action in BULK_ACTIONS:
+            permissions.append(IsAuthenticated())
+        return permissions
+
+    def related_fields(self, serializer):
+        """
+        {name: PrimaryKeyRelatedField} for the writable relations of
+        `serializer`, including the child of a many relation.
+        """
+        relations = {}
+        for name, field in serializer.fields.items():
+            relation = getattr(field, "child_relation", field)
+            if not field.read_only and isinstance(relation, PrimaryKeyRelatedField):
+                relations[name] = relation
+        return relations
+
+    def preload_relations(self, serializer, items):
+        """
+        Load every related object the batch refers to, one query per relation.
+        """
+        preloaded = {}
+        for name, relation in self.related_fields(serializer).items():
+            pks = []
+            for item in items:
+                value = item.get(name) if isinstance(item, dict) else None
+                for pk in value if isinstance(value, list) else [value]:
+                    if isinstance(pk, (int, str)) and not isinstance(pk, bool):
+                        pks.append(pk)
+            preloaded[name] = Preloaded(relation.get_queryset(), pks)
+        return preloaded
+
+    def use_preloaded(self, serializer, preloaded):
+        for name, relation in self.related_fields(serializer).items():
+            relation.queryset = preloaded[name]
+
+    def many_to_many_fields(self):
+        return {field.name: field for field in self.get_queryset().model._meta.many_to_many}
+
+    def write_links(self, objs, links, replace=False):
+        """
+        Insert M2M links for `objs` with one bulk insert per relation.
+        `links` holds one {field name: related objects} dict per object.
+        """
+        for name, field in self.many_to_many_fields().items():
+            through = field.remote_field.through
+            source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+            owners = [obj.pk for obj, link in zip(objs, links) if name in link]
+            if not owners:
+                continue
+
+            if replace:
+                through.objects.filter(**{f"{source}_id__in": owners}).delete()
+            through.objects.bulk_create(
+                [
+                    through(**{f"{source}_id": obj.pk, f"{target}_id": related.pk})
+                    for obj, link in zip(objs, links)
+                    for related in link.get(name, ())
+                ],
+                batch_size=BULK_MAX_ITEMS,
+                ignore_conflicts=True,
+            )
+
+    # ---------- actions ----------
+    def bulk_create(self, request):
+        """
+        Create every item in the list, or none of them.
+        """
+        error = self.bulk_items(request.data) or self.check_bulk_create(request)
+        if error:
+            return error
+
+        serializer = self.get_serializer(data=request.data, many=True)
+        self.use_preloaded(serializer.child, self.preload_relations(serializer.child, request.data))
+        if not serializer.is_valid():
+            return self.bulk_errors(serializer.errors)
+
+        model = self.get_queryset().model
+        m2m = self.many_to_many_fields()
+        objs, links = [], []
+        for data in serializer.validated_data:
+            data = dict(data)
+            links.append({name: data.pop(name) for name in m2m if name in data})
+            objs.append(model(**data, **self.get_bulk_create_kwargs()))
+        self.before_bulk_create(objs)
+
+        try:
+            with transaction.atomic():
+                objs = model.objects.bulk_create(objs, batch_size=BULK_MAX_ITEMS)
+                self.write_links(objs, links)
+                self.after_bulk_write(objs)
+        except IntegrityError as exc:
+            return self.integrity_error(exc)
+
+        return Response({"ids": [obj.pk for obj in objs]}, status=status.HTTP_201_CREATED)
+
+    def bulk_update(self, request):
+        """
+        Apply partial updates to every listed object, or to none of them.
+        """
+        error = self.bulk_items(request.data)
+        if error:
+            return error
+
+        items = request.data
+        ids = [item.get("id") if isinstance(item, dict) else None for item in items]
+        instances = self.get_bulk_queryset().in_bulk([pk for pk in ids if is_id(pk)])
+        preloaded = self.preload_relations(self.get_serializer(), items)
+
+        errors, changes = [], []
+        for item, pk in zip(items, ids):
+            if not is_id(pk):
+                errors.append({"id": ["A valid integer id is required."]})
+                continue
+            obj = instances.get(pk)
+            if obj is None:
+                errors.append({"id": ["Not found, or not yours to change."]})
+                continue
+
+            fields = set(item) - {"id"}
+            locked = fields - set(self.bulk_update_fields)
+            if locked:
+                errors.append({name: ["Cannot be changed in bulk."] for name in sorted(locked)})
+                continue
+
+            serializer = self.get_serializer(obj, data=item, partial=True)
+            self.use_preloaded(serializer, preloaded)
+            if not serializer.is_valid():
+                errors.append(serializer.errors)
+                continue
+            errors.append({})
+            changes.append((obj, serializer.validated_data))
+
+        if any(errors):
+            return self.bulk_errors(errors)
+
+        m2m = self.many_to_many_fields()
+        objs, links, fields = [], [], set()
+        now = timezone.now()
+        for obj, data in changes:
+            link = {}
+            for name, value in data.items():
+                if name in m2m:
+                    link[name] = value
+                else:
+                    setattr(obj, name, value)
+                    fields.add(name)
+            if hasattr(obj, "updated_at"):
+                obj.updated_at = now
+                fields.add("updated_at")
+            objs.append(obj)
+            links.append(link)
+
+        try:
+            with transaction.atomic():
+                if fields:
+                    self.get_queryset().model.objects.bulk_update(objs, sorted(fields), batch_size=BULK_MAX_ITEMS)
+                self.write_links(objs, links, replace=True)
+                self.after_bulk_write(objs)
+        except IntegrityError as exc:
+            return self.integrity_error(exc)
+
+        return Response({"updated": len(objs)})
+
+    def bulk_destroy(self, request):
+        """
+        Delete every listed id, or none of them.
+        """
+        ids = request.data.get("ids") if isinstance(request.data, dict) else None
+        error = self.bulk_items(ids)
+        if error:
+            return error
+
+        objs = self.get_bulk_queryset().in_bulk([pk for pk in ids if is_id(pk)])
+        errors = [
+            {"id": ["A valid integer id is required."]} if not is_id(pk)
+            else {} if pk in objs else {"id": ["Not found, or not yours to delete."]}
+            for pk in ids
+        ]
+        if any(errors):
+            return self.bulk_errors(errors)
+
+        with transaction.atomic():
+            self.get_queryset().model.objects.filter(pk__in=list(objs)).delete()
+            self.after_bulk_delete(list(objs.values()))
+
+        return Response({"deleted": len(objs)})
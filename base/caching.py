@@ -0,0 +1,155 @@
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+from .routers import use_primary
+
+
+# ======================================================
+# Object versions
+# Cached pages and fragments are keyed by the versions of
+# the objects they show. Editing an object bumps its
+# version, so old entries are simply never read again.
+# ======================================================
+def version_key(kind, pk=None):
+    return f"version:{kind}" if pk is None else f"version:{kind}:{pk}"
+
+
+def get_versions(*keys):
+    """
+    Return {key: version} for the given version keys in one cache round trip.
+    Missing versions start from the current time, so a version lost to
+    eviction can never come back as a value that was used before.
+    """
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key, time.time_ns())
+    return versions
+
+
+async def aget_versions(*keys):
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, time.time_ns(), timeout=None)
+            versions[key] = await cache.aget(key, time.time_ns())
+    return versions
+
+
+def bump(*keys):
+    """
+    Invalidate everything cached under these versions once the
+    current transaction commits, so a reader can never cache the
+    old rows under the new version. A version is the time of its
+    bump, which recently_bumped() relies on.
+    """
+    def apply():
+        cache.set_many(dict.fromkeys(keys, time.time_ns()), timeout=None)
+
+    transaction.on_commit(apply)
+
+
+def recently_bumped(versions):
+    """
+    True if any of {key: version} changed within the replica sticky
+    window; entries for those versions are filled from the primary,
+    since a lagging replica could still return the old rows.
+    """
+    window = settings.REPLICA_STICKY_SECONDS * 1_000_000_000
+    return any(time.time_ns() - version < window for version in versions.values())
+
+
+def fragment_key(name, *parts):
+    return f"fragment:{name}:" + ":".join(str(part) for part in parts)
+
+
+def card_version_keys(posts):
+    return {post.pk: (version_key("post", post.pk), version_key("user", post.author_id)) for post in posts}
+
+
+def set_card_versions(posts, keys, versions):
+    for post in posts:
+        post_key, author_key = keys[post.pk]
+        post.cache_version = f"{versions[post_key]}.{versions[author_key]}"
+    return posts
+
+
+def attach_card_versions(posts):
+    """
+    Give each post a `cache_version` covering the post and its author,
+    for the {% cache %} tag around post cards.
+    """
+    keys = card_version_keys(posts)
+    versions = get_versions(*{key for pair in keys.values() for key in pair})
+    return set_card_versions(posts, keys, versions)
+
+
+async def aattach_card_versions(posts):
+    keys = card_version_keys(posts)
+    versions = await aget_versions(*{key for pair in keys.values() for key in pair})
+    return set_card_versions(posts, keys, versions)
+
+
+# ======================================================
+# Per-view caching
+# ======================================================
+def cache_page_on_version(*version_keys):
+    """
+    Cache a GET view's rendered body under the given versions and
+    the full request path. Only for pages that render the same for
+    every signed-in user. Works on sync and async views.
+    """
+    def page_key(view, request, versions):
+        path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        return fragment_key(view.__name__, *(versions[k] for k in version_keys), path)
+
+    def cacheable(response):
+        return response.status_code == 200 and not response.streaming
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method != "GET":
+                    return await view(request, *args, **kwargs)
+
+                versions = await aget_versions(*version_keys)
+                key = page_key(view, request, versions)
+                content = await cache.aget(key)
+                if content is not None:
+                    return HttpResponse(content)
+
+                with use_primary(recently_bumped(versions)):
+                    response = await view(request, *args, **kwargs)
+                if cacheable(response):
+                    await cache.aset(key, response.content, settings.CACHE_TIMEOUT)
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != "GET":
+                return view(request, *args, **kwargs)
+
+            versions = get_versions(*version_keys)
+            key = page_key(view, request, versions)
+            content = cache.get(key)
+            if content is not None:
+                return HttpResponse(content)
+
+            with use_primary(recently_bumped(versions)):
+                response = view(request, *args, **kwargs)
+            if cacheable(response):
+                cache.set(key, response.content, settings.CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+
+# Backends whose entries live in one process only
+PER_PROCESS_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+# ======================================================
+# Deployment checks
+# ======================================================
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Cache versions are bumped in the cache: a per-process cache would
+    let the other workers keep serving pages from before an edit.
+    """
+    backend = settings.CACHES["default"]["BACKEND"]
+    if settings.WEB_WORKERS > 1 and backend in PER_PROCESS_CACHES:
+        return [Error(
+            f"WEB_WORKERS is {settings.WEB_WORKERS} but the default cache ({backend}) is per process.",
+            hint='Set BLOG_CACHE_BACKEND to "redis" or "file" so every worker sees cache invalidations.',
+            id="base.E001",
+        )]
+    return []
@@ -0,0 +1,40 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+# ======================================================
+# Conditional GET helpers
+# Validators are computed from cheap columns (ids and
+# updated_at) so an unchanged resource can be answered
+# with 304 before anything is serialized.
+# ======================================================
+def make_etag(*parts):
+    """
+    Build a strong ETag from the values that determine a representation.
+    """
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return quote_etag(digest)
+
+
+def not_modified(request, etag, last_modified=None):
+    """
+    Return a 304 (or 412) response when the client's copy is current,
+    otherwise None. `last_modified` is a datetime.
+    """
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    return response
@@ -0,0 +1,119 @@
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Now
+
+from .models import Post, Comment
+
+
+# ======================================================
+# Post comment counters
+# Updated with F() expressions so concurrent writers
+# never overwrite each other's increments.
+# ======================================================
+def comment_added(comment):
+    """
+    Count a newly created comment against its post.
+    """
+    Post.objects.filter(pk=comment.post_id).update(
+        comment_count=F("comment_count") + 1,
+        reply_count=F("reply_count") + (1 if comment.parent_comment_id else 0),
+        last_activity=comment.created_date,
+        updated_at=Now(),
+    )
+
+
+def create_comment(**fields):
+    """
+    Create a comment and update its post's counters in one transaction.
+    """
+    with transaction.atomic():
+        comment = Comment.objects.create(**fields)
+        comment_added(comment)
+    return comment
+
+
+def delete_comment(comment):
+    """
+    Delete a comment with all of its replies and take
+    them off the post's counters in one transaction.
+    """
+    with transaction.atomic():
+        removed = Comment.objects.filter(
+            post_id=comment.post_id,
+            path__gte=comment.path,
+            path__lt=comment.path + ":",
+        ).count()
+        replies_removed = removed if comment.parent_comment_id else removed - 1
+
+        comment.delete()
+        Post.objects.filter(pk=comment.post_id).update(
+            comment_count=F("comment_count") - removed,
+            reply_count=F("reply_count") - replies_removed,
+            last_activity=latest_activity(),
+            updated_at=Now(),
+        )
+
+
+# ======================================================
+# Reconciliation
+# ======================================================
+def latest_activity():
+    """
+    Time of a post's latest comment, or its publication if it has none.
+    """
+    comments = Comment.objects.filter(post=OuterRef("pk")).values("post")
+    return Coalesce(
+        Subquery(comments.annotate(latest=Max("created_date")).values("latest")), F("publication_date")
+    )
+
+
+def actual_counters():
+    """
+    Subquery expressions computing each post's true counter values.
+    """
+    comments = Comment.objects.filter(post=OuterRef("pk")).values("post")
+    return {
+        "comment_count": Coalesce(Subquery(comments.annotate(n=Count("pk")).values("n")), 0),
+        "reply_count": Coalesce(
+            Subquery(comments.filter(parent_comment__isnull=False).annotate(n=Count("pk")).values("n")), 0
+        ),
+        "last_activity": latest_activity(),
+    }
+
+
+def refresh_counters(post_ids):
+    """
+    Recompute the counters of the given posts from their comments,
+    for writes that add or remove many comments at once.
+    """
+    return Post.objects.filter(pk__in=list(post_ids)).update(updated_at=Now(), **actual_counters())
+
+
+def reconcile_counters(batch_size=1000):
+    """
+    Recompute counters for every post whose stored values have drifted.
+    Returns the number of posts repaired.
+    """
+    actual = actual_counters()
+    drifted = (
+        Post.objects.annotate(**{f"actual_{name}": expr for name, expr in actual.items()})
+        .filter(
+            ~Q(comment_count=F("actual_comment_count")) |
+            ~Q(reply_count=F("actual_reply_count")) |
+            ~(
+                Q(last_activity=F("actual_last_activity")) |
+                # Posts never commented on keep their NULL
+                Q(last_activity__isnull=True, actual_comment_count=0)
+            )
+        )
+        .values_list("pk", flat=True)
+    )
+
+    repaired = 0
+    ids = list(drifted)
+    for start in range(0, len(ids), batch_size):
+        with transaction.atomic():
+            repaired += Post.objects.filter(pk__in=ids[start:start + batch_size]).update(
+                updated_at=Now(), **actual
+            )
+    return repaired
@@ -0,0 +1,63 @@
+from django.db import transaction
+
+
+# ======================================================
+# Minimal-write editing
+# An edit writes only what it changes: the changed
+# columns of the row, and the link rows added or removed.
+# Nothing changed means nothing written.
+# ======================================================
+def assign(instance, values):
+    """
+    Set `values` on `instance` and return the names of fields that changed.
+    """
+    changed = []
+    for name, value in values.items():
+        if getattr(instance, name) != value:
+            setattr(instance, name, value)
+            changed.append(name)
+    return changed
+
+
+def sync_links(manager, targets):
+    """
+    Make a many-to-many relation hold exactly `targets` (objects or ids),
+    writing only the through rows added or removed. Returns True if it
+    changed. Sends no m2m_changed: the caller saves the owner instead,
+    whose post_save covers what those handlers would do.
+    """
+    source, target = f"{manager.source_field_name}_id", f"{manager.target_field_name}_id"
+    links = manager.through.objects.filter(**{source: manager.instance.pk})
+    wanted = {int(getattr(item, "pk", item)) for item in targets}
+    current = set(links.values_list(target, flat=True))
+    removed, added = current - wanted, wanted - current
+    if removed:
+        links.filter(**{f"{target}__in": removed}).delete()
+    if added:
+        manager.through.objects.bulk_create(
+            [manager.through(**{source: manager.instance.pk, target: pk}) for pk in added]
+        )
+    if removed or added:
+        # As add() and remove() do, drop a prefetched copy of the old links
+        getattr(manager.instance, "_prefetched_objects_cache", {}).pop(manager.prefetch_cache_name, None)
+    return bool(removed or added)
+
+
+def edit_post(post, values, categories=None, tags=None):
+    """
+    Apply an edit to `post` in one transaction. `categories` and `tags`
+    of None leave the links as they are. Returns True if anything changed.
+    """
+    with transaction.atomic():
+        linked = False
+        if categories is not None:
+            linked |= sync_links(post.categories, categories)
+        if tags is not None:
+            linked |= sync_links(post.tags, tags)
+
+        changed = assign(post, values)
+        if changed or linked:
+            # One UPDATE; its post_save reindexes and invalidates the post,
+            # links included. auto_now is only written when named.
+            post.save(update_fields=[*changed, "updated_at"])
+    return bool(changed or linked)
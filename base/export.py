@@ -0,0 +1,206 @@
+import csv
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Post, Comment, Category, Tag
+
+
+# Rows fetched per database round trip; memory use depends on this,
+# not on the size of the export
+EXPORT_CHUNK_SIZE = 2000
+
+POST_FIELDS = [
+    "id", "title", "content", "status", "author", "publication_date",
+    "updated_at", "categories", "tags", "comment_count",
+]
+COMMENT_FIELDS = [
+    "id", "post", "parent_comment", "author", "content", "created_date", "updated_at", "depth",
+]
+
+
+class ExportError(ValueError):
+    """
+    Raised for export options that cannot be applied.
+    """
+
+
+def parse_bound(value, end=False):
+    """
+    Turn an ISO date or datetime into an aware datetime.
+    A plain date as the upper bound is the start of the next day.
+    """
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+        moment = None if day else parse_datetime(value)
+    except ValueError:  # well formed, but no such date
+        day = moment = None
+    if day is not None:
+        moment = datetime.datetime.combine(day + datetime.timedelta(days=1 if end else 0), datetime.time())
+    elif moment is None:
+        raise ExportError(f"Invalid date: {value}")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def until_filter(field, value):
+    """
+    Keep rows with `field` at or before `value`: through the end of
+    the day for a plain date, up to and including a datetime.
+    """
+    bound = parse_bound(value, end=True)
+    lookup = "lt" if parse_date(value) else "lte"
+    return {f"{field}__{lookup}": bound}
+
+
+# ======================================================
+# Export querysets
+# Filters apply to posts; comments are filtered through
+# the post they belong to, except for author and date.
+# ======================================================
+def export_posts(author=None, status=None, tag=None, since=None, until=None):
+    posts = Post.objects.all()
+    if author:
+        posts = posts.filter(author__username=author)
+    if status:
+        posts = posts.filter(status=status)
+    if tag:
+        posts = posts.filter(tags__slug=tag)
+    if since:
+        posts = posts.filter(publication_date__gte=parse_bound(since))
+    if until:
+        posts = posts.filter(**until_filter("publication_date", until))
+
+    return (
+        posts.select_related("author")
+        .only(*(name for name in POST_FIELDS if name not in ("categories", "tags", "author")), "author__username")
+        .prefetch_related(
+            Prefetch("categories", queryset=Category.objects.only("name")),
+            Prefetch("tags", queryset=Tag.objects.only("name")),
+        )
+        .order_by("pk")
+    )
+
+
+def export_comments(author=None, status=None, tag=None, since=None, until=None):
+    comments = Comment.objects.all()
+    if author:
+        comments = comments.filter(author__username=author)
+    if status:
+        comments = comments.filter(post__status=status)
+    if tag:
+        comments = comments.filter(post__tags__slug=tag)
+    if since:
+        comments = comments.filter(created_date__gte=parse_bound(since))
+    if until:
+        comments = comments.filter(**until_filter("created_date", until))
+    return comments.order_by("pk")
+
+
+def visible_to(queryset, user):
+    """
+    Limit an export to what `user` may read: staff see everything,
+    others see published posts plus their own drafts.
+    """
+    if user.is_staff:
+        return queryset
+    prefix = "post__" if queryset.model is Comment else ""
+    return queryset.filter(Q(**{f"{prefix}status": "published"}) | Q(**{f"{prefix}author": user}))
+
+
+# ======================================================
+# Row generators
+# ======================================================
+def post_rows(posts, chunk_size=EXPORT_CHUNK_SIZE):
+    # Prefetches run once per chunk when iterating
+    for post in posts.iterator(chunk_size=chunk_size):
+        yield {
+            "id": post.pk,
+            "title": post.title,
+            "content": post.content,
+            "status": post.status,
+            "author": post.author.username,
+            "publication_date": post.publication_date,
+            "updated_at": post.updated_at,
+            "categories": [category.name for category in post.categories.all()],
+            "tags": [tag.name for tag in post.tags.all()],
+            "comment_count": post.comment_count,
+        }
+
+
+def comment_rows(comments, chunk_size=EXPORT_CHUNK_SIZE):
+    values = comments.values_list(
+        "pk", "post_id", "parent_comment_id", "author__username",
+        "content", "created_date", "updated_at", "depth",
+    )
+    for row in values.iterator(chunk_size=chunk_size):
+        yield dict(zip(COMMENT_FIELDS, row))
+
+
+def export_rows(kind, chunk_size=EXPORT_CHUNK_SIZE, user=None, **filters):
+    """
+    Return (fields, rows) for an export of "posts" or "comments".
+    """
+    if kind == "posts":
+        queryset, fields, rows = export_posts(**filters), POST_FIELDS, post_rows
+    elif kind == "comments":
+        queryset, fields, rows = export_comments(**filters), COMMENT_FIELDS, comment_rows
+    else:
+        raise ExportError(f"Unknown export kind: {kind}")
+
+    if user is not None:
+        queryset = visible_to(queryset, user)
+    return fields, rows(queryset, chunk_size)
+
+
+# ======================================================
+# Encoders
+# Each yields one line per row, so output can be streamed.
+# ======================================================
+def ndjson_lines(fields, rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+class LineBuffer:
+    """
+    File-like object handing back whatever csv.writer writes.
+    """
+    def write(self, value):
+        return value
+
+
+def csv_lines(fields, rows):
+    writer = csv.writer(LineBuffer())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([
+            "|".join(value) if isinstance(value, list)
+            else value.isoformat() if isinstance(value, datetime.datetime)
+            else value
+            for value in (row[name] for name in fields)
+        ])
+
+
+ENCODERS = {
+    "ndjson": (ndjson_lines, "application/x-ndjson"),
+    "csv": (csv_lines, "text/csv"),
+}
+
+
+def export_lines(kind, fmt, **options):
+    """
+    Return (lines, content type) for a full export.
+    """
+    if fmt not in ENCODERS:
+        raise ExportError(f"Unknown export format: {fmt}")
+    encode, content_type = ENCODERS[fmt]
+    fields, rows = export_rows(kind, **options)
+    return encode(fields, rows), content_type
@@ -0,0 +1,221 @@
+import json
+from operator import itemgetter
+
+from django.conf import settings
+from django.db.models.functions import Substr
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import ISO_8601, api_settings
+
+from .models import User, Post, Category, Tag
+from .queries import EXCERPT_LENGTH
+from .serializers import PostListSerializer, CommentSerializer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+# ======================================================
+# Fast JSON read path
+# List endpoints build their items straight from
+# .values() rows, skipping model and serializer field
+# objects. The bytes match the serializer + JSONRenderer
+# output exactly; tests compare both.
+# ======================================================
+def enabled(request=None):
+    """
+    Whether a list response may take the fast path: it is switched on,
+    DRF renders JSON as configured by default, and a DRF request
+    negotiated plain (unindented) JSON.
+    """
+    if not getattr(settings, "API_FAST_JSON", False):
+        return False
+    if not (api_settings.UNICODE_JSON and api_settings.COMPACT_JSON and api_settings.STRICT_JSON):
+        return False
+    if api_settings.DATETIME_FORMAT != ISO_8601:
+        return False
+    renderer = getattr(request, "accepted_renderer", None)
+    if renderer is not None:
+        return type(renderer) is JSONRenderer and "indent" not in request.accepted_media_type
+    return True
+
+
+def dumps(data):
+    """
+    Encode like JSONRenderer (compact, unescaped unicode, no NaN),
+    with orjson when it is installed.
+    """
+    if orjson is not None:
+        content = orjson.dumps(data)
+    else:
+        content = json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+    # JSONRenderer escapes these for JavaScript embedding
+    return content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+
+def json_response(data, allow, status=200):
+    """
+    The response, with the headers DRF's finalize_response adds:
+    Allow (the view's methods) and Vary: Accept.
+    """
+    response = HttpResponse(dumps(data), content_type="application/json", status=status)
+    response["Allow"] = allow
+    patch_vary_headers(response, ["Accept"])
+    return response
+
+
+def format_datetime(value):
+    """
+    DRF's DateTimeField output: ISO 8601 in the current time zone, UTC as "Z".
+    """
+    if value is None:
+        return None
+    if settings.USE_TZ:
+        value = value.astimezone(timezone.get_current_timezone())
+    value = value.isoformat()
+    return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+
+# ======================================================
+# Field builders
+# Each serializer field maps to the columns it needs and
+# a function turning a row into its value.
+# ======================================================
+picture_storage = User._meta.get_field("profile_picture").storage
+
+
+def author_summary(row):
+    picture = row["author__profile_picture"]
+    return {
+        "id": row["author_id"],
+        "username": row["author__username"],
+        "profile_picture": picture_storage.url(picture) if picture else None,
+    }
+
+
+def column(name):
+    return (name,), itemgetter(name)
+
+
+def date_column(name):
+    return (name,), lambda row: format_datetime(row[name])
+
+
+AUTHOR = (("author_id", "author__username", "author__profile_picture"), author_summary)
+
+POST_FIELDS = {
+    "id": column("id"),
+    "title": column("title"),
+    "excerpt": column("excerpt"),
+    "author": AUTHOR,
+    "status": column("status"),
+    "publication_date": date_column("publication_date"),
+    "updated_at": date_column("updated_at"),
+    "comment_count": column("comment_count"),
+    "reply_count": column("reply_count"),
+    "last_activity": date_column("last_activity"),
+}
+
+COMMENT_FIELDS = {
+    "id": column("id"),
+    "post": column("post_id"),
+    "parent_comment": column("parent_comment_id"),
+    "author": AUTHOR,
+    "content": column("content"),
+    "depth": column("depth"),
+    "created_date": date_column("created_date"),
+    "updated_at": date_column("updated_at"),
+}
+
+# Post relations read as summaries, in id order like SummaryField
+POST_LINKS = {"categories": Category, "tags": Tag}
+
+
+def field_names(serializer_class, fields=None):
+    return [name for name in serializer_class.Meta.fields if not fields or name in fields]
+
+
+def columns(spec, names, always=()):
+    wanted = dict.fromkeys(always)
+    for name in names:
+        if name in spec:
+            wanted.update(dict.fromkeys(spec[name][0]))
+    return list(wanted)
+
+
+def build_items(rows, spec, names, links=None):
+    getters = [
+        (name, (lambda row, found=links[name]: found.get(row["id"], [])) if name in POST_LINKS else spec[name][1])
+        for name in names
+    ]
+    return [{name: get(row) for name, get in getters} for row in rows]
+
+
+# ======================================================
+# Posts
+# ======================================================
+def post_rows(posts, fields=None):
+    """
+    A .values() queryset with the columns PostListSerializer's fields
+    need, plus those the paginator and ETag read.
+    """
+    names = field_names(PostListSerializer, fields)
+    if "excerpt" in names:
+        posts = posts.annotate(excerpt=Substr("content", 1, EXCERPT_LENGTH))
+    return posts.values(*columns(POST_FIELDS, names, always=("id", "publication_date", "updated_at")))
+
+
+def link_queries(rows, fields=None):
+    """
+    One values_list query per requested relation, yielding
+    (post id, id, name, slug) in the prefetches' order.
+    """
+    ids = [row["id"] for row in rows]
+    queries = {}
+    for name, model in POST_LINKS.items():
+        if name not in field_names(PostListSerializer, fields):
+            continue
+        through = getattr(Post, name).through
+        target = getattr(Post, name).field.m2m_reverse_field_name()
+        queries[name] = (
+            through.objects.filter(post_id__in=ids)
+            .order_by("post_id", f"{target}_id")
+            .values_list("post_id", f"{target}_id", f"{target}__name", f"{target}__slug")
+        )
+    return queries
+
+
+def group_links(link_rows):
+    grouped = {}
+    for post_id, pk, name, slug in link_rows:
+        grouped.setdefault(post_id, []).append({"id": pk, "name": name, "slug": slug})
+    return grouped
+
+
+def post_items(rows, fields=None):
+    links = {name: group_links(query) for name, query in link_queries(rows, fields).items()}
+    return build_items(rows, POST_FIELDS, field_names(PostListSerializer, fields), links)
+
+
+async def apost_items(rows, fields=None):
+    links = {
+        name: group_links([link async for link in query])
+        for name, query in link_queries(rows, fields).items()
+    }
+    return build_items(rows, POST_FIELDS, field_names(PostListSerializer, fields), links)
+
+
+# ======================================================
+# Comments
+# ======================================================
+def comment_rows(comments, fields=None):
+    names = field_names(CommentSerializer, fields)
+    return comments.values(*columns(COMMENT_FIELDS, names, always=("id",)))
+
+
+def comment_items(rows, fields=None):
+    return build_items(rows, COMMENT_FIELDS, field_names(CommentSerializer, fields))
@@ -0,0 +1,455 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.text import slugify
+
+from .caching import bump, version_key
+from .counters import refresh_counters
+from .models import User, Post, Comment, Category, Tag, ImportCheckpoint
+from .search import get_backend
+
+
+IMPORT_BATCH_SIZE = 1000
+
+# Malformed records listed in the report; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+
+
+class ContentImportError(ValueError):
+    """
+    Raised for an import that cannot run (unknown kind, bad file).
+    """
+
+
+class MalformedRecord(ValueError):
+    """
+    Stands in for a record that could not be read, so it is
+    skipped and reported instead of ending the import.
+    """
+
+
+# ======================================================
+# Reading
+# Records flow through generators, so only one batch is
+# held in memory at a time.
+# ======================================================
+def read_records(path, fmt=None):
+    """
+    Yield one dict per NDJSON line or CSV row, or a MalformedRecord
+    for a line that is not a JSON object.
+    The format defaults to the file extension.
+    """
+    fmt = fmt or ("csv" if path.endswith(".csv") else "ndjson")
+    with open(path, encoding="utf-8", newline="") as source:
+        if fmt == "csv":
+            yield from csv.DictReader(source)
+        else:
+            for line in source:
+                if line.strip():
+                    try:
+                        record = json.loads(line)
+                    except ValueError as exc:
+                        yield MalformedRecord(f"Invalid JSON: {exc}")
+                        continue
+                    yield record if isinstance(record, dict) else MalformedRecord("Not a JSON object")
+
+
+def batched(records, size):
+    records = iter(records)
+    while batch := list(islice(records, size)):
+        yield batch
+
+
+def split_names(value):
+    """
+    Taxonomy names come as a list (NDJSON) or "|"-joined (CSV).
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split("|")
+    return [name.strip() for name in value if name.strip()]
+
+
+def record_id(record, name="id"):
+    value = record.get(name)
+    return int(value) if value not in (None, "") else None
+
+
+def record_date(record, name):
+    """
+    An aware datetime; dates without an offset are in TIME_ZONE.
+    """
+    value = record.get(name)
+    if not value:
+        return None
+    date = parse_datetime(value)
+    if date is None:
+        raise ValueError(f"Invalid {name}: {value!r}")
+    if settings.USE_TZ and timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+# ======================================================
+# Taxonomy lookup
+# ======================================================
+class SlugMap:
+    """
+    In-memory map of Category or Tag names and slugs to ids.
+    Unknown names are created in one bulk insert per batch.
+    """
+    def __init__(self, model):
+        self.model = model
+        self.ids = {}
+        for pk, name, slug in model.objects.values_list("pk", "name", "slug"):
+            self.ids[name] = self.ids[slug] = pk
+
+    def resolve(self, names):
+        missing = {}
+        for name in names:
+            if name not in self.ids and slugify(name) not in self.ids:
+                missing.setdefault(slugify(name), name)
+        missing.pop("", None)
+
+        if missing:
+            self.model.objects.bulk_create(
+                [self.model(name=name, slug=slug) for slug, name in missing.items()],
+                ignore_conflicts=True,
+            )
+            created = self.model.objects.filter(slug__in=missing).values_list("pk", "name", "slug")
+            for pk, name, slug in created:
+                self.ids[name] = self.ids[slug] = pk
+
+        ids = (self.ids.get(name) or self.ids.get(slugify(name)) for name in names)
+        return list(dict.fromkeys(pk for pk in ids if pk))
+
+
+# ======================================================
+# Importers
+# Each batch is written in one transaction with bulk
+# inserts, then the side effects that model signals would
+# have run (search index, counters, caches) are applied.
+# ======================================================
+class BaseImporter:
+    model = None
+
+    def __init__(self, workers=None):
+        self.workers = workers
+        self.skipped = 0
+        self.explicit_ids = False
+
+    # Id and date fields of a record, checked before its batch is written
+    id_fields = ("id",)
+    date_fields = ()
+
+    def import_batch(self, records):
+        """
+        Write one batch; returns the number of objects created.
+        """
+        raise NotImplementedError
+
+    def check(self, record):
+        """
+        Raise ValueError (or TypeError) for a record that cannot be imported.
+        """
+        if isinstance(record, MalformedRecord):
+            raise record
+        for name in self.id_fields:
+            record_id(record, name)
+        for name in self.date_fields:
+            record_date(record, name)
+
+    def new_object(self, record, **fields):
+        pk = record_id(record)
+        self.explicit_ids |= pk is not None
+        return self.model(pk=pk, **fields)
+
+    def close(self):
+        # Explicit ids leave database sequences behind the data
+        if self.explicit_ids:
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), [self.model]):
+                    cursor.execute(sql)
+
+
+class UserImporter(BaseImporter):
+    """
+    Records: username, email, password, role, first_name, last_name, bio.
+    Existing usernames or emails are skipped.
+    """
+    model = User
+
+    def __init__(self, workers=None):
+        super().__init__(workers)
+        self.pool = None
+
+    def hash_passwords(self, passwords):
+        # Hashing is deliberately slow; spread it over all cores
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        workers = self.workers or os.cpu_count() or 1
+        return list(self.pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+    def import_batch(self, records):
+        usernames = {record.get("username") for record in records}
+        emails = {record.get("email") for record in records}
+        taken = set()
+        for username, email in User.objects.filter(
+            Q(username__in=usernames) | Q(email__in=emails)
+        ).values_list("username", "email"):
+            taken |= {username, email}
+
+        # Skip existing and repeated users before paying for hashing
+        valid = []
+        for record in records:
+            username, email = record.get("username"), record.get("email")
+            if username and email and not {username, email} & taken:
+                valid.append(record)
+                taken |= {username, email}
+        self.skipped += len(records) - len(valid)
+        if not valid:
+            return 0
+
+        passwords = self.hash_passwords([record.get("password") or None for record in valid])
+        users = [
+            self.new_object(
+                record,
+                username=record["username"],
+                email=record["email"],
+                password=password,
+                role=record.get("role") if record.get("role") in ("author", "reader") else "reader",
+                first_name=record.get("first_name") or "",
+                last_name=record.get("last_name") or "",
+                bio=record.get("bio") or None,
+            )
+            for record, password in zip(valid, passwords)
+        ]
+        User.objects.bulk_create(users, batch_size=IMPORT_BATCH_SIZE)
+        return len(users)
+
+    def close(self):
+        super().close()
+        if self.pool is not None:
+            self.pool.shutdown()
+
+
+def author_ids(records):
+    usernames = {record.get("author") for record in records} - {None, ""}
+    return dict(User.objects.filter(username__in=usernames).values_list("username", "pk"))
+
+
+def set_dates(model, objs, dates, field):
+    """
+    Restore imported timestamps that auto_now_add overwrote on insert.
+    """
+    dated = []
+    for obj, date in zip(objs, dates):
+        if date:
+            setattr(obj, field, date)
+            dated.append(obj)
+    if dated:
+        model.objects.bulk_update(dated, [field], batch_size=IMPORT_BATCH_SIZE)
+
+
+class PostImporter(BaseImporter):
+    """
+    Records: title, content, status, author (username), publication_date,
+    categories and tags (names, created when missing).
+    """
+    model = Post
+    date_fields = ("publication_date",)
+
+    def __init__(self, workers=None):
+        super().__init__(workers)
+        self.categories = SlugMap(Category)
+        self.tags = SlugMap(Tag)
+
+    def import_batch(self, records):
+        authors = author_ids(records)
+        valid = [record for record in records if record.get("title") and record.get("author") in authors]
+        self.skipped += len(records) - len(valid)
+        if not valid:
+            return 0
+
+        # Create the batch's new categories and tags up front, in one insert each
+        links = {}
+        for field, taxonomy in (("categories", self.categories), ("tags", self.tags)):
+            names = [split_names(record.get(field)) for record in valid]
+            taxonomy.resolve([name for row in names for name in row])
+            links[field] = [taxonomy.resolve(row) for row in names]
+
+        with transaction.atomic():
+            posts = Post.objects.bulk_create(
+                [
+                    self.new_object(
+                        record,
+                        title=record["title"],
+                        content=record.get("content") or "",
+                        status=record.get("status") if record.get("status") in ("draft", "published") else "draft",
+                        author_id=authors[record["author"]],
+                    )
+                    for record in valid
+                ],
+                batch_size=IMPORT_BATCH_SIZE,
+            )
+            set_dates(Post, posts, [record_date(record, "publication_date") for record in valid], "publication_date")
+
+            for field, rows in links.items():
+                through = getattr(Post, field).through
+                target = f"{Post._meta.get_field(field).m2m_reverse_field_name()}_id"
+                through.objects.bulk_create(
+                    [through(post_id=post.pk, **{target: pk}) for post, row in zip(posts, rows) for pk in row],
+                    batch_size=IMPORT_BATCH_SIZE,
+                )
+
+            post_ids = [post.pk for post in posts]
+            get_backend().index_posts(post_ids)
+            bump(version_key("feed"), version_key("categories"), version_key("tags"))
+        return len(posts)
+
+
+class CommentImporter(BaseImporter):
+    """
+    Records: post (id), parent_comment (id), author (username),
+    content, created_date. Parents must be imported first.
+    """
+    model = Comment
+    id_fields = ("id", "post", "parent_comment")
+    date_fields = ("created_date",)
+
+    def import_batch(self, records):
+        authors = author_ids(records)
+        post_ids = {record_id(record, "post") for record in records}
+        posts = set(Post.objects.filter(pk__in=post_ids).values_list("pk", flat=True))
+        parents = {record_id(record, "parent_comment") for record in records} - {None}
+        known = set(Comment.objects.filter(pk__in=parents).values_list("pk", flat=True)) | {None}
+
+        # A reply is kept only if its parent exists or was kept earlier in the batch
+        valid = []
+        for record in records:
+            if (
+                record.get("author") in authors
+                and record_id(record, "post") in posts
+                and record_id(record, "parent_comment") in known
+            ):
+                valid.append(record)
+                known.add(record_id(record))
+        self.skipped += len(records) - len(valid)
+        if not valid:
+            return 0
+
+        with transaction.atomic():
+            comments = Comment.objects.bulk_create(
+                [
+                    self.new_object(
+                        record,
+                        post_id=record_id(record, "post"),
+                        parent_comment_id=record_id(record, "parent_comment"),
+                        author_id=authors[record["author"]],
+                        content=record.get("content") or "",
+                    )
+                    for record in valid
+                ],
+                batch_size=IMPORT_BATCH_SIZE,
+            )
+            set_dates(Comment, comments, [record_date(record, "created_date") for record in valid], "created_date")
+
+            post_ids = {comment.post_id for comment in comments}
+            refresh_counters(post_ids)
+            bump(version_key("feed"), *(
+                key for pk in post_ids for key in (version_key("thread", pk), version_key("post", pk))
+            ))
+        return len(comments)
+
+
+IMPORTERS = {
+    "users": UserImporter,
+    "posts": PostImporter,
+    "comments": CommentImporter,
+}
+
+
+# ======================================================
+# Checkpoints
+# The number of records committed so far, stored in the
+# database and saved in each batch's transaction, so an
+# interrupted import resumes exactly after the last
+# committed batch and never inserts a record twice.
+# ======================================================
+class Checkpoint:
+
+    def __init__(self, name):
+        self.name = name
+
+    def load(self, source):
+        state = ImportCheckpoint.objects.filter(name=self.name).values_list("source", "position").first()
+        return state[1] if state and state[0] == os.path.abspath(source) else 0
+
+    def save(self, source, position):
+        ImportCheckpoint.objects.update_or_create(
+            name=self.name, defaults={"source": os.path.abspath(source), "position": position},
+        )
+
+    def clear(self):
+        ImportCheckpoint.objects.filter(name=self.name).delete()
+
+
+def run_import(path, kind, fmt=None, batch_size=IMPORT_BATCH_SIZE, workers=None,
+               checkpoint=None, resume=False, progress=None):
+    """
+    Import `kind` records from `path` batch by batch.
+    Returns a report dict with counts, elapsed seconds and throughput.
+    """
+    if kind not in IMPORTERS:
+        raise ContentImportError(f"Unknown import kind: {kind}")
+
+    checkpoint = Checkpoint(checkpoint or f"{path}.checkpoint")
+    start = checkpoint.load(path) if resume else 0
+    importer = IMPORTERS[kind](workers=workers)
+
+    report = {"resumed_at": start, "read": 0, "imported": 0, "skipped": 0, "malformed": 0, "errors": []}
+    started = time.monotonic()
+    try:
+        records = islice(read_records(path, fmt), start, None)
+        for batch in batched(records, batch_size):
+            position = start + report["read"]
+            valid = []
+            for number, record in enumerate(batch, start=position + 1):
+                try:
+                    importer.check(record)
+                except (TypeError, ValueError) as exc:
+                    report["malformed"] += 1
+                    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                        report["errors"].append(f"Record {number}: {exc}")
+                else:
+                    valid.append(record)
+
+            with transaction.atomic():
+                if valid:
+                    report["imported"] += importer.import_batch(valid)
+                checkpoint.save(path, position + len(batch))
+            report["read"] += len(batch)
+            report["skipped"] = importer.skipped
+            if progress:
+                progress(report)
+    except (OSError, ValueError) as exc:
+        raise ContentImportError(str(exc)) from exc
+    finally:
+        importer.close()
+
+    checkpoint.clear()
+    report["seconds"] = time.monotonic() - started
+    report["per_second"] = report["read"] / report["seconds"] if report["seconds"] else 0.0
+    return report
@@ -0,0 +1,161 @@
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+
+# Longest wait between two attempts of a failing job, in seconds
+MAX_BACKOFF = 3600
+
+
+# ======================================================
+# Task registry
+# ======================================================
+class Task:
+    def __init__(self, fn, name, retries, backoff, concurrency):
+        self.fn = fn
+        self.name = name
+        self.retries = retries
+        self.backoff = backoff
+        self.concurrency = concurrency
+
+    def delay_after(self, attempts):
+        """
+        Exponential backoff with jitter, so failing jobs spread out.
+        """
+        delay = min(self.backoff * 2 ** (attempts - 1), MAX_BACKOFF)
+        return delay * random.uniform(0.5, 1.0)
+
+
+TASKS = {}
+
+
+def task(name=None, retries=5, backoff=2.0, concurrency=None):
+    """
+    Register a function as a job task.
+    `retries` extra attempts follow a failure, `backoff` seconds apart
+    and doubling; `concurrency` caps how many run at once across workers.
+    """
+    def register(fn):
+        TASKS[name or fn.__name__] = Task(fn, name or fn.__name__, retries, backoff, concurrency)
+        return fn
+    return register
+
+
+# ======================================================
+# Enqueueing
+# The job row commits (or rolls back) with the change
+# that needs it, so no job runs against unsaved data.
+# ======================================================
+def enqueue(name, *args, key=None, delay=0):
+    """
+    Queue task `name` with JSON-serializable `args`. Returns the Job,
+    or None if `key` is already pending or the task ran eagerly
+    (JOBS_EAGER, the default while DEBUG is on).
+    """
+    if settings.JOBS_EAGER:
+        TASKS[name].fn(*args)
+        return None
+
+    job = Job(task=name, args=list(args), key=key, run_at=timezone.now() + timedelta(seconds=delay))
+    if key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        return None
+    return job
+
+
+# ======================================================
+# Running
+# Workers claim a job with a conditional UPDATE, so two
+# workers never run the same job; a claim is a lease,
+# and a job whose worker died is claimed again later.
+# ======================================================
+def claimable(now):
+    return Q(status=Job.PENDING) | Q(status=Job.RUNNING, locked_until__lte=now)
+
+
+def at_capacity(now):
+    """
+    Names of tasks already running their `concurrency` jobs at once.
+    """
+    limited = {name: t.concurrency for name, t in TASKS.items() if t.concurrency}
+    if not limited:
+        return set()
+    running = {}
+    for name in Job.objects.filter(
+        status=Job.RUNNING, locked_until__gt=now, task__in=limited,
+    ).values_list("task", flat=True):
+        running[name] = running.get(name, 0) + 1
+    return {name for name, limit in limited.items() if running.get(name, 0) >= limit}
+
+
+def claim(batch=10):
+    """
+    Take the next due job, or return None when none is ready.
+    """
+    now = timezone.now()
+    candidates = (
+        Job.objects.filter(claimable(now), run_at__lte=now)
+        .exclude(task__in=at_capacity(now))
+        .order_by("run_at", "id")
+        .values_list("pk", "task")[:batch]
+    )
+    lease = now + timedelta(seconds=settings.JOBS_LEASE_SECONDS)
+    for pk, name in candidates:
+        claimed = Job.objects.filter(claimable(now), pk=pk).update(
+            status=Job.RUNNING, locked_until=lease, attempts=F("attempts") + 1,
+        )
+        if not claimed:
+            continue
+        limit = getattr(TASKS.get(name), "concurrency", None)
+        # Another worker may have claimed one at the same time: the older job wins
+        if limit and Job.objects.filter(
+            status=Job.RUNNING, locked_until__gt=now, task=name, pk__lt=pk,
+        ).count() >= limit:
+            Job.objects.filter(pk=pk).update(status=Job.PENDING, locked_until=None, attempts=F("attempts") - 1)
+            continue
+        return Job.objects.get(pk=pk)
+    return None
+
+
+def run_job(job):
+    """
+    Run a claimed job; delete it on success, or schedule its retry.
+    Returns True if it succeeded.
+    """
+    registered = TASKS.get(job.task)
+    try:
+        if registered is None:
+            raise LookupError(f"Unknown task {job.task!r}")
+        with transaction.atomic():
+            registered.fn(*job.args)
+    except Exception:
+        fail(job, registered, traceback.format_exc())
+        return False
+    Job.objects.filter(pk=job.pk).delete()
+    return True
+
+
+def fail(job, registered, error):
+    jobs = Job.objects.filter(pk=job.pk)
+    if registered is None or job.attempts > registered.retries:
+        jobs.update(status=Job.FAILED, locked_until=None, last_error=error)
+        return
+    run_at = timezone.now() + timedelta(seconds=registered.delay_after(job.attempts))
+    try:
+        with transaction.atomic():
+            jobs.update(status=Job.PENDING, locked_until=None, run_at=run_at, last_error=error)
+    except IntegrityError:
+        # The same key was queued again meanwhile; that job redoes the work
+        jobs.delete()
@@ -0,0 +1,120 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from rest_framework.authtoken.models import Token
+
+from base.models import User, Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Load the same pages through the sync (WSGI) views and the async "
+        "(ASGI) views under /async/, and compare throughput and latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", required=True, help="User the requests are made as.")
+        parser.add_argument("--requests", type=int, default=200, help="Requests per page and path.")
+        parser.add_argument("--concurrency", type=int, default=20, help="Requests in flight at once.")
+        parser.add_argument(
+            "--threads", type=int, default=1,
+            help="Threads of the sync worker (the async side always runs on one event loop).",
+        )
+        parser.add_argument("--no-cache", action="store_true", help="Measure with caching disabled.")
+
+    def handle(self, *args, **options):
+        try:
+            self.user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']}")
+        self.token = Token.objects.get_or_create(user=self.user)[0].key
+
+        # One session shared by every simulated client
+        client = Client()
+        client.force_login(self.user)
+        self.cookies = client.cookies
+
+        post = Post.objects.filter(status="published").order_by("-pk").first()
+        if post is None:
+            raise CommandError("Needs at least one published post.")
+
+        pages = [
+            ("home", "/"),
+            ("post detail", f"/post/{post.pk}/"),
+            ("API post list", "/api/posts/"),
+            ("API post", f"/api/posts/{post.pk}/"),
+        ]
+
+        overrides = {"ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"]}
+        if options["no_cache"]:
+            overrides["CACHES"] = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+
+        self.stdout.write(f"{'page':<16}{'path':<8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        with override_settings(**overrides):
+            for name, url in pages:
+                for label, run in (("wsgi", self.run_sync), ("asgi", self.run_async)):
+                    seconds, latencies = run(url, options)
+                    self.report(name, label, options["requests"], seconds, latencies)
+
+    def report(self, name, label, requests, seconds, latencies):
+        p50 = statistics.median(latencies) * 1000
+        p95 = statistics.quantiles(latencies, n=20)[-1] * 1000 if len(latencies) > 1 else p50
+        self.stdout.write(f"{name:<16}{label:<8}{requests / seconds:>10.1f}{p50:>10.1f}{p95:>10.1f}")
+
+    # ---------- sync (WSGI handler) ----------
+    def run_sync(self, url, options):
+        """
+        `concurrency` clients share a worker of `threads` threads;
+        latency includes the wait for a free thread.
+        """
+        local = threading.local()
+        worker = threading.Semaphore(options["threads"])
+        headers = {"Authorization": f"Token {self.token}"} if url.startswith("/api/") else {}
+
+        def fetch(_):
+            if not hasattr(local, "client"):
+                local.client = Client()
+                local.client.cookies = SimpleCookie(self.cookies)
+            started = time.perf_counter()
+            with worker:
+                response = local.client.get(url, headers=headers)
+            assert response.status_code == 200, response.status_code
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as clients:
+            latencies = list(clients.map(fetch, range(options["requests"])))
+        return time.perf_counter() - started, latencies
+
+    # ---------- async (ASGI handler) ----------
+    def run_async(self, url, options):
+        """
+        `concurrency` clients share one event loop.
+        """
+        path = "/async" + url
+        headers = {"Authorization": f"Token {self.token}"} if url.startswith("/api/") else {}
+
+        async def run():
+            client = AsyncClient()
+            client.cookies = SimpleCookie(self.cookies)
+            slots = asyncio.Semaphore(options["concurrency"])
+
+            async def fetch():
+                async with slots:
+                    started = time.perf_counter()
+                    response = await client.get(path, headers=headers)
+                    assert response.status_code == 200, response.status_code
+                    return time.perf_counter() - started
+
+            started = time.perf_counter()
+            latencies = await asyncio.gather(*(fetch() for _ in range(options["requests"])))
+            return time.perf_counter() - started, list(latencies)
+
+        return asyncio.run(run())
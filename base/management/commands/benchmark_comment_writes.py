@@ -0,0 +1,107 @@
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.cookies import SimpleCookie
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+from django.urls import reverse
+
+from base.models import User, Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure requests per second on the comment write path (POST to "
+        "post_detail) in a throwaway test database, under the current "
+        "database profile or under each profile given with --profiles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="Comments to post.")
+        parser.add_argument("--threads", type=int, default=8, help="Concurrent writers.")
+        parser.add_argument(
+            "--profiles", nargs="+", choices=list(settings.DATABASE_PROFILES),
+            help="Run once per BLOG_DB_PROFILE, each in its own process.",
+        )
+
+    def handle(self, *args, **options):
+        if options["profiles"]:
+            for profile in options["profiles"]:
+                subprocess.run(
+                    [
+                        sys.executable, "-m", "django", "benchmark_comment_writes",
+                        "--requests", str(options["requests"]), "--threads", str(options["threads"]),
+                    ],
+                    env={**os.environ, "BLOG_DB_PROFILE": profile},
+                    cwd=settings.BASE_DIR,
+                    check=False,
+                )
+            return
+
+        verbosity = options["verbosity"]
+        with tempfile.TemporaryDirectory() as scratch:
+            if connection.vendor == "sqlite":
+                # A file, not the in-memory default: WAL and locking need one
+                connection.settings_dict["TEST"]["NAME"] = os.path.join(scratch, "benchmark.sqlite3")
+            setup_test_environment()
+            old_config = setup_databases(verbosity, interactive=False)
+            try:
+                user = User.objects.create_user(username="bench", email="bench@example.com", role="author")
+                post = Post.objects.create(title="Write benchmark", content="", author=user)
+                seconds, latencies, errors = self.run(user, post, options)
+            finally:
+                teardown_databases(old_config, verbosity)
+                teardown_test_environment()
+
+        profile = os.environ.get("BLOG_DB_PROFILE", "sqlite")
+        p50 = statistics.median(latencies) * 1000
+        p95 = statistics.quantiles(latencies, n=20)[-1] * 1000 if len(latencies) > 1 else p50
+        self.stdout.write(
+            f"{profile} ({connection.vendor}): {options['requests'] / seconds:.1f} req/s, "
+            f"p50 {p50:.1f} ms, p95 {p95:.1f} ms, {errors} errors "
+            f"({options['requests']} comments, {options['threads']} threads)"
+        )
+
+    def run(self, user, post, options):
+        client = Client()
+        client.force_login(user)
+        cookies = client.cookies
+        url = reverse("post_detail", args=[post.pk])
+
+        remaining = iter(range(options["requests"]))
+        lock = threading.Lock()
+        latencies, errors = [], []
+
+        def writer():
+            client = Client(raise_request_exception=False)
+            client.cookies = SimpleCookie(cookies)
+            try:
+                while True:
+                    with lock:
+                        if next(remaining, None) is None:
+                            return
+                    started = time.perf_counter()
+                    response = client.post(url, {"comment": "Benchmark comment"})
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        (latencies if response.status_code == 302 else errors).append(elapsed)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=writer) for _ in range(options["threads"])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started, latencies or [0.0], len(errors)
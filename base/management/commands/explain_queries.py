@@ -0,0 +1,122 @@
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from base.models import User, Post
+
+
+# Plan lines that mean every row of a table is read, or rows are
+# sorted after the fact (SQLite "EXPLAIN QUERY PLAN" and PostgreSQL "EXPLAIN")
+FULL_SCAN = re.compile(r"^SCAN (\w+)$|Seq Scan on (\w+)")
+SORT = re.compile(r"USE TEMP B-TREE FOR (?:ORDER BY|DISTINCT)|^\W*Sort\b")
+
+
+class QueryRecorder:
+    """
+    Execute wrapper keeping each distinct SELECT a request runs,
+    with the parameters of its first run.
+    """
+    def __init__(self):
+        self.queries = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith("SELECT"):
+            self.queries.setdefault(sql, params)
+        return execute(sql, params, many, context)
+
+
+def explain(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+        return [str(row[-1]) for row in cursor.fetchall()]
+
+
+def plan_problems(sql, plan):
+    """
+    Return the problems in a query plan. Scanning a whole table is
+    only a problem when the query filters it: a full listing has to
+    read every row anyway.
+    """
+    problems = []
+    for line in plan:
+        scan = FULL_SCAN.search(line.strip())
+        if scan and " WHERE " in sql:
+            problems.append(f"full scan of {scan.group(1) or scan.group(2)}")
+        elif SORT.search(line):
+            problems.append("sort without an index")
+    return problems
+
+
+class Command(BaseCommand):
+    help = (
+        "Request the main pages and API endpoints as a user, EXPLAIN every "
+        "query they run and report filtered full table scans and unindexed "
+        "sorts. Fails when any are found. Run against realistic data: on "
+        "tiny tables PostgreSQL prefers sequential scans."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", required=True, help="User the requests are made as.")
+        parser.add_argument("--warn-only", action="store_true", help="Report problems without failing.")
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']}")
+        post = Post.objects.filter(status="published").order_by("-pk").first()
+        if post is None:
+            raise CommandError("Needs at least one published post.")
+
+        pages = [
+            ("home", reverse("home")),
+            ("post detail", reverse("post_detail", args=[post.pk])),
+            ("dashboard", reverse("dashboard")),
+            ("API post list", reverse("api-posts-list")),
+            ("API post", reverse("api-posts-detail", args=[post.pk])),
+            ("API post comments", reverse("api-posts-comments", args=[post.pk])),
+            ("API comment list", reverse("api-comments-list")),
+            ("API categories", reverse("api-categories-list")),
+            ("API tags", reverse("api-tags-list")),
+        ]
+
+        # Caching would hide the queries; the login and token are rolled back
+        overrides = {
+            "ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"],
+            "CACHES": {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+        }
+        with override_settings(**overrides), transaction.atomic():
+            client = Client()
+            client.force_login(user)
+            token = Token.objects.get_or_create(user=user)[0].key
+            flagged = sum(self.check_page(client, token, *page) for page in pages)
+            transaction.set_rollback(True)
+
+        if flagged and not options["warn_only"]:
+            raise CommandError(f"{flagged} queries need an index.")
+        self.stdout.write(self.style.SUCCESS(f"Checked {len(pages)} pages, {flagged} queries need an index."))
+
+    def check_page(self, client, token, name, url):
+        recorder = QueryRecorder()
+        headers = {"Authorization": f"Token {token}"} if url.startswith("/api/") else {}
+        with connection.execute_wrapper(recorder):
+            response = client.get(url, headers=headers)
+
+        flagged = 0
+        self.stdout.write(f"{name} ({url}, {response.status_code}): {len(recorder.queries)} queries")
+        for sql, params in recorder.queries.items():
+            plan = explain(sql, params)
+            problems = plan_problems(sql, plan)
+            if problems:
+                flagged += 1
+                self.stdout.write(self.style.WARNING(f"  {', '.join(problems)}: {sql[:200]}"))
+            if problems or self.verbosity > 1:
+                for line in plan:
+                    self.stdout.write(f"      {line}")
+        return flagged
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from base.export import ENCODERS, EXPORT_CHUNK_SIZE, ExportError, export_lines
+
+
+class Command(BaseCommand):
+    help = "Stream posts or comments as NDJSON or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=["posts", "comments"])
+        parser.add_argument("--format", dest="fmt", choices=list(ENCODERS), default="ndjson")
+        parser.add_argument("--output", help="File to write to (default: stdout).")
+        parser.add_argument("--author", help="Username of the author.")
+        parser.add_argument("--status", choices=["draft", "published"])
+        parser.add_argument("--tag", help="Tag slug.")
+        parser.add_argument("--since", help="Earliest date (YYYY-MM-DD or ISO datetime).")
+        parser.add_argument("--until", help="Latest date or datetime, inclusive.")
+        parser.add_argument(
+            "--chunk-size", type=int, default=EXPORT_CHUNK_SIZE,
+            help="Rows fetched per database round trip.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            lines, _ = export_lines(
+                options["kind"], options["fmt"], chunk_size=options["chunk_size"],
+                **{name: options[name] for name in ("author", "status", "tag", "since", "until")},
+            )
+        except ExportError as exc:
+            raise CommandError(exc)
+
+        if not options["output"]:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+
+        rows = 0
+        with open(options["output"], "w", encoding="utf-8", newline="") as out:
+            for line in lines:
+                out.write(line)
+                rows += 1
+        if options["fmt"] == "csv":
+            rows -= 1
+        self.stderr.write(self.style.SUCCESS(f"Exported {rows} {options['kind']} to {options['output']}."))
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from base.importer import IMPORT_BATCH_SIZE, IMPORTERS, ContentImportError, run_import
+
+
+class Command(BaseCommand):
+    help = (
+        "Import users, posts or comments from NDJSON or CSV in batches. "
+        "Import users first, then posts, then comments."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=list(IMPORTERS))
+        parser.add_argument("path", help="NDJSON or CSV file (format taken from the extension).")
+        parser.add_argument("--format", dest="fmt", choices=["ndjson", "csv"])
+        parser.add_argument(
+            "--batch-size", type=int, default=IMPORT_BATCH_SIZE,
+            help="Records written per transaction.",
+        )
+        parser.add_argument(
+            "--workers", type=int,
+            help="Processes hashing passwords (default: one per CPU).",
+        )
+        parser.add_argument("--checkpoint", help="Checkpoint name (default: <path>.checkpoint).")
+        parser.add_argument(
+            "--resume", action="store_true",
+            help="Continue after the last batch recorded in the checkpoint.",
+        )
+
+    def handle(self, *args, **options):
+        def progress(report):
+            if options["verbosity"] > 1:
+                self.stdout.write(f"{report['resumed_at'] + report['read']} records read, {report['imported']} imported")
+
+        try:
+            report = run_import(
+                options["path"], options["kind"],
+                fmt=options["fmt"],
+                batch_size=options["batch_size"],
+                workers=options["workers"],
+                checkpoint=options["checkpoint"],
+                resume=options["resume"],
+                progress=progress,
+            )
+        except ContentImportError as exc:
+            raise CommandError(f"{exc} (rerun with --resume to continue)")
+
+        if report["resumed_at"]:
+            self.stdout.write(f"Resumed after {report['resumed_at']} records.")
+        for error in report["errors"]:
+            self.stderr.write(self.style.WARNING(error))
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['imported']} {options['kind']} from {report['read']} records "
+            f"({report['skipped']} skipped, {report['malformed']} malformed) in {report['seconds']:.1f}s, "
+            f"{report['per_second']:.0f} records/s."
+        ))
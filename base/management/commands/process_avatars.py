@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from base.avatars import needs_processing, process_avatar
+from base.models import User
+
+
+class Command(BaseCommand):
+    help = "Render resized avatar variants for profile pictures that lack them."
+
+    def handle(self, *args, **options):
+        users = User.objects.exclude(profile_picture="").exclude(profile_picture=None).only(
+            "id", "profile_picture", "avatar_variants"
+        )
+        processed = 0
+        for user in users.iterator():
+            if needs_processing(user):
+                process_avatar(user.pk)
+                processed += 1
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} profile pictures."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from base.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for all posts."
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        count = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {count} posts with {type(backend).__name__}."
+        ))
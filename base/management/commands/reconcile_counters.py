@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from base.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = "Repair drifted comment counters on posts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Number of posts updated per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        repaired = reconcile_counters(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Repaired counters on {repaired} posts."))
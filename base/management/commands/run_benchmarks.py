@@ -0,0 +1,66 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+
+from base.benchmarks import DEFAULT_CORPUS, SCENARIOS, BenchmarkError, build_corpus, compare, run_scenarios
+
+
+class Command(BaseCommand):
+    help = (
+        "Build a synthetic corpus in a throwaway test database, measure "
+        "queries, wall time and peak memory of each scenario, and compare "
+        "them with a saved baseline."
+    )
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULT_CORPUS.items():
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default)
+        parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), help="Scenarios to run (default: all).")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per scenario.")
+        parser.add_argument("--baseline", help="Baseline JSON file to compare with.")
+        parser.add_argument("--save-baseline", help="Write the results to this JSON file.")
+        parser.add_argument("--time-tolerance", type=float, default=0.25, help="Allowed slowdown (0.25 = 25%%).")
+        parser.add_argument("--memory-tolerance", type=float, default=0.25, help="Allowed memory growth.")
+
+    def handle(self, *args, **options):
+        corpus = {name: options[name] for name in DEFAULT_CORPUS}
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as source:
+                baseline = json.load(source)
+            if baseline["corpus"] != corpus:
+                raise CommandError(f"The baseline was recorded on a different corpus: {baseline['corpus']}")
+
+        verbosity = options["verbosity"]
+        setup_test_environment()
+        old_config = setup_databases(verbosity, interactive=False)
+        try:
+            if verbosity:
+                self.stdout.write("Building the corpus...")
+            hot = build_corpus(**corpus)
+            results = run_scenarios(hot, options["scenarios"], options["repeat"])
+        except BenchmarkError as exc:
+            raise CommandError(exc)
+        finally:
+            teardown_databases(old_config, verbosity)
+            teardown_test_environment()
+
+        self.stdout.write(f"{'scenario':<30}{'queries':>8}{'ms':>10}{'peak KiB':>12}")
+        for name, result in results.items():
+            self.stdout.write(f"{name:<30}{result['queries']:>8}{result['ms']:>10}{result['peak_kib']:>12}")
+
+        if options["save_baseline"]:
+            with open(options["save_baseline"], "w", encoding="utf-8") as out:
+                json.dump({"corpus": corpus, "results": results}, out, indent=2)
+            self.stdout.write(f"Saved the baseline to {options['save_baseline']}.")
+
+        if baseline is not None:
+            regressions = compare(
+                results, baseline["results"], options["time_tolerance"], options["memory_tolerance"]
+            )
+            if regressions:
+                raise CommandError("Regressions against the baseline:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
@@ -0,0 +1,45 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from base.jobs import claim, run_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs. Start one process per job to run at "
+        "once; per-task concurrency limits hold across all of them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit once no job is ready instead of polling.")
+        parser.add_argument("--sleep", type=float, default=1.0, help="Seconds between polls of an empty queue.")
+        parser.add_argument("--max-jobs", type=int, default=None, help="Exit after running this many jobs.")
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        # Finish the current job on SIGTERM/SIGINT, then exit
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self.stop)
+
+        done = failed = 0
+        while not self.stopping and (options["max_jobs"] is None or done + failed < options["max_jobs"]):
+            close_old_connections()
+            job = claim()
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+                continue
+            if run_job(job):
+                done += 1
+            else:
+                failed += 1
+                self.stderr.write(f"Job {job.pk} ({job.task}) failed, attempt {job.attempts}.")
+
+        self.stdout.write(self.style.SUCCESS(f"Ran {done} jobs, {failed} failed."))
+
+    def stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,207 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates, Template
+
+
+# ======================================================
+# Per-request measurements
+# Filled in by the database, template and serializer
+# hooks below while a request runs; sync_to_async copies
+# the context, so work done in threads is counted too.
+# ======================================================
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.timings = {"db": 0.0, "template": 0.0, "serializer": 0.0}
+        self.active = set()
+
+
+request_metrics = ContextVar("request_metrics", default=None)
+
+
+@contextmanager
+def timed(name):
+    """
+    Add the time spent in the block to the current request's `name`
+    timing. Nested blocks of the same name (an included template, a
+    nested serializer) are only counted once.
+    """
+    metrics = request_metrics.get()
+    if metrics is None or name in metrics.active:
+        yield
+        return
+
+    metrics.active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += time.perf_counter() - started
+        metrics.active.discard(name)
+
+
+def time_query(execute, sql, params, many, context):
+    metrics = request_metrics.get()
+    if metrics is not None:
+        metrics.queries += 1
+    with timed("db"):
+        return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, time_query)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed("template"):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    The Django template backend, timing every render.
+    """
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class TimedSerializerMixin:
+    """
+    Time to_representation() of DRF serializers, including any
+    queries the fields trigger.
+    """
+    def to_representation(self, instance):
+        with timed("serializer"):
+            return super().to_representation(instance)
+
+
+# ======================================================
+# Histograms
+# In-process and per view: cumulative buckets for
+# Prometheus, plus a window of recent samples for the
+# p50/p95/p99 of the last requests.
+# ======================================================
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+BYTES_BUCKETS = (1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000)
+QUANTILES = (0.5, 0.95, 0.99)
+RECENT_SAMPLES = 1024
+
+
+class Series:
+    def __init__(self, size, window):
+        self.counts = [0] * size
+        self.sum = 0
+        self.count = 0
+        self.recent = deque(maxlen=window) if window else None
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, window=0):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.window = window
+        self.series = {}
+
+    def observe(self, view, value):
+        series = self.series.get(view)
+        if series is None:
+            series = self.series.setdefault(view, Series(len(self.buckets) + 1, self.window))
+        series.counts[bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+        if series.recent is not None:
+            series.recent.append(value)
+
+    def exposition(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for view, series in sorted(self.series.items()):
+            label = f'view="{escape_label(view)}"'
+            total = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series.counts):
+                total += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {total}')
+            lines.append(f"{self.name}_sum{{{label}}} {series.sum}")
+            lines.append(f"{self.name}_count{{{label}}} {series.count}")
+
+        if self.window:
+            name = f"{self.name}_recent"
+            lines += [
+                f"# HELP {name} {self.help_text} Over the last {self.window} requests.",
+                f"# TYPE {name} summary",
+            ]
+            for view, series in sorted(self.series.items()):
+                samples = sorted(series.recent)
+                label = f'view="{escape_label(view)}"'
+                for q in QUANTILES:
+                    value = samples[min(len(samples) - 1, int(q * len(samples)))]
+                    lines.append(f'{name}{{{label},quantile="{q}"}} {value}')
+                lines.append(f"{name}_sum{{{label}}} {sum(samples)}")
+                lines.append(f"{name}_count{{{label}}} {len(samples)}")
+        return lines
+
+
+def escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+HISTOGRAMS = {
+    "duration": Histogram(
+        "blog_request_duration_seconds", "Time to produce the response.", SECONDS_BUCKETS, RECENT_SAMPLES
+    ),
+    "db": Histogram("blog_request_db_seconds", "Time spent in SQL queries.", SECONDS_BUCKETS),
+    "queries": Histogram("blog_request_queries", "SQL queries run.", QUERY_BUCKETS),
+    "template": Histogram("blog_request_template_seconds", "Time spent rendering templates.", SECONDS_BUCKETS),
+    "serializer": Histogram("blog_request_serializer_seconds", "Time spent in API serializers.", SECONDS_BUCKETS),
+    "size": Histogram("blog_response_size_bytes", "Response body size.", BYTES_BUCKETS),
+}
+
+lock = threading.Lock()
+
+
+def record(view, metrics, duration, size=None):
+    """
+    Add one request's measurements to the histograms of its view.
+    """
+    values = {"duration": duration, "queries": metrics.queries, **metrics.timings}
+    if size is not None:
+        values["size"] = size
+    with lock:
+        for name, value in values.items():
+            HISTOGRAMS[name].observe(view, value)
+
+
+def exposition():
+    """
+    All histograms in the Prometheus text format.
+    """
+    with lock:
+        lines = [line for histogram in HISTOGRAMS.values() for line in histogram.exposition()]
+    return "\n".join(lines) + "\n"
+
+
+def server_timing(metrics, duration):
+    """
+    A Server-Timing header value for the browser's network panel.
+    """
+    timings = metrics.timings
+    return ", ".join([
+        f'db;dur={timings["db"] * 1000:.1f};desc="{metrics.queries} queries"',
+        f'tpl;dur={timings["template"] * 1000:.1f};desc="templates"',
+        f'ser;dur={timings["serializer"] * 1000:.1f};desc="serializers"',
+        f'total;dur={duration * 1000:.1f}',
+    ])
@@ -0,0 +1,126 @@
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+from . import metrics, staticfiles
+from .routers import RoutingState, routing_state
+
+
+# Cookie holding the time until which a client reads from the primary
+PRIMARY_COOKIE = "read_primary_until"
+
+
+# ======================================================
+# Read-your-writes for replica routing
+# ======================================================
+@sync_and_async_middleware
+def sticky_primary_middleware(get_response):
+    """
+    Track whether a request writes blog content; if it does, route the
+    client's reads to the primary for REPLICA_STICKY_SECONDS afterwards,
+    so replication lag never hides their own changes.
+    """
+    def begin(request):
+        try:
+            sticky = float(request.COOKIES.get(PRIMARY_COOKIE, 0)) > time.time()
+        except ValueError:
+            sticky = False
+        return RoutingState(primary=sticky)
+
+    def finish(response, state):
+        window = settings.REPLICA_STICKY_SECONDS
+        if state.wrote and settings.DATABASE_REPLICAS and window:
+            response.set_cookie(
+                PRIMARY_COOKIE, str(time.time() + window),
+                max_age=window, httponly=True, samesite="Lax",
+            )
+        return response
+
+    # Always reset: WSGI threads carry their context into the next request
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            state = begin(request)
+            token = routing_state.set(state)
+            try:
+                return finish(await get_response(request), state)
+            finally:
+                routing_state.reset(token)
+    else:
+        def middleware(request):
+            state = begin(request)
+            token = routing_state.set(state)
+            try:
+                return finish(get_response(request), state)
+            finally:
+                routing_state.reset(token)
+    return middleware
+
+
+# ======================================================
+# Request metrics
+# ======================================================
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """
+    Measure queries, database, template and serializer time and
+    response size per request. The figures go out in a Server-Timing
+    header and into the per-view histograms served at /metrics.
+    """
+    def finish(request, response, state, started):
+        duration = time.perf_counter() - started
+        response["Server-Timing"] = metrics.server_timing(state, duration)
+
+        match = request.resolver_match
+        view = match.view_name if match else "unmatched"
+        if view != "metrics":
+            size = None if response.streaming else len(response.content)
+            metrics.record(view, state, duration, size)
+        return response
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            state = metrics.RequestMetrics()
+            token = metrics.request_metrics.set(state)
+            started = time.perf_counter()
+            try:
+                return finish(request, await get_response(request), state, started)
+            finally:
+                metrics.request_metrics.reset(token)
+    else:
+        def middleware(request):
+            state = metrics.RequestMetrics()
+            token = metrics.request_metrics.set(state)
+            started = time.perf_counter()
+            try:
+                return finish(request, get_response(request), state, started)
+            finally:
+                metrics.request_metrics.reset(token)
+    return middleware
+
+
+# ======================================================
+# Static files
+# First in the stack, so asset requests skip sessions,
+# auth and metrics entirely.
+# ======================================================
+@sync_and_async_middleware
+def static_files_middleware(get_response):
+    """
+    Serve collected static files from STATIC_ROOT with precompressed
+    bodies and far-future caching (see base.staticfiles).
+    """
+    prefix = "/" + settings.STATIC_URL.lstrip("/")
+
+    def serve(request):
+        if request.path.startswith(prefix):
+            return staticfiles.serve(request, request.path[len(prefix):])
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            return serve(request) or await get_response(request)
+    else:
+        def middleware(request):
+            return serve(request) or get_response(request)
+    return middleware
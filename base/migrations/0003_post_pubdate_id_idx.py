@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0002_alter_category_name_alter_category_slug_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-publication_date', '-id'], name='post_pubdate_id_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:56
+
+from django.db import migrations, models
+
+
+def fill_comment_paths(apps, schema_editor):
+    Comment = apps.get_model("base", "Comment")
+    paths = {}
+    changed = []
+    # Parents are always created before their replies
+    for comment in Comment.objects.order_by("id").only("id", "parent_comment_id"):
+        segment = str(comment.pk).zfill(10)
+        parent = paths.get(comment.parent_comment_id)
+        if parent:
+            comment.path, comment.depth = parent[0] + segment, parent[1] + 1
+        else:
+            comment.path, comment.depth = segment, 0
+        paths[comment.pk] = (comment.path, comment.depth)
+        changed.append(comment)
+    Comment.objects.bulk_update(changed, ["path", "depth"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0003_post_pubdate_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='comment_post_path_idx'),
+        ),
+        migrations.RunPython(fill_comment_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+from django.db import migrations
+
+
+INDEX_POSTS_SQL = {
+    "sqlite": (
+        "INSERT INTO base_post_fts (rowid, title, content, author, categories) "
+        "SELECT p.id, p.title, p.content, u.username, "
+        "COALESCE((SELECT group_concat(c.name, ' ') FROM base_post_categories pc "
+        "JOIN base_category c ON c.id = pc.category_id WHERE pc.post_id = p.id), '') "
+        "FROM base_post p JOIN base_user u ON u.id = p.author_id"
+    ),
+    "postgresql": (
+        "UPDATE base_post p SET search_vector = "
+        "setweight(to_tsvector('english', p.title), 'A') || "
+        "setweight(to_tsvector('english', p.content), 'D') || "
+        "setweight(to_tsvector('simple', u.username), 'B') || "
+        "setweight(to_tsvector('english', COALESCE((SELECT string_agg(c.name, ' ') "
+        "FROM base_post_categories pc JOIN base_category c ON c.id = pc.category_id "
+        "WHERE pc.post_id = p.id), '')), 'C') "
+        "FROM base_user u WHERE u.id = p.author_id"
+    ),
+}
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS base_post_fts USING fts5("
+            "title, content, author, categories, tokenize = 'porter unicode61')"
+        )
+    elif vendor == "postgresql":
+        schema_editor.execute("ALTER TABLE base_post ADD COLUMN IF NOT EXISTS search_vector tsvector")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS base_post_search_vector_idx ON base_post USING GIN (search_vector)"
+        )
+    else:
+        return
+
+    # Index the existing posts; frozen here rather than calling
+    # base.search, so later changes there cannot alter this migration
+    schema_editor.execute(INDEX_POSTS_SQL[vendor])
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS base_post_fts")
+    elif vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS base_post_search_vector_idx")
+        schema_editor.execute("ALTER TABLE base_post DROP COLUMN IF EXISTS search_vector")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0004_comment_path'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
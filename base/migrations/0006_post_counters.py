@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:59
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_post_counters(apps, schema_editor):
+    Post = apps.get_model("base", "Post")
+    Comment = apps.get_model("base", "Comment")
+    comments = Comment.objects.filter(post=OuterRef("pk")).values("post")
+    Post.objects.update(
+        comment_count=Coalesce(Subquery(comments.annotate(n=Count("pk")).values("n")), 0),
+        reply_count=Coalesce(
+            Subquery(comments.filter(parent_comment__isnull=False).annotate(n=Count("pk")).values("n")), 0
+        ),
+        last_activity=Subquery(comments.annotate(latest=Max("created_date")).values("latest")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0005_post_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='last_activity',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_post_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:01
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_updated_at(apps, schema_editor):
+    # Existing rows were last modified when they were created
+    apps.get_model("base", "Post").objects.update(updated_at=F("publication_date"))
+    apps.get_model("base", "Comment").objects.update(updated_at=F("created_date"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0006_post_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+    ]
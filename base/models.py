@@ -14,6 +14,8 @@ class User(AbstractUser):
 
     bio = models.TextField(null=True, blank=True)
     profile_picture = models.ImageField(upload_to="profile_pics/", null=True, blank=True)
+    # Resized copies of profile_picture, filled in by base.avatars
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     ROLE_CHOICES = (
         ("author", "Author"),
@@ -23,6 +25,45 @@ class User(AbstractUser):
     class Meta:
         swappable = 'AUTH_USER_MODEL'  
 
+    # Shown next to posts and comments; signals react only when they change
+    SHOWN_FIELDS = ("username", "profile_picture", "avatar_variants")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_shown = instance.shown_values()
+        return instance
+
+    def shown_values(self):
+        # Only what is loaded: reading a deferred field would query
+        values = {}
+        for name in self.SHOWN_FIELDS:
+            if name in self.__dict__:
+                value = self.__dict__[name]
+                if name == "profile_picture":
+                    # A str, FieldFile or upload: compare by file name
+                    value = getattr(value, "name", value) or ""
+                elif isinstance(value, dict):
+                    value = dict(value)
+                values[name] = value
+        return values
+
+    def changed_fields(self, *names):
+        """
+        Which of `names` (from SHOWN_FIELDS) differ from the values last
+        loaded or saved. Everything counts as changed on a new instance.
+        """
+        loaded = getattr(self, "_loaded_shown", None)
+        if loaded is None:
+            return set(names)
+        current = self.shown_values()
+        return {name for name in names if name in current and (name not in loaded or current[name] != loaded[name])}
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # post_save receivers have compared against the old values by now
+        self._loaded_shown = self.shown_values()
+
 
 # ======================================================
 # Category Model
@@ -77,12 +118,81 @@ class Post(models.Model):
 
     status = models.CharField(max_length=12, choices=STATUS_CHOICES, default="draft")
     publication_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Denormalized comment counters, maintained by base.counters
+    comment_count = models.PositiveIntegerField(default=0)
+    reply_count = models.PositiveIntegerField(default=0)
+    last_activity = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Backs keyset pagination on (publication_date, id)
+            models.Index(fields=["-publication_date", "-id"], name="post_pubdate_id_idx"),
+            # The feed: only published posts, newest first
+            models.Index(
+                fields=["-publication_date", "-id"],
+                condition=models.Q(status="published"),
+                name="post_published_idx",
+            ),
+            # An author's own posts (dashboard, author API listing)
+            models.Index(fields=["author", "-publication_date", "-id"], name="post_author_pubdate_idx"),
+        ]
 
 
 
 # ======================================================
 # Comment Model (Threaded)
+# Each comment stores a materialized path: the zero-padded
+# ids of its ancestors followed by its own id. Sorting by
+# path yields a whole thread in display order.
 # ======================================================
+PATH_STEP = 10
+
+
+def path_segment(pk):
+    return str(pk).zfill(PATH_STEP)
+
+
+class CommentQuerySet(models.QuerySet):
+    def descendants_of(self, roots):
+        """
+        All replies below the given comments, at any depth, in thread order.
+        """
+        # Paths are digits only, so ":" sorts after every descendant
+        condition = models.Q(pk__in=[])
+        for root in roots:
+            condition |= models.Q(path__gt=root.path, path__lt=root.path + ":")
+        return self.filter(condition).order_by("path")
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Insert comments, then fill in their thread paths in one more query.
+        Parents must already exist or come earlier in the same batch.
+        """
+        objs = super().bulk_create(objs, *args, **kwargs)
+
+        # Rows skipped by ignore_conflicts come back without a pk
+        created = sorted((obj for obj in objs if obj.pk is not None), key=lambda obj: obj.pk)
+        batch = {obj.pk: obj for obj in created}
+        parent_ids = {obj.parent_comment_id for obj in created} - set(batch) - {None}
+        existing = {
+            pk: (path, depth)
+            for pk, path, depth in self.model.objects.filter(pk__in=parent_ids).values_list("pk", "path", "depth")
+        }
+
+        for obj in created:
+            if obj.parent_comment_id is None:
+                obj.path, obj.depth = path_segment(obj.pk), 0
+                continue
+            parent = batch.get(obj.parent_comment_id)
+            parent_path, parent_depth = (parent.path, parent.depth) if parent else existing[obj.parent_comment_id]
+            obj.path, obj.depth = parent_path + path_segment(obj.pk), parent_depth + 1
+
+        self.model.objects.bulk_update(created, ["path", "depth"], batch_size=500)
+        return objs
+
+
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments")
     author = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -98,4 +208,121 @@ class Comment(models.Model):
         related_name="replies"
     )
 
-    created_date = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    created_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Thread position, maintained in save()
+    path = models.TextField(blank=True, default="", editable=False)
+    depth = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["post", "path"], name="comment_post_path_idx"),
+            # Top-level comments of a post, newest first
+            models.Index(fields=["post", "parent_comment", "-created_date"], name="comment_post_parent_idx"),
+            # A user's own comments (comment API listing)
+            models.Index(fields=["author", "-created_date"], name="comment_author_created_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_parent_id = instance.__dict__.get("parent_comment_id")
+        return instance
+
+    def build_path(self):
+        """
+        Return (path, depth) for this comment under its current parent.
+        """
+        if self.parent_comment_id is None:
+            return path_segment(self.pk), 0
+        parent = self.parent_comment
+        return parent.path + path_segment(self.pk), parent.depth + 1
+
+    def save(self, *args, **kwargs):
+        creating = self._state.adding
+        moved = not creating and self.parent_comment_id != getattr(self, "_loaded_parent_id", self.parent_comment_id)
+
+        if moved and self.parent_comment_id is not None and self.parent_comment.path.startswith(self.path):
+            raise ValueError("A comment cannot be moved under its own reply.")
+
+        super().save(*args, **kwargs)
+
+        if creating or moved:
+            self._update_path()
+        self._loaded_parent_id = self.parent_comment_id
+
+    def _update_path(self):
+        old_path, old_depth = self.path, self.depth
+        self.path, self.depth = self.build_path()
+        Comment.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth, updated_at=self.updated_at)
+
+        if not old_path:
+            return
+
+        # Re-root the subtree of a comment that changed parent
+        subtree = list(Comment.objects.filter(path__gt=old_path, path__lt=old_path + ":"))
+        for reply in subtree:
+            reply.path = self.path + reply.path[len(old_path):]
+            reply.depth += self.depth - old_depth
+            reply.updated_at = self.updated_at
+        Comment.objects.bulk_update(subtree, ["path", "depth", "updated_at"])
+
+
+# ======================================================
+# Background Job Model
+# Rows written in the same transaction as the change that
+# needs them, run later by the run_jobs worker (base.jobs).
+# ======================================================
+class Job(models.Model):
+    PENDING = "pending"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (FAILED, "Failed"),
+    )
+
+    task = models.CharField(max_length=100)
+    args = models.JSONField(default=list)
+    # Enqueuing a key that is already pending adds nothing
+    key = models.CharField(max_length=200, null=True, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    run_at = models.DateTimeField()
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # The worker's next-job scan
+            models.Index(fields=["status", "run_at"], name="job_status_run_at_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key"], condition=models.Q(status="pending"), name="job_pending_key_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task}{tuple(self.args)}"
+
+
+# ======================================================
+# Import Checkpoint Model
+# Records committed by an import, written in the same
+# transaction as each batch (base.importer).
+# ======================================================
+class ImportCheckpoint(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    source = models.TextField()
+    position = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
@@ -0,0 +1,184 @@
+import base64
+import binascii
+from datetime import datetime, timezone
+
+from django.db.models import Q
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor string cannot be decoded."""
+
+
+# ======================================================
+# Cursor encoding
+# A cursor is the (publication_date, id) of the last row
+# seen, plus the direction to read in, base64 encoded so
+# clients treat it as opaque.
+# ======================================================
+# Ids beyond a 64-bit column cannot be bound as query parameters
+MAX_ID = 2 ** 63 - 1
+
+
+def encode_cursor(publication_date, pk, reverse=False):
+    raw = f"{'p' if reverse else 'n'}|{publication_date.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Return (publication_date, id, reverse) for a cursor string.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        direction, stamp, pk = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        if direction not in ("n", "p"):
+            raise ValueError(direction)
+        stamp, pk = datetime.fromisoformat(stamp), int(pk)
+        if not 0 <= pk <= MAX_ID:
+            raise ValueError(pk)
+        if stamp.tzinfo is None:
+            stamp = stamp.replace(tzinfo=timezone.utc)
+        return stamp, pk, direction == "p"
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+# ======================================================
+# Keyset paginator
+# Seeks on (publication_date, id) instead of OFFSET, so
+# every page costs one indexed range scan and no COUNT(*).
+# ======================================================
+def row_position(row):
+    """
+    (publication_date, id) of a Post, or of a .values() row.
+    """
+    if isinstance(row, dict):
+        return row["publication_date"], row["id"]
+    return row.publication_date, row.pk
+
+
+class KeysetPage:
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def next_cursor(self):
+        if not self.has_next or not self.object_list:
+            return None
+        return encode_cursor(*row_position(self.object_list[-1]))
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous or not self.object_list:
+            return None
+        return encode_cursor(*row_position(self.object_list[0]), reverse=True)
+
+
+class KeysetPaginator:
+    """
+    Newest-first pagination over a Post queryset.
+    """
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def page_rows(self, cursor=None):
+        """
+        Return (queryset, direction) fetching one row more than a page
+        after (or before) the given cursor. Direction is None for the
+        first page, otherwise "next" or "previous".
+        Raises InvalidCursor for a malformed cursor.
+        """
+        limit = self.per_page + 1
+        if not cursor:
+            return self.queryset.order_by("-publication_date", "-id")[:limit], None
+
+        stamp, pk, reverse = decode_cursor(cursor)
+
+        if reverse:
+            # Walk towards newer posts; make_page flips back to newest-first
+            return self.queryset.filter(
+                Q(publication_date__gt=stamp) |
+                Q(publication_date=stamp, id__gt=pk)
+            ).order_by("publication_date", "id")[:limit], "previous"
+
+        return self.queryset.filter(
+            Q(publication_date__lt=stamp) |
+            Q(publication_date=stamp, id__lt=pk)
+        ).order_by("-publication_date", "-id")[:limit], "next"
+
+    def make_page(self, rows, direction):
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == "previous":
+            rows.reverse()
+            return KeysetPage(rows, True, more)
+        return KeysetPage(rows, more, direction == "next")
+
+    def get_page(self, cursor=None):
+        """
+        Return the page that follows (or precedes) the given cursor.
+        """
+        rows, direction = self.page_rows(cursor)
+        return self.make_page(list(rows), direction)
+
+    async def aget_page(self, cursor=None):
+        rows, direction = self.page_rows(cursor)
+        return self.make_page([row async for row in rows], direction)
+
+
+# ======================================================
+# DRF pagination class for the Post API
+# ======================================================
+class PostCursorPagination(BasePagination):
+    """
+    Cursor pagination for PostViewSet.list.
+    Responses carry next/previous links instead of a total count.
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = 20
+    max_page_size = 100
+
+    def get_page_size(self, request):
+        return self.page_size_from(request.query_params)
+
+    def page_size_from(self, params):
+        try:
+            size = int(params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        paginator = KeysetPaginator(queryset, self.get_page_size(request))
+        try:
+            self.page = paginator.get_page(request.query_params.get(self.cursor_query_param))
+        except InvalidCursor:
+            raise ParseError("Invalid cursor")
+        return self.page.object_list
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_link(self.page.next_cursor),
+            "previous": self.get_link(self.page.previous_cursor),
+            "results": data,
+        })
@@ -0,0 +1,211 @@
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import aauthenticate, authenticate
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+from django.core.cache import cache
+
+from .models import User
+
+
+class Overloaded(Exception):
+    """
+    Raised when an auth request is shed; retry after `retry_after` seconds.
+    """
+    def __init__(self, retry_after):
+        super().__init__(f"Too many attempts, try again in {retry_after} seconds.")
+        self.retry_after = retry_after
+
+
+# ======================================================
+# Hashing pool
+# PBKDF2 releases the GIL, so a few threads hash in
+# parallel while request threads wait. Slots bound the
+# work queued behind them; past that, requests are shed
+# instead of piling up CPU work.
+# ======================================================
+class HashingPool:
+    def __init__(self, workers, queue):
+        self.workers = workers
+        self.slots = threading.BoundedSemaphore(workers + queue)
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def submit(self, fn, *args):
+        if not self.slots.acquire(blocking=False):
+            raise Overloaded(retry_after=1)
+
+        def call():
+            try:
+                return fn(*args)
+            finally:
+                self.slots.release()
+
+        try:
+            with self.lock:
+                if self.executor is None:
+                    self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="passwords")
+            return self.executor.submit(call)
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def run(self, fn, *args):
+        return self.submit(fn, *args).result()
+
+    async def arun(self, fn, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+
+pool = HashingPool(settings.PASSWORD_WORKERS, settings.PASSWORD_QUEUE)
+
+
+def hash_password(raw_password):
+    return pool.run(make_password, raw_password)
+
+
+async def ahash_password(raw_password):
+    return await pool.arun(make_password, raw_password)
+
+
+def needs_rehash(encoded):
+    preferred = get_hasher("default")
+    return identify_hasher(encoded).algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+# ======================================================
+# Verification
+# ModelBackend with the hashing on the pool and the
+# database work on the calling thread. Logins go through
+# django.contrib.auth.authenticate(), so every configured
+# backend is tried and failures send user_login_failed.
+# ======================================================
+class PooledModelBackend(ModelBackend):
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        username = username or kwargs.get(User.USERNAME_FIELD)
+        if not username or not password:
+            return None
+        user = User._default_manager.filter(**{User.USERNAME_FIELD: username}).first()
+        if user is None:
+            # Hash anyway, so unknown usernames take as long as known ones
+            pool.run(make_password, password)
+            return None
+        if not (pool.run(check_password, password, user.password) and self.user_can_authenticate(user)):
+            return None
+        if needs_rehash(user.password):
+            user.password = pool.run(make_password, password)
+            user.save(update_fields=["password"])
+        return user
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        username = username or kwargs.get(User.USERNAME_FIELD)
+        if not username or not password:
+            return None
+        user = await User._default_manager.filter(**{User.USERNAME_FIELD: username}).afirst()
+        if user is None:
+            await pool.arun(make_password, password)
+            return None
+        if not (await pool.arun(check_password, password, user.password) and self.user_can_authenticate(user)):
+            return None
+        if needs_rehash(user.password):
+            user.password = await pool.arun(make_password, password)
+            await user.asave(update_fields=["password"])
+        return user
+
+
+def authenticate_user(request, username, password):
+    """
+    Return the active user with these credentials, or None.
+    """
+    if not username or not password:
+        return None
+    return authenticate(request, username=username, password=password)
+
+
+async def aauthenticate_user(request, username, password):
+    if not username or not password:
+        return None
+    return await aauthenticate(request, username=username, password=password)
+
+
+# ======================================================
+# Admission control
+# Fixed-window counters in the shared cache, checked
+# before any hashing is done: attempts per client
+# address, and failed logins per username and address,
+# so nobody can lock a user out from elsewhere.
+# ======================================================
+def client_ip(request):
+    """
+    The client address: REMOTE_ADDR, or the entry a trusted proxy
+    added to AUTH_CLIENT_IP_HEADER (e.g. HTTP_X_FORWARDED_FOR).
+    """
+    header = settings.AUTH_CLIENT_IP_HEADER
+    if header:
+        # Each proxy appends the address it saw; the last trusted one is real
+        hops = [hop.strip() for hop in request.META.get(header, "").split(",") if hop.strip()]
+        if len(hops) >= settings.AUTH_TRUSTED_PROXIES:
+            return hops[-settings.AUTH_TRUSTED_PROXIES]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def rate_key(kind, *values):
+    return f"auth-rate:{kind}:{hashlib.sha256(chr(0).join(values).encode()).hexdigest()[:32]}"
+
+
+def failure_key(request, username):
+    return rate_key("failures", username.lower(), client_ip(request))
+
+
+def count(key, window):
+    cache.add(key, 0, timeout=window)
+    try:
+        return cache.incr(key)
+    except ValueError:  # expired between add() and incr()
+        cache.set(key, 1, timeout=window)
+        return 1
+
+
+async def acount(key, window):
+    await cache.aadd(key, 0, timeout=window)
+    try:
+        return await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, 1, timeout=window)
+        return 1
+
+
+def admit(request, username=None):
+    """
+    Count an auth attempt from this address; raise Overloaded once it
+    is over its limit, or `username` failed too often from here.
+    """
+    window = settings.AUTH_RATE_WINDOW
+    if settings.AUTH_RATE_PER_IP and count(rate_key("ip", client_ip(request)), window) > settings.AUTH_RATE_PER_IP:
+        raise Overloaded(retry_after=window)
+    if username and settings.AUTH_RATE_PER_USERNAME:
+        if (cache.get(failure_key(request, username)) or 0) >= settings.AUTH_RATE_PER_USERNAME:
+            raise Overloaded(retry_after=window)
+
+
+async def aadmit(request, username=None):
+    window = settings.AUTH_RATE_WINDOW
+    if settings.AUTH_RATE_PER_IP:
+        if await acount(rate_key("ip", client_ip(request)), window) > settings.AUTH_RATE_PER_IP:
+            raise Overloaded(retry_after=window)
+    if username and settings.AUTH_RATE_PER_USERNAME:
+        if (await cache.aget(failure_key(request, username)) or 0) >= settings.AUTH_RATE_PER_USERNAME:
+            raise Overloaded(retry_after=window)
+
+
+def record_failure(request, username):
+    """
+    Count a failed login for `username` from this client (base.signals).
+    """
+    if username and settings.AUTH_RATE_PER_USERNAME:
+        count(failure_key(request, username), settings.AUTH_RATE_WINDOW)
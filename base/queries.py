@@ -0,0 +1,181 @@
+from django.db.models import Prefetch
+from django.db.models.functions import Substr
+
+from .models import Post, Comment, Category, Tag, PATH_STEP
+
+
+# Characters of content in the API post list's excerpt
+EXCERPT_LENGTH = 200
+
+
+# ======================================================
+# Query planning
+# One queryset per page, loading exactly the relations
+# its template reads so rendering never hits the database.
+# ======================================================
+def feed_posts():
+    """
+    Published posts for home.html.
+    Cards read the author's username, profile picture and its
+    resized variants, and the stored comment count.
+    """
+    return (
+        Post.objects.filter(status="published")
+        .select_related("author")
+        .only(
+            "id", "title", "content", "publication_date", "comment_count",
+            "author__id", "author__username", "author__profile_picture", "author__avatar_variants",
+        )
+    )
+
+
+def dashboard_posts(user):
+    """
+    An author's own posts for dashboard.html (title and links only).
+    """
+    return (
+        Post.objects.filter(author=user)
+        .only("id", "title", "publication_date")
+        .order_by("-publication_date")
+    )
+
+
+def post_comments(post):
+    """
+    Top-level comments for post_detail.html, newest first, with authors.
+    Replies are attached per page with load_threads().
+    """
+    return (
+        Comment.objects.filter(post=post, parent_comment=None)
+        .select_related("author")
+        .order_by("-created_date")
+    )
+
+
+# ======================================================
+# API querysets
+# Paired with the serializers in base.serializers: every
+# nested summary comes from a join or one prefetch query.
+# ======================================================
+def post_relations(posts, fields=None):
+    """
+    Join the author and prefetch the taxonomy of `posts`, skipping
+    whatever a sparse fieldset (`fields`) leaves out.
+    """
+    def wanted(name):
+        return fields is None or name in fields
+
+    if wanted("author"):
+        posts = posts.select_related("author")
+    for name, model in (("categories", Category), ("tags", Tag)):
+        if wanted(name):
+            posts = posts.prefetch_related(Prefetch(name, queryset=model.objects.only("id", "name", "slug")))
+    return posts
+
+
+def api_posts(posts, fields=None):
+    """
+    Posts for PostListSerializer: the excerpt is cut in the
+    database, so full contents are never loaded.
+    """
+    posts = posts.defer("content")
+    if fields is None or "excerpt" in fields:
+        posts = posts.annotate(excerpt=Substr("content", 1, EXCERPT_LENGTH))
+    return post_relations(posts, fields)
+
+
+def api_comments(comments):
+    """
+    Comments for CommentSerializer, in id order, with their author summaries.
+    """
+    return comments.select_related("author").order_by("id")
+
+
+# ======================================================
+# Comment threads
+# ======================================================
+def build_comment_tree(comments):
+    """
+    Link comments into nested `children` lists in one pass.
+    Comments must come parents-first (e.g. ordered by path);
+    those whose parent is not in the input are returned as roots,
+    in input order.
+    """
+    nodes = {}
+    roots = []
+    for comment in comments:
+        comment.children = []
+        nodes[comment.path] = comment
+        parent = nodes.get(comment.path[:-PATH_STEP])
+        if parent is None:
+            roots.append(comment)
+        else:
+            parent.children.append(comment)
+    return roots
+
+
+# Replies deeper than this below their root are not indented further
+MAX_INDENT = 6
+
+
+def flatten_replies(roots):
+    """
+    Give each root a flat `thread` list of its whole subtree in thread
+    order, each reply carrying its `indent` level, so templates render
+    a thread of any depth in one loop instead of recursing.
+    """
+    for root in roots:
+        root.thread = []
+        stack = list(reversed(root.children))
+        while stack:
+            node = stack.pop()
+            node.indent = min(node.depth - root.depth, MAX_INDENT)
+            root.thread.append(node)
+            stack.extend(reversed(node.children))
+    return roots
+
+
+def load_threads(roots):
+    """
+    Attach every reply below the given comments, at any depth,
+    using a single ordered query.
+    """
+    roots = list(roots)
+    if not roots:
+        return roots
+    return flatten_replies(build_comment_tree([*roots, *thread_replies(roots)]))
+
+
+async def aload_threads(roots):
+    roots = list(roots)
+    if not roots:
+        return roots
+    return flatten_replies(build_comment_tree([*roots, *[reply async for reply in thread_replies(roots)]]))
+
+
+def thread_replies(roots):
+    return (
+        Comment.objects.filter(post_id__in={root.post_id for root in roots})
+        .descendants_of(roots)
+        .select_related("author")
+    )
+
+
+def post_thread(post):
+    """
+    The full comment tree of a post: roots newest first,
+    replies in the order they were written.
+    """
+    roots = build_comment_tree(thread_comments(post))
+    roots.reverse()
+    return roots
+
+
+async def apost_thread(post):
+    roots = build_comment_tree([comment async for comment in thread_comments(post)])
+    roots.reverse()
+    return roots
+
+
+def thread_comments(post):
+    return Comment.objects.filter(post=post).select_related("author").order_by("path")
@@ -0,0 +1,109 @@
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+
+# Blog content read from replicas; everything else (sessions,
+# tokens, migrations) stays on the primary
+REPLICA_MODELS = {"base.post", "base.comment", "base.category", "base.tag", "base.user"}
+
+
+# ======================================================
+# Routing state
+# Per request (or task): whether reads must see the
+# primary, and whether this request has written.
+# ======================================================
+class RoutingState:
+    def __init__(self, primary=False):
+        self.primary = primary
+        self.wrote = False
+
+
+routing_state = ContextVar("routing_state", default=None)
+
+
+@contextmanager
+def use_primary(enabled=True):
+    """
+    Send every read inside the block to the primary.
+    """
+    state = routing_state.get()
+    token = None
+    if state is None:
+        state = RoutingState()
+        token = routing_state.set(state)
+
+    previous = state.primary
+    state.primary = state.primary or enabled
+    try:
+        yield
+    finally:
+        state.primary = previous
+        if token is not None:
+            routing_state.reset(token)
+
+
+def weighted_cycle(weights):
+    """
+    Endless smooth weighted round-robin over {alias: weight},
+    e.g. {"a": 2, "b": 1} yields a, b, a, a, b, a, ...
+    """
+    total = sum(weights.values())
+    current = dict.fromkeys(weights, 0)
+    order = []
+    for _ in range(total):
+        for alias, weight in weights.items():
+            current[alias] += weight
+        chosen = max(current, key=current.get)
+        current[chosen] -= total
+        order.append(chosen)
+    return itertools.cycle(order)
+
+
+def is_replicated(model):
+    # M2M link tables follow the model that declares them
+    owner = model._meta.auto_created or model
+    return owner._meta.label_lower in REPLICA_MODELS
+
+
+# ======================================================
+# Database router
+# ======================================================
+class ReplicaRouter:
+    """
+    Reads of blog content go to the replicas in settings.DATABASE_REPLICAS,
+    writes and everything read in a transaction or after a write go to
+    the primary ("default").
+    """
+    def __init__(self, replicas=None):
+        self.replicas = dict(settings.DATABASE_REPLICAS if replicas is None else replicas)
+        self.order = weighted_cycle(self.replicas) if self.replicas else None
+
+    def db_for_read(self, model, **hints):
+        if self.order is None or not is_replicated(model):
+            return None
+
+        state = routing_state.get()
+        if state is not None and (state.primary or state.wrote):
+            return "default"
+        # Reads inside a transaction must see its writes
+        if connections["default"].in_atomic_block:
+            return "default"
+        return next(self.order)
+
+    def db_for_write(self, model, **hints):
+        state = routing_state.get()
+        if state is not None and is_replicated(model):
+            state.wrote = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        return db not in self.replicas
@@ -0,0 +1,325 @@
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+
+# Markers placed around matched terms by the database,
+# swapped for <mark> once the snippet has been escaped.
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+SEARCH_RESULT_LIMIT = 50
+
+# Ranked results are paged by offset; every page ranks all matches
+# again, so paging stops this deep
+SEARCH_MAX_OFFSET = 1000
+
+
+def search_terms(query):
+    """
+    Split user input into plain word tokens, dropping any
+    operator syntax so it cannot reach the query parser.
+    """
+    return re.findall(r"\w+", query or "")
+
+
+def highlight(snippet):
+    """
+    Escape a snippet and turn the database match markers into <mark> tags.
+    """
+    if not snippet:
+        return ""
+    html = escape(snippet)
+    return mark_safe(html.replace(HIGHLIGHT_START, "<mark>").replace(HIGHLIGHT_END, "</mark>"))
+
+
+def id_filter(column, ids):
+    """
+    Return an SQL condition and params restricting `column` to `ids`
+    (no restriction when `ids` is None).
+    """
+    if ids is None:
+        return "1 = 1", []
+    ids = list(ids) or [None]
+    return f"{column} IN ({', '.join(['%s'] * len(ids))})", ids
+
+
+def post_document(post):
+    """
+    Return the text indexed for a post: title, content,
+    author username and category names.
+    """
+    categories = " ".join(post.categories.values_list("name", flat=True))
+    return post.title or "", post.content or "", post.author.username, categories
+
+
+# ======================================================
+# Search backends
+# Each backend keeps its own index in sync with Post rows
+# and narrows a Post queryset to ranked matches.
+# ======================================================
+class BaseSearchBackend:
+
+    def index_post(self, post):
+        raise NotImplementedError
+
+    def remove_post(self, post_id):
+        raise NotImplementedError
+
+    def index_posts(self, post_ids=None):
+        """
+        Re-index the given posts, or every post when `post_ids` is None.
+        Returns the number of posts indexed.
+        """
+        raise NotImplementedError
+
+    def rebuild(self):
+        return self.index_posts()
+
+    def filter(self, queryset, terms):
+        """
+        Return the posts matching `terms`, best match first, annotated
+        with `search_rank` and a raw `search_snippet`.
+        """
+        raise NotImplementedError
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """
+    FTS5 virtual table keyed by post id (created in migration 0005).
+    """
+    table = "base_post_fts"
+
+    # bm25 column weights: title, content, author, categories
+    weights = "10.0, 1.0, 5.0, 3.0"
+
+    def index_post(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [post.pk])
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, title, content, author, categories) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                [post.pk, *post_document(post)],
+            )
+
+    def remove_post(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [post_id])
+
+    def index_posts(self, post_ids=None):
+        where, params = id_filter("p.id", post_ids)
+        stale, _ = id_filter("rowid", post_ids)
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE {stale}", params)
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, title, content, author, categories) "
+                "SELECT p.id, p.title, p.content, u.username, "
+                "COALESCE((SELECT group_concat(c.name, ' ') FROM base_post_categories pc "
+                "JOIN base_category c ON c.id = pc.category_id WHERE pc.post_id = p.id), '') "
+                f"FROM base_post p JOIN base_user u ON u.id = p.author_id WHERE {where}",
+                params,
+            )
+            return cursor.rowcount
+
+    def filter(self, queryset, terms):
+        # Quote every term; the last one also matches as a prefix
+        match = " ".join(f'"{term}"' for term in terms) + "*"
+        return queryset.extra(
+            tables=[self.table],
+            where=[f"{self.table}.rowid = base_post.id", f"{self.table} MATCH %s"],
+            params=[match],
+            select={
+                "search_rank": f"bm25({self.table}, {self.weights})",
+                "search_snippet": (
+                    f"snippet({self.table}, -1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', 24)"
+                ),
+            },
+        ).order_by("search_rank", "-id")
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Weighted tsvector column on base_post with a GIN index
+    (created in migration 0005).
+    """
+    config = "english"
+
+    def index_post(self, post):
+        config = f"'{self.config}'"
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE base_post SET search_vector = "
+                f"setweight(to_tsvector({config}, %s), 'A') || "
+                f"setweight(to_tsvector({config}, %s), 'D') || "
+                "setweight(to_tsvector('simple', %s), 'B') || "
+                f"setweight(to_tsvector({config}, %s), 'C') "
+                "WHERE id = %s",
+                [*post_document(post), post.pk],
+            )
+
+    def remove_post(self, post_id):
+        # The vector lives on the post row and goes with it
+        pass
+
+    def index_posts(self, post_ids=None):
+        config = f"'{self.config}'"
+        where, params = id_filter("p.id", post_ids)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE base_post p SET search_vector = "
+                f"setweight(to_tsvector({config}, p.title), 'A') || "
+                f"setweight(to_tsvector({config}, p.content), 'D') || "
+                "setweight(to_tsvector('simple', u.username), 'B') || "
+                f"setweight(to_tsvector({config}, COALESCE((SELECT string_agg(c.name, ' ') "
+                "FROM base_post_categories pc JOIN base_category c ON c.id = pc.category_id "
+                "WHERE pc.post_id = p.id), '')), 'C') "
+                f"FROM base_user u WHERE u.id = p.author_id AND {where}",
+                params,
+            )
+            return cursor.rowcount
+
+    def filter(self, queryset, terms):
+        tsquery = f"to_tsquery('{self.config}', %s)"
+        match = " & ".join(f"{term}:*" for term in terms)
+        return queryset.extra(
+            where=[f"base_post.search_vector @@ {tsquery}"],
+            params=[match],
+            select={
+                "search_rank": f"ts_rank_cd(base_post.search_vector, {tsquery})",
+                "search_snippet": (
+                    f"ts_headline('{self.config}', base_post.content, {tsquery}, "
+                    f"'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=35, MinWords=15')"
+                ),
+            },
+            select_params=[match, match],
+        ).order_by("-search_rank", "-id")
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """
+    Unindexed fallback for other databases: plain icontains matching.
+    """
+
+    def index_post(self, post):
+        pass
+
+    def remove_post(self, post_id):
+        pass
+
+    def index_posts(self, post_ids=None):
+        return 0
+
+    def filter(self, queryset, terms):
+        for term in terms:
+            queryset = queryset.filter(
+                Q(title__icontains=term) |
+                Q(content__icontains=term) |
+                Q(author__username__icontains=term) |
+                Q(categories__name__icontains=term)
+            )
+        return queryset.distinct().order_by("-publication_date", "-id")
+
+
+BACKENDS = {
+    "sqlite": SQLiteSearchBackend,
+    "postgresql": PostgresSearchBackend,
+}
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    """
+    Return the search backend named by settings.SEARCH_BACKEND,
+    or the one matching the database engine.
+    """
+    path = getattr(settings, "SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+    return BACKENDS.get(connection.vendor, DatabaseSearchBackend)()
+
+
+def search_posts(queryset, query, limit=SEARCH_RESULT_LIMIT, offset=0):
+    """
+    Run a full-text search over `queryset`.
+    Returns up to `limit` posts after the first `offset`, best match
+    first, each carrying `search_rank` and an HTML-safe `search_snippet`.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    posts = list(get_backend().filter(queryset, terms)[offset:offset + limit])
+    return highlight_results(posts)
+
+
+async def asearch_posts(queryset, query, limit=SEARCH_RESULT_LIMIT, offset=0):
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    posts = [post async for post in get_backend().filter(queryset, terms)[offset:offset + limit]]
+    return highlight_results(posts)
+
+
+def highlight_results(posts):
+    for post in posts:
+        post.search_snippet = highlight(getattr(post, "search_snippet", ""))
+    return posts
+
+
+# ======================================================
+# Paged results
+# Ranks give no stable key to seek on, so a search
+# cursor is the offset of the page's first result.
+# ======================================================
+def search_offset(cursor):
+    try:
+        offset = int(cursor or 0)
+    except ValueError:
+        return 0
+    return max(0, min(offset, SEARCH_MAX_OFFSET))
+
+
+class SearchPage:
+    """
+    A page of search results, read like a KeysetPage by home.html.
+    """
+    def __init__(self, rows, offset, per_page):
+        self.object_list = rows[:per_page]
+        self.offset = offset
+        self.per_page = per_page
+        self.has_next = len(rows) > per_page and offset + per_page <= SEARCH_MAX_OFFSET
+        self.has_previous = offset > 0
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def next_cursor(self):
+        return str(self.offset + self.per_page) if self.has_next else None
+
+    @property
+    def previous_cursor(self):
+        return str(max(self.offset - self.per_page, 0)) if self.has_previous else None
+
+
+def search_page(queryset, query, per_page, cursor=None):
+    """
+    The page of results for `query` at `cursor`; a bad cursor gives the first page.
+    """
+    offset = search_offset(cursor)
+    return SearchPage(search_posts(queryset, query, per_page + 1, offset), offset, per_page)
+
+
+async def asearch_page(queryset, query, per_page, cursor=None):
+    offset = search_offset(cursor)
+    return SearchPage(await asearch_posts(queryset, query, per_page + 1, offset), offset, per_page)
@@ -1,23 +1,106 @@
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField
+from .editing import edit_post
+from .metrics import TimedSerializerMixin
 from .models import User, Category, Tag, Post, Comment
 
 
+# ======================================================
+# Nested summaries
+# Related objects are read as small dicts built straight
+# from the prefetched rows, without a serializer per row.
+# ======================================================
+def user_summary(user):
+    return {
+        "id": user.pk,
+        "username": user.username,
+        "profile_picture": user.profile_picture.url if user.profile_picture else None,
+    }
+
+
+def term_summary(term):
+    return {"id": term.pk, "name": term.name, "slug": term.slug}
+
+
+class SummaryListField(ManyRelatedField):
+    def to_representation(self, iterable):
+        # In id order, so output never depends on the query plan
+        return [self.child_relation.to_representation(value) for value in sorted(iterable, key=lambda v: v.pk)]
+
+
+class SummaryField(serializers.PrimaryKeyRelatedField):
+    """
+    A relation written as primary keys and read as summaries.
+    """
+    def __init__(self, summarize, **kwargs):
+        self.summarize = summarize
+        super().__init__(**kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return SummaryListField(**list_kwargs)
+
+    def use_pk_only_optimization(self):
+        return False
+
+    def to_representation(self, value):
+        return self.summarize(value)
+
+
+# ======================================================
+# Sparse fieldsets
+# ======================================================
+def requested_fields(request):
+    """
+    The field names asked for with ?fields=a,b on a read, or None for all.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    names = request.GET.get("fields")
+    return {name.strip() for name in names.split(",") if name.strip()} if names else None
+
+
+class SparseFieldsMixin:
+    """
+    Drop the fields a GET request did not ask for with ?fields=.
+    Writes always use every field.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        wanted = requested_fields(self.context.get("request"))
+        if wanted:
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+
+class ModelSerializer(SparseFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer):
+    pass
+
+
 # ======================================================
 # User Serializer
 # ======================================================
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(ModelSerializer):
     class Meta:
         model = User
-        fields = "__all__"
+        fields = ["id", "username", "email", "password", "role", "bio", "profile_picture"]
+        extra_kwargs = {
+            "password": {"write_only": True}
+        }
 
 
 # ======================================================
 # Category Serializer
 # ======================================================
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(ModelSerializer):
     class Meta:
         model = Category
-        fields = "__all__"
+        fields = ["id", "name", "slug"]
         extra_kwargs = {
             "slug": {"required": False}
         }
@@ -26,7 +109,7 @@ class CategorySerializer(serializers.ModelSerializer):
 # ======================================================
 # Tag Serializer
 # ======================================================
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(ModelSerializer):
     class Meta:
         model = Tag
         fields = ['id', 'name', 'slug']
@@ -34,20 +117,75 @@ class TagSerializer(serializers.ModelSerializer):
 
 
 # ======================================================
-# Post Serializer
+# Post Serializers
+# Detail (and writes) carry the full content; lists carry
+# an excerpt annotated by the queryset (queries.api_posts).
+# Categories and tags are written as ids, read as summaries.
 # ======================================================
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(ModelSerializer):
+    author = SummaryField(user_summary, read_only=True)
+    categories = SummaryField(term_summary, many=True, required=False, queryset=Category.objects.all())
+    tags = SummaryField(term_summary, many=True, required=False, queryset=Tag.objects.all())
+
     class Meta:
         model = Post
-        fields = "__all__"
-        read_only_fields = ['author', 'publication_date']
+        fields = [
+            "id", "title", "content", "author", "categories", "tags", "status",
+            "publication_date", "updated_at", "comment_count", "reply_count", "last_activity",
+        ]
+        read_only_fields = ['author', 'publication_date', 'comment_count', 'reply_count', 'last_activity']
+
+    def update(self, instance, validated_data):
+        # Only the changed columns and links are written, in one transaction
+        categories = validated_data.pop("categories", None)
+        tags = validated_data.pop("tags", None)
+        edit_post(instance, validated_data, categories=categories, tags=tags)
+        return instance
+
+
+class PostListSerializer(PostSerializer):
+    excerpt = serializers.CharField(read_only=True)
+
+    class Meta(PostSerializer.Meta):
+        fields = [
+            "id", "title", "excerpt", "author", "categories", "tags", "status",
+            "publication_date", "updated_at", "comment_count", "reply_count", "last_activity",
+        ]
 
 
 # ======================================================
 # Comment Serializer (Threaded)
 # ======================================================
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(ModelSerializer):
+    author = SummaryField(user_summary, read_only=True)
+
     class Meta:
         model = Comment
-        fields = "__all__"
-        read_only_fields = ['id','posts','parent_coment','author', 'created_at']
\ No newline at end of file
+        fields = ["id", "post", "parent_comment", "author", "content", "depth", "created_date", "updated_at"]
+
+# ======================================================
+# Comment Thread Serializer
+# Nests replies under their parents without recursion,
+# so thread depth never hits Python's recursion limit.
+# ======================================================
+def serialize_comment_tree(roots):
+    """
+    Serialize comments linked by build_comment_tree() into
+    nested dicts, each carrying a `replies` list.
+    """
+    nodes = []
+    stack = list(reversed(roots))
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(reversed(node.children))
+
+    items = {}
+    for node, item in zip(nodes, CommentSerializer(nodes, many=True).data):
+        item["replies"] = []
+        items[node.pk] = item
+
+    for node in nodes:
+        items[node.pk]["replies"] = [items[child.pk] for child in node.children]
+
+    return [items[root.pk] for root in roots]
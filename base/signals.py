@@ -0,0 +1,235 @@
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.contrib.auth.signals import user_login_failed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+from .authentication import forget_token, forget_user
+from .avatars import needs_processing
+from .caching import bump, version_key
+from .jobs import enqueue
+from .models import User, Post, Comment, Category, Tag
+from .passwords import record_failure
+from .search import get_backend
+
+
+# ======================================================
+# Search index maintenance
+# Indexing runs as a job; removal is a single DELETE.
+# ======================================================
+def index_post_later(post_id):
+    enqueue("index_posts", [post_id], key=f"index_posts:{post_id}")
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    index_post_later(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    get_backend().remove_post(instance.pk)
+
+
+def reindex_posts(post_ids):
+    post_ids = list(post_ids)
+    if post_ids:
+        enqueue("index_posts", post_ids)
+
+
+@receiver(m2m_changed, sender=Post.categories.through)
+def reindex_post_categories(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            index_post_later(instance.pk)
+        return
+
+    # Changed from the category side: reindex the posts it touched
+    if action == "pre_clear":
+        instance._search_post_ids = list(instance.post_set.values_list("pk", flat=True))
+    elif action == "post_clear":
+        reindex_posts(instance.__dict__.pop("_search_post_ids", ()))
+    elif action in ("post_add", "post_remove"):
+        reindex_posts(pk_set)
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_posts(sender, instance, created, **kwargs):
+    if not created:
+        reindex_posts(instance.post_set.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=Category)
+def collect_category_posts(sender, instance, **kwargs):
+    instance._search_post_ids = list(instance.post_set.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def reindex_deleted_category_posts(sender, instance, **kwargs):
+    reindex_posts(instance.__dict__.pop("_search_post_ids", ()))
+
+
+@receiver(post_save, sender=User)
+def reindex_author_posts(sender, instance, created, **kwargs):
+    # Only a rename changes what is indexed
+    if created or not instance.changed_fields("username"):
+        return
+    reindex_posts(Post.objects.filter(author=instance).values_list("pk", flat=True))
+
+
+# ======================================================
+# Cache invalidation
+# Bump only the versions of what a change can appear in.
+# ======================================================
+def bump_posts(post_ids):
+    bump(version_key("feed"), *(version_key("post", pk) for pk in post_ids))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    bump_posts([instance.pk])
+
+
+@receiver(m2m_changed, sender=Post.categories.through)
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_post_links(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        bump_posts([instance.pk])
+    elif pk_set:
+        bump_posts(pk_set)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment(sender, instance, **kwargs):
+    # The post card shows the comment count
+    bump(version_key("thread", instance.post_id), version_key("post", instance.post_id), version_key("feed"))
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def invalidate_category(sender, instance, **kwargs):
+    bump(version_key("categories"))
+    bump_posts(instance.post_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def invalidate_tag(sender, instance, **kwargs):
+    bump(version_key("tags"))
+    bump_posts(instance.post_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user(sender, instance, created, **kwargs):
+    # Only the username and picture are shown next to posts and comments
+    if created or not instance.changed_fields(*User.SHOWN_FIELDS):
+        return
+
+    # And every thread the user commented in, one indexed query
+    threads = Comment.objects.filter(author_id=instance.pk).values_list("post_id", flat=True).distinct()
+    bump(
+        version_key("user", instance.pk), version_key("feed"),
+        *(version_key("thread", post_id) for post_id in threads),
+    )
+
+
+# ======================================================
+# Post modification time
+# Category and tag links, and the author, tag and category
+# summaries nested in a post's API representation, are
+# part of it, so changing them must move updated_at.
+# ======================================================
+def touch_posts(post_ids):
+    Post.objects.filter(pk__in=list(post_ids)).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Post.categories.through)
+@receiver(m2m_changed, sender=Post.tags.through)
+def touch_linked_post(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            touch_posts([instance.pk])
+        return
+
+    # Touch after the change, so no reader can pair the old
+    # links with the new timestamp
+    if action == "pre_clear":
+        instance._touch_post_ids = list(instance.post_set.values_list("pk", flat=True))
+    elif action == "post_clear":
+        touch_posts(instance.__dict__.pop("_touch_post_ids", ()))
+    elif action in ("post_add", "post_remove"):
+        touch_posts(pk_set)
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Tag)
+def collect_unlinked_posts(sender, instance, **kwargs):
+    instance._touch_post_ids = list(instance.post_set.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Tag)
+def touch_unlinked_posts(sender, instance, **kwargs):
+    touch_posts(instance.__dict__.pop("_touch_post_ids", ()))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Tag)
+def touch_renamed_term_posts(sender, instance, created, **kwargs):
+    if not created:
+        touch_posts(instance.post_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=User)
+def touch_author_posts(sender, instance, created, **kwargs):
+    if created or not instance.changed_fields("username", "profile_picture"):
+        return
+    enqueue("touch_author_posts", instance.pk, key=f"touch_author_posts:{instance.pk}")
+
+
+@receiver(post_save, sender=User)
+def touch_author_comments(sender, instance, created, **kwargs):
+    # Comments nest the same author summary
+    if created or not instance.changed_fields(*User.SHOWN_FIELDS):
+        return
+    enqueue("touch_author_comments", instance.pk, key=f"touch_author_comments:{instance.pk}")
+
+
+# ======================================================
+# Token cache
+# Logout and rotation delete the token; any save of the
+# user may change what a request sees (role, is_active).
+# ======================================================
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def forget_changed_token(sender, instance, **kwargs):
+    forget_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_tokens(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+# ======================================================
+# Avatar variants
+# ======================================================
+@receiver(post_save, sender=User)
+def process_new_picture(sender, instance, **kwargs):
+    if needs_processing(instance):
+        enqueue("process_avatar", instance.pk, key=f"process_avatar:{instance.pk}")
+
+
+# ======================================================
+# Login throttling
+# ======================================================
+@receiver(user_login_failed)
+def count_login_failure(sender, credentials, request=None, **kwargs):
+    if request is not None:
+        record_failure(request, credentials.get("username"))
@@ -0,0 +1,171 @@
+import gzip
+import mimetypes
+import os
+import stat
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional, gzip still works
+    brotli = None
+
+
+# Worth compressing; images and fonts are compressed already
+COMPRESSIBLE = (".css", ".js", ".mjs", ".map", ".svg", ".json", ".txt", ".xml", ".html")
+
+# Preferred first: (Content-Encoding, file suffix)
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+SHORT_LIVED = "public, max-age=60"
+
+
+# ======================================================
+# collectstatic
+# Hashed names from the manifest, plus .gz and .br files
+# written next to each compressible one, so requests
+# never compress anything.
+# ======================================================
+def compress(path):
+    with open(path, "rb") as file:
+        content = file.read()
+    variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(content, quality=11)
+    for suffix, compressed in variants.items():
+        # Tiny files can grow; then the original is served as is
+        if len(compressed) < len(content):
+            with open(path + suffix, "wb") as file:
+                file.write(compressed)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Content-hashed names (style.css -> style.3f2a1b.css) with
+    precompressed gzip and brotli copies of each collected file.
+    """
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in {*paths, *self.hashed_files.values()}:
+            if name.endswith(COMPRESSIBLE) and self.exists(name):
+                compress(self.path(name))
+
+
+# ======================================================
+# Serving
+# Files under STATIC_ROOT answered in-process, the best
+# precompressed copy the client accepts first. Hashed
+# names never change, so they are cached for a year.
+# ======================================================
+class StaticFile:
+    def __init__(self, path, name):
+        self.path = path
+        self.mtime = os.stat(path).st_mtime
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.encodings = [
+            (encoding, path + suffix) for encoding, suffix in ENCODINGS if os.path.isfile(path + suffix)
+        ]
+        self.cache_control = IMMUTABLE if name in hashed_names() else SHORT_LIVED
+
+    def choose(self, accept_encoding):
+        """
+        The copy to send: the accepted encoding with the highest q-value,
+        ties going to the smaller file (ENCODINGS order).
+        """
+        accepted = parse_accept_encoding(accept_encoding)
+        best, best_q = (None, self.path), 0
+        for encoding, path in self.encodings:
+            q = accepted.get(encoding, accepted.get("*", 0))
+            if q > best_q:
+                best, best_q = (encoding, path), q
+        return best
+
+
+def parse_accept_encoding(header):
+    """
+    {coding: q-value} for an Accept-Encoding header; q=0 means refused.
+    """
+    accepted = {}
+    for item in header.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.lower()] = q
+    return accepted
+
+
+# Hashed files never change under their name: stat them once per process
+found = {}
+
+# Hashed names of the loaded manifest, rebuilt when the storage loads another
+hashed = {"files": None, "names": frozenset()}
+
+
+def hashed_names():
+    files = getattr(staticfiles_storage, "hashed_files", None)
+    if files is None:
+        return frozenset()
+    if hashed["files"] is not files:
+        hashed.update(files=files, names=frozenset(files.values()))
+    return hashed["names"]
+
+
+def lookup(name):
+    path = safe_join(settings.STATIC_ROOT, name)
+    file = found.get(path)
+    if file is None:
+        try:
+            if not stat.S_ISREG(os.stat(path).st_mode):
+                return None
+        except OSError:
+            return None
+        file = StaticFile(path, name)
+        if file.cache_control == IMMUTABLE:
+            found[path] = file
+    return file
+
+
+def serve(request, name):
+    """
+    A response for a GET/HEAD of the collected static file `name`, or
+    None to let the request through (other methods, unknown files).
+    """
+    if request.method not in ("GET", "HEAD") or not settings.STATIC_ROOT:
+        return None
+    try:
+        file = lookup(name)
+    except SuspiciousFileOperation:  # outside STATIC_ROOT
+        return None
+    if file is None:
+        return None
+
+    if not was_modified_since(request.META.get("HTTP_IF_MODIFIED_SINCE"), file.mtime):
+        response = HttpResponseNotModified()
+    else:
+        encoding, path = file.choose(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        response = FileResponse(open(path, "rb"), content_type=file.content_type)
+        if encoding:
+            response["Content-Encoding"] = encoding
+        response["Last-Modified"] = http_date(file.mtime)
+    if file.encodings:
+        response["Vary"] = "Accept-Encoding"
+    response["Cache-Control"] = file.cache_control
+    response["X-Content-Type-Options"] = "nosniff"
+    return response
@@ -0,0 +1,36 @@
+from django.utils import timezone
+
+from .avatars import process_avatar as render_avatar
+from .jobs import task
+from .models import Post, Comment
+from .search import get_backend
+from .signals import bump_posts
+
+
+# ======================================================
+# Job tasks
+# Side effects of writes that do not have to finish
+# before the response, run by base.jobs.
+# ======================================================
+@task()
+def index_posts(post_ids):
+    # Deleted posts simply drop out of the index
+    get_backend().index_posts(post_ids)
+    # Search pages cached since the edit still hold the old results
+    bump_posts(post_ids)
+
+
+@task(concurrency=2)
+def process_avatar(user_id):
+    # CPU-bound: leave the other cores to requests
+    render_avatar(user_id)
+
+
+@task()
+def touch_author_posts(user_id):
+    Post.objects.filter(author_id=user_id).update(updated_at=timezone.now())
+
+
+@task()
+def touch_author_comments(user_id):
+    Comment.objects.filter(author_id=user_id).update(updated_at=timezone.now())
@@ -0,0 +1,39 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from ..avatars import AVATAR_FORMATS, initials_url, variant_urls
+
+register = template.Library()
+
+
+def srcset(urls):
+    return format_html_join(", ", "{} {}w", urls)
+
+
+@register.simple_tag
+def avatar(user, size, css_class=""):
+    """
+    {% avatar user 40 "rounded-circle" %}: the user's picture at `size`
+    CSS pixels, as a <picture> with one srcset per format so browsers
+    fetch the smallest variant that is sharp on their screen.
+    """
+    *preferred, fallback = AVATAR_FORMATS
+    fallback_urls = variant_urls(user, fallback)
+    attrs = format_html(
+        'alt="{}" class="{}" width="{}" height="{}" loading="lazy" decoding="async"',
+        user.username, css_class, size, size,
+    )
+
+    if not fallback_urls:
+        src = user.profile_picture.url if user.profile_picture else initials_url(user.username)
+        return format_html('<img src="{}" {}>', src, attrs)
+
+    sources = format_html_join(
+        "", '<source type="image/{}" srcset="{}" sizes="{}px">',
+        ((extension, srcset(variant_urls(user, extension)), size) for extension in preferred),
+    )
+    src = next((url for url, width in fallback_urls if width >= size), fallback_urls[-1][0])
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}px" {}></picture>',
+        sources, src, srcset(fallback_urls), size, attrs,
+    )
@@ -0,0 +1,27 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+# ======================================================
+# Query budget assertions for tests
+# ======================================================
+class QueryBudgetMixin:
+    """
+    TestCase mixin for pinning a page to a fixed number of queries.
+    Unlike assertNumQueries, any count up to the budget passes, so
+    tests fail only when a page starts issuing more queries.
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, budget, using=DEFAULT_DB_ALIAS):
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = "\n".join(
+                f"{i}. {q['sql']}" for i, q in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(f"{executed} queries executed, budget is {budget}\n{queries}")
@@ -1,3 +1,1483 @@
-from django.test import TestCase
+import base64
+import csv
+import gzip
+import itertools
+import io
+import json
+import os
+import runpy
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.templatetags.static import static as static_url
+from django.db import connection
+from django.db.utils import ConnectionHandler
+from django.db.migrations.executor import MigrationExecutor
+from django.test.utils import CaptureQueriesContext
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from PIL import Image
+
+from .authentication import cached, token_cache_key
+from .avatars import AVATAR_SIZES, initials, initials_avatar
+from .benchmarks import build_corpus, compare, run_scenarios
+from .caching import get_versions, version_key
+from .checks import check_shared_cache
+from .counters import reconcile_counters
+from .importer import Checkpoint, PostImporter, run_import
+from .jobs import TASKS, claim, enqueue, run_job, task
+from .middleware import PRIMARY_COOKIE
+from .pagination import InvalidCursor, KeysetPaginator, decode_cursor, encode_cursor
+from .passwords import HashingPool, Overloaded
+from .models import User, Post, Comment, Category, Tag, Job
+from .routers import ReplicaRouter, RoutingState, routing_state, use_primary, weighted_cycle
+from .search import DatabaseSearchBackend, search_posts
+from .serializers import UserSerializer
+from . import fastjson, staticfiles
+from .testing import QueryBudgetMixin
+
+
+# ======================================================
+# Query budgets for the main pages
+# Page cost must not grow with the number of posts or comments.
+# ======================================================
+class PageQueryBudgetTests(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="author", email="author@example.com", password="pass", role="author"
+        )
+        cls.readers = [
+            User.objects.create_user(username=f"reader{i}", email=f"reader{i}@example.com", password="pass")
+            for i in range(4)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def get_uncached(self, url):
+        # Budgets cover the cold path; a warm cache skips the queries
+        cache.clear()
+        return self.client.get(url)
+
+    def add_posts(self, count):
+        for i in range(count):
+            Post.objects.create(title=f"Post {i}", content="Body", author=self.readers[i % 4], status="published")
+
+    def add_comments(self, post, count):
+        for i in range(count):
+            parent = Comment.objects.create(post=post, author=self.readers[i % 4], content="Top")
+            Comment.objects.create(post=post, author=self.readers[(i + 1) % 4], content="Reply", parent_comment=parent)
+
+    def test_home_query_budget(self):
+        self.add_posts(2)
+        with self.assertQueryBudget(3):
+            self.get_uncached(reverse("home"))
+
+        self.add_posts(20)
+        with self.assertQueryBudget(3):
+            self.get_uncached(reverse("home"))
+
+    def test_post_detail_query_budget(self):
+        post = Post.objects.create(title="Hot", content="Body", author=self.author, status="published")
+        self.add_comments(post, 1)
+        with self.assertQueryBudget(6):
+            self.get_uncached(reverse("post_detail", args=[post.pk]))
+
+        self.add_comments(post, 10)
+        with self.assertQueryBudget(6):
+            self.get_uncached(reverse("post_detail", args=[post.pk]))
+
+    def test_dashboard_query_budget(self):
+        for i in range(10):
+            Post.objects.create(title=f"Mine {i}", content="Body", author=self.author)
+        with self.assertQueryBudget(4):
+            self.client.get(reverse("dashboard"))
+
+
+# ======================================================
+# Keyset pagination
+# ======================================================
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="author", email="author@example.com", password="pass", role="author"
+        )
+        Post.objects.bulk_create(
+            Post(title=f"Post {i}", content="Body", author=cls.author, status="published") for i in range(23)
+        )
+        # Many posts share a timestamp: the id must break the tie
+        Post.objects.filter(pk__in=Post.objects.order_by("pk").values("pk")[5:15]).update(
+            publication_date=timezone.now() - timedelta(days=1)
+        )
+        cls.token = Token.objects.create(user=cls.author).key
+
+    def walk(self, paginator):
+        pages = [paginator.get_page()]
+        while pages[-1].has_next:
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        return pages
+
+    def test_cursor_round_trip(self):
+        stamp = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(stamp, 42)), (stamp, 42, False))
+        self.assertEqual(decode_cursor(encode_cursor(stamp, 42, reverse=True)), (stamp, 42, True))
+
+    def test_pages_cover_every_post_once_in_order(self):
+        pages = self.walk(KeysetPaginator(Post.objects.all(), 5))
+        self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+        seen = [post.pk for page in pages for post in page]
+        self.assertEqual(seen, list(Post.objects.order_by("-publication_date", "-id").values_list("pk", flat=True)))
+
+    def test_previous_cursor_returns_the_same_pages(self):
+        paginator = KeysetPaginator(Post.objects.all(), 5)
+        pages = self.walk(paginator)
+        for before, page in zip(pages, pages[1:]):
+            back = paginator.get_page(page.previous_cursor)
+            self.assertEqual([post.pk for post in back], [post.pk for post in before])
+            self.assertEqual(back.has_previous, before.has_previous)
+            self.assertTrue(back.has_next)
+
+    def test_bad_cursors_never_raise_server_errors(self):
+        stamp = timezone.now().isoformat()
+        tampered = [
+            "!!!", "bm90IGEgY3Vyc29y",
+            base64.urlsafe_b64encode(f"x|{stamp}|1".encode()).decode(),
+            base64.urlsafe_b64encode(b"n|yesterday|1").decode(),
+            base64.urlsafe_b64encode(f"n|{stamp}|{2 ** 70}".encode()).decode(),
+        ]
+        self.client.force_login(self.author)
+        for cursor in tampered:
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(InvalidCursor):
+                    decode_cursor(cursor)
+                response = self.client.get(
+                    reverse("api-posts-list"), {"cursor": cursor}, HTTP_AUTHORIZATION=f"Token {self.token}",
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(self.client.get(reverse("home"), {"cursor": cursor}).status_code, 200)
+
+
+# ======================================================
+# Materialized comment paths
+# ======================================================
+class CommentThreadTests(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="reader", email="reader@example.com", password="pass")
+        cls.post = Post.objects.create(title="Thread", content="Body", author=cls.user, status="published")
+
+    def reply_chain(self, length, parent=None):
+        for i in range(length):
+            parent = Comment.objects.create(post=self.post, author=self.user, content=f"Level {i}", parent_comment=parent)
+        return parent
+
+    def test_path_tracks_ancestry(self):
+        leaf = self.reply_chain(3)
+        self.assertEqual(leaf.depth, 2)
+        self.assertEqual(len(leaf.path), 30)
+        self.assertTrue(leaf.path.startswith(leaf.parent_comment.path))
+
+    def test_moving_a_comment_moves_its_replies(self):
+        root = self.reply_chain(1)
+        middle = self.reply_chain(1, parent=self.reply_chain(1))
+        leaf = self.reply_chain(1, parent=middle)
+
+        middle.parent_comment = root
+        middle.save()
+
+        leaf.refresh_from_db()
+        self.assertEqual(leaf.depth, 2)
+        self.assertTrue(leaf.path.startswith(root.path))
+
+    def test_deep_replies_render_in_fixed_queries(self):
+        self.reply_chain(40)
+        self.client.force_login(self.user)
+        cache.clear()
+        with self.assertQueryBudget(6):
+            response = self.client.get(reverse("post_detail", args=[self.post.pk]))
+        self.assertContains(response, "Level 39")
+
+    def test_threads_deeper_than_the_recursion_limit_render(self):
+        self.reply_chain(300)
+        self.client.force_login(self.user)
+        cache.clear()
+        response = self.client.get(reverse("post_detail", args=[self.post.pk]))
+        self.assertContains(response, "Level 299")
+
+    def test_comment_tree_of_missing_post_is_404(self):
+        token = Token.objects.create(user=self.user)
+        response = self.client.get(
+            reverse("api-posts-comments", args=[self.post.pk + 1]), HTTP_AUTHORIZATION=f"Token {token.key}",
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+# ======================================================
+# Full-text search
+# ======================================================
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="author", email="author@example.com", password="pass", role="author"
+        )
+        cls.in_title = Post.objects.create(
+            title="Zebra stripes", content="Notes", author=cls.author, status="published",
+        )
+        cls.in_content = Post.objects.create(
+            title="Savanna", content="A zebra walked by", author=cls.author, status="published",
+        )
+
+    def search(self, query):
+        return list(search_posts(Post.objects.all(), query))
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search("zebra"), [self.in_title, self.in_content])
+        self.assertIn("<mark>", self.search("zebra")[0].search_snippet)
+
+    def test_last_term_matches_as_a_prefix(self):
+        self.assertEqual(self.search("savanna zeb"), [self.in_content])
+        self.assertEqual(self.search("zeb savanna"), [])
+
+    def test_edits_are_reindexed(self):
+        self.in_content.content = "A giraffe walked by"
+        self.in_content.save()
+        self.assertEqual(self.search("zebra"), [self.in_title])
+
+        category = Category.objects.create(name="Wildlife")
+        self.in_content.categories.add(category)
+        category.name = "Safari"
+        category.save()
+        self.assertEqual(self.search("safari"), [self.in_content])
+
+    def test_fallback_backend_matches_every_term(self):
+        posts = DatabaseSearchBackend().filter(Post.objects.all(), ["zebra", "walked"])
+        self.assertEqual(list(posts), [self.in_content])
+
+    def test_rebuild_command_restores_the_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM base_post_fts")
+        self.assertEqual(self.search("zebra"), [])
+
+        out = io.StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn("Indexed 2 posts", out.getvalue())
+        self.assertEqual(len(self.search("zebra")), 2)
+
+    def test_api_search_results_are_paged(self):
+        Post.objects.bulk_create(
+            Post(title=f"Zebra {i}", content="Herd", author=self.author, status="published") for i in range(5)
+        )
+        call_command("rebuild_search_index", stdout=io.StringIO())
+        headers = {"Authorization": f"Token {Token.objects.create(user=self.author).key}"}
+
+        for name in ("api-posts-list", "async-api-posts-list"):
+            url, seen = f"{reverse(name)}?search=zebra&page_size=3", []
+            while url:
+                data = self.client.get(url, headers=headers).json()
+                self.assertEqual(data["previous"] is None, not seen)
+                seen += [post["id"] for post in data["results"]]
+                url = data["next"]
+            self.assertEqual(len(seen), 7, name)
+            self.assertEqual(len(set(seen)), 7, name)
+
+    @override_settings(JOBS_EAGER=False)
+    def test_search_pages_cached_before_indexing_are_replaced(self):
+        self.client.force_login(self.author)
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(title="Zebra foal", content="New", author=self.author, status="published")
+        self.assertNotIn(post, self.client.get(reverse("home"), {"search": "foal"}).context["page_obj"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            while (job := claim()) is not None:
+                run_job(job)
+        response = self.client.get(reverse("home"), {"search": "foal"})
+        self.assertIn(post, response.context["page_obj"])
+
+    def test_home_search_results_are_paged(self):
+        Post.objects.bulk_create(
+            Post(title=f"Zebra {i}", content="Herd", author=self.author, status="published") for i in range(5)
+        )
+        call_command("rebuild_search_index", stdout=io.StringIO())
+        self.client.force_login(self.author)
+        cache.clear()
+
+        first = self.client.get(reverse("home"), {"search": "zebra"})
+        self.assertEqual(len(first.context["page_obj"]), 5)
+        self.assertEqual(first.context["page_obj"].next_cursor, "5")
+
+        second = self.client.get(reverse("home"), {"search": "zebra", "cursor": "5"})
+        self.assertEqual(len(second.context["page_obj"]), 2)
+        self.assertIsNone(second.context["page_obj"].next_cursor)
+        self.assertEqual(second.context["page_obj"].previous_cursor, "0")
+        seen = {post.pk for page in (first, second) for post in page.context["page_obj"]}
+        self.assertEqual(len(seen), 7)
+
+        bad = self.client.get(reverse("home"), {"search": "zebra", "cursor": "x"})
+        self.assertEqual(len(bad.context["page_obj"]), 5)
+
+
+class SearchMigrationTests(TransactionTestCase):
+
+    def test_migration_indexes_existing_posts(self):
+        executor = MigrationExecutor(connection)
+        before, after = [("base", "0004_comment_path")], executor.loader.graph.leaf_nodes("base")
+        executor.migrate(before)
+        old = executor.loader.project_state(before).apps
+        author = old.get_model("base", "User").objects.create(username="old", email="old@example.com")
+        old.get_model("base", "Post").objects.create(title="Archived zebra", content="Body", author=author)
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(after)
+        self.assertEqual([post.title for post in search_posts(Post.objects.all(), "zebra")], ["Archived zebra"])
+
+
+# ======================================================
+# Denormalized post counters
+# ======================================================
+class PostCounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="reader", email="reader@example.com", password="pass")
+
+    def setUp(self):
+        self.post = Post.objects.create(title="Counted", content="Body", author=self.user, status="published")
+        self.client.force_login(self.user)
+
+    def comment(self, parent=None):
+        url = reverse("post_detail", args=[self.post.pk])
+        data = {"comment": "Hi"}
+        if parent:
+            data["parent_id"] = parent.pk
+        self.client.post(url, data)
+        return Comment.objects.latest("pk")
+
+    def test_counters_follow_comment_views(self):
+        top = self.comment()
+        reply = self.comment(parent=top)
+        self.comment(parent=reply)
+
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.comment_count, self.post.reply_count), (3, 2))
+        self.assertEqual(self.post.last_activity, Comment.objects.latest("pk").created_date)
+
+        self.client.get(reverse("comment_delete", args=[reply.pk]))
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.comment_count, self.post.reply_count), (1, 0))
+        self.assertEqual(self.post.last_activity, top.created_date)
+
+        self.client.get(reverse("comment_delete", args=[top.pk]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+        self.assertEqual(self.post.last_activity, self.post.publication_date)
+        self.assertEqual(reconcile_counters(), 0)
+
+    def test_reconcile_repairs_drift(self):
+        self.comment(parent=self.comment())
+        Post.objects.filter(pk=self.post.pk).update(comment_count=40, reply_count=0)
+
+        self.assertEqual(reconcile_counters(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.comment_count, self.post.reply_count), (2, 1))
+        self.assertEqual(reconcile_counters(), 0)
+
+
+# ======================================================
+# Cached pages and fragments
+# ======================================================
+class CacheInvalidationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="author", email="author@example.com", password="pass", role="author"
+        )
+        cls.post = Post.objects.create(title="Original", content="Body", author=cls.author, status="published")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.author)
+
+    def test_edits_are_never_served_stale(self):
+        self.assertContains(self.client.get(reverse("home")), "Original")
+        self.assertContains(self.client.get(reverse("post_detail", args=[self.post.pk])), "No comments yet")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = "Edited"
+            self.post.save()
+            Comment.objects.create(post=self.post, author=self.author, content="Fresh comment")
+
+        self.assertContains(self.client.get(reverse("home")), "Edited")
+        self.assertContains(self.client.get(reverse("post_detail", args=[self.post.pk])), "Fresh comment")
+
+    def test_warm_home_page_skips_feed_queries(self):
+        self.client.get(reverse("home"))
+        with self.assertNumQueries(2):   # session and user only
+            self.client.get(reverse("home"))
+
+    @override_settings(JOBS_EAGER=False)
+    def test_renames_reach_cached_threads_without_a_worker(self):
+        Comment.objects.create(post=self.post, author=self.author, content="Mine")
+        url = reverse("post_detail", args=[self.post.pk])
+        self.assertContains(self.client.get(url), "author")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.username = "renamed"
+            self.author.save()
+        self.assertContains(self.client.get(url), "renamed")
+
+    @override_settings(JOBS_EAGER=False)
+    def test_profile_edits_invalidate_only_what_they_show(self):
+        url = reverse("profile_edit")
+        form = {"username": "author", "email": "author@example.com", "bio": "New bio"}
+        self.client.get(reverse("home"))
+        feed = get_versions(version_key("feed"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, form)
+        self.assertEqual(get_versions(version_key("feed")), feed)
+        self.assertFalse(Job.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {**form, "username": "renamed"})
+        self.assertNotEqual(get_versions(version_key("feed")), feed)
+        self.assertEqual(
+            set(Job.objects.values_list("task", flat=True)),
+            {"touch_author_posts", "touch_author_comments", "index_posts"},
+        )
+
+
+    def test_several_workers_need_a_shared_cache(self):
+        with override_settings(WEB_WORKERS=2):
+            self.assertEqual([e.id for e in check_shared_cache(None)], ["base.E001"])
+        redis = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://"}}
+        with override_settings(WEB_WORKERS=2, CACHES=redis):
+            self.assertEqual(check_shared_cache(None), [])
+        self.assertEqual(check_shared_cache(None), [])
+
+
+# ======================================================
+# Conditional GET on the API
+# ======================================================
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="author", email="author@example.com", password="pass", role="author"
+        )
+        cls.post = Post.objects.create(title="Cached", content="Body", author=cls.author, status="published")
+        cls.auth = {"HTTP_AUTHORIZATION": f"Token {Token.objects.create(user=cls.author).key}"}
+
+    def test_unchanged_post_answers_304(self):
+        url = reverse("api-posts-detail", args=[self.post.pk])
+        etag = self.client.get(url, **self.auth)["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **self.auth)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_edit_changes_the_etag(self):
+        url = reverse("api-posts-list")
+        etag = self.client.get(url, **self.auth)["ETag"]
+
+        self.post.title = "Changed"
+        self.post.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_renaming_the_author_changes_comment_etags(self):
+        comment = Comment.objects.create(post=self.post, author=self.author, content="Hi")
+        urls = [reverse("api-comments-list"), reverse("api-comments-detail", args=[comment.pk])]
+        etags = [self.client.get(url, **self.auth)["ETag"] for url in urls]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.username = "renamed"
+            self.author.save()
+
+        for url, etag in zip(urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **self.auth)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b'"renamed"', response.content)
+
+    def test_missing_objects_answer_404(self):
+        for name in ("api-posts-detail", "api-comments-detail"):
+            response = self.client.get(reverse(name, args=[999999]), **self.auth)
+            self.assertEqual(response.status_code, 404)
+
+
+# ======================================================
+# Bulk API endpoints
+# ======================================================
+class BulkApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="author", email="author@example.com", password="pass", role="author"
+        )
+        cls.other = User.objects.create_user(
+            username="other", email="other@example.com", password="pass", role="author"
+        )
+        cls.post = Post.objects.create(title="Bulk", content="Body", author=cls.author, status="published")
+        cls.auth = {"HTTP_AUTHORIZATION": f"Token {Token.objects.create(user=cls.author).key}"}
+
+    def test_create_posts_with_tags(self):
+        tags = self.client.post(
+            reverse("api-tags-bulk"), [{"name": "alpha"}, {"name": "beta"}], content_type="application/json",
+            **self.auth,
+        ).json()["ids"]
+
+        response = self.client.post(
+            reverse("api-posts-bulk"),
+            [{"title": f"Post {i}", "content": "Body", "tags": tags} for i in range(3)],
+            content_type="application/json",
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 201)
+        posts = Post.objects.filter(pk__in=response.json()["ids"])
+        self.assertEqual(posts.count(), 3)
+        self.assertTrue(all(post.tags.count() == 2 for post in posts))
+
+    @override_settings(JOBS_EAGER=False)
+    def test_bulk_posts_are_indexed_by_a_job(self):
+        response = self.client.post(
+            reverse("api-posts-bulk"),
+            [{"title": f"Quokka {i}", "content": "Body", "status": "published"} for i in range(3)],
+            content_type="application/json",
+            **self.auth,
+        )
+        self.assertEqual(search_posts(Post.objects.all(), "quokka"), [])
+        job = Job.objects.get(task="index_posts")
+        self.assertEqual(sorted(job.args[0]), sorted(response.json()["ids"]))
+
+        run_job(claim())
+        self.assertEqual(len(search_posts(Post.objects.all(), "quokka")), 3)
+
+    def test_invalid_item_writes_nothing(self):
+        response = self.client.post(
+            reverse("api-posts-bulk"),
+            [{"title": "Fine", "content": "Body"}, {"content": "No title"}],
+            content_type="application/json",
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error["index"] for error in response.json()["errors"]], [1])
+        self.assertFalse(Post.objects.filter(title="Fine").exists())
+
+    def test_comments_keep_counters_and_paths(self):
+        root = Comment.objects.create(post=self.post, author=self.author, content="Root")
+        response = self.client.post(
+            reverse("api-comments-bulk"),
+            [{"post": self.post.pk, "parent_comment": root.pk, "content": f"Reply {i}"} for i in range(2)],
+            content_type="application/json",
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 201)
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.comment_count, self.post.reply_count), (3, 2))
+        self.assertTrue(all(
+            reply.path.startswith(root.path) and reply.depth == 1
+            for reply in Comment.objects.filter(parent_comment=root)
+        ))
+
+        self.client.delete(reverse("api-comments-bulk"), {"ids": [root.pk]}, content_type="application/json", **self.auth)
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.comment_count, self.post.reply_count), (0, 0))
+
+    def test_update_and_delete_only_own_posts(self):
+        foreign = Post.objects.create(title="Foreign", content="Body", author=self.other)
+        url = reverse("api-posts-bulk")
+
+        response = self.client.patch(
+            url, [{"id": self.post.pk, "title": "Renamed"}, {"id": foreign.pk, "title": "Stolen"}],
+            content_type="application/json", **self.auth,
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Post.objects.get(pk=foreign.pk).title, "Foreign")
+
+        response = self.client.patch(
+            url, [{"id": self.post.pk, "title": "Renamed"}], content_type="application/json", **self.auth
+        )
+        self.assertEqual(response.json(), {"updated": 1})
+        self.assertEqual(Post.objects.get(pk=self.post.pk).title, "Renamed")
+
+        response = self.client.delete(url, {"ids": [self.post.pk]}, content_type="application/json", **self.auth)
+        self.assertEqual(response.json()["deleted"], 1)
+        self.assertTrue(Post.objects.filter(pk=foreign.pk).exists())
+
+    def test_related_ids_are_looked_up_once_per_batch(self):
+        tags = [Tag.objects.create(name=f"tag{i}").pk for i in range(20)]
+        items = [{"title": f"Post {i}", "content": "Body", "tags": tags} for i in range(50)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("api-posts-bulk"), items, content_type="application/json", **self.auth)
+        self.assertEqual(response.status_code, 201)
+        tag_reads = [q for q in queries if q["sql"].startswith("SELECT") and 'FROM "base_tag"' in q["sql"]]
+        self.assertEqual(len(tag_reads), 1)
+
+        response = self.client.post(
+            reverse("api-posts-bulk"), [{"title": "Bad", "content": "Body", "tags": [tags[0], 10 ** 6]}],
+            content_type="application/json", **self.auth,
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("tags", response.json()["errors"][0]["errors"])
+
+    def test_non_integer_ids_are_rejected(self):
+        url = reverse("api-posts-bulk")
+        for payload, method in (
+            ([{"id": [self.post.pk], "title": "x"}, {"id": {"a": 1}, "title": "y"}], self.client.patch),
+            ({"ids": [[self.post.pk], {"a": 1}, True]}, self.client.delete),
+        ):
+            response = method(url, payload, content_type="application/json", **self.auth)
+            self.assertEqual(response.status_code, 400)
+        self.assertTrue(Post.objects.filter(pk=self.post.pk, title="Bulk").exists())
+
+    def test_anonymous_bulk_writes_are_refused(self):
+        category = Category.objects.create(name="Kept")
+        response = self.client.delete(
+            reverse("api-categories-bulk"), {"ids": [category.pk]}, content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post(reverse("api-tags-bulk"), [{"name": "spam"}], content_type="application/json")
+        self.assertEqual(response.status_code, 401)
+        self.assertTrue(Category.objects.filter(pk=category.pk).exists())
+
+
+# ======================================================
+# Streaming export
+# ======================================================
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="author", email="author@example.com", password="pass", role="author"
+        )
+        cls.reader = User.objects.create_user(
+            username="reader", email="reader@example.com", password="pass", role="reader"
+        )
+        cls.post = Post.objects.create(title="Shown", content="Line one\nline two", author=cls.author, status="published")
+        Post.objects.create(title="Draft", content="Hidden", author=cls.author)
+        cls.auth = {"HTTP_AUTHORIZATION": f"Token {Token.objects.create(user=cls.reader).key}"}
+
+    def export(self, kind, fmt, **params):
+        response = self.client.get(reverse("api-export", args=[kind, fmt]), params, **self.auth)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_ndjson_has_one_published_post_per_line(self):
+        lines = self.export("posts", "ndjson").splitlines()
+        self.assertEqual([json.loads(line)["title"] for line in lines], ["Shown"])
+
+    def test_csv_filters_comments_by_date(self):
+        Comment.objects.create(post=self.post, author=self.reader, content="Hi")
+        rows = list(csv.reader(io.StringIO(self.export("comments", "csv", since="2000-01-01"))))
+        self.assertEqual(rows[0][:2], ["id", "post"])
+        self.assertEqual(len(rows), 2)
+
+        rows = list(csv.reader(io.StringIO(self.export("comments", "csv", until="2000-01-01"))))
+        self.assertEqual(len(rows), 1)
+
+    def test_until_is_inclusive(self):
+        comment = Comment.objects.create(post=self.post, author=self.reader, content="Hi")
+        created = timezone.localtime(comment.created_date)
+        for until in (created.date().isoformat(), created.isoformat()):
+            rows = list(csv.reader(io.StringIO(self.export("comments", "csv", until=until))))
+            self.assertEqual(len(rows), 2, until)
+        earlier = (created - timedelta(microseconds=1)).isoformat()
+        self.assertEqual(len(list(csv.reader(io.StringIO(self.export("comments", "csv", until=earlier))))), 1)
+
+
+# ======================================================
+# Bulk import
+# ======================================================
+class ImportTests(TestCase):
+
+    def write(self, name, records):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(record) + "\n" for record in records)
+        return path
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_import_users_posts_and_comments(self):
+        # No passwords, so the test does not pay for hashing
+        users = self.write("users.ndjson", [
+            {"username": "writer", "email": "writer@example.com", "role": "author"},
+            {"username": "writer", "email": "again@example.com"},
+        ])
+        posts = self.write("posts.ndjson", [
+            {"id": 7, "title": "Imported", "author": "writer", "status": "published", "tags": ["Django", "Python"]},
+            {"title": "Orphan", "author": "nobody"},
+        ])
+        comments = self.write("comments.ndjson", [
+            {"id": 1, "post": 7, "author": "writer", "content": "Root"},
+            {"id": 2, "post": 7, "parent_comment": 1, "author": "writer", "content": "Reply"},
+        ])
+
+        call_command("import_content", "users", users, stdout=io.StringIO())
+        call_command("import_content", "posts", posts, stdout=io.StringIO())
+        call_command("import_content", "comments", comments, "--batch-size", "1", stdout=io.StringIO())
+
+        self.assertEqual(User.objects.filter(username="writer").count(), 1)
+        post = Post.objects.get(pk=7)
+        self.assertEqual(sorted(post.tags.values_list("slug", flat=True)), ["django", "python"])
+        self.assertEqual((post.comment_count, post.reply_count), (2, 1))
+        self.assertEqual(Comment.objects.get(pk=2).depth, 1)
+        self.assertFalse(Post.objects.filter(title="Orphan").exists())
+        self.assertFalse(os.path.exists(posts + ".checkpoint"))
+
+    def test_resume_skips_committed_records(self):
+        User.objects.create_user(username="writer", email="writer@example.com", role="author")
+        posts = self.write("posts.ndjson", [{"title": f"Post {i}", "author": "writer"} for i in range(5)])
+        Checkpoint(posts + ".checkpoint").save(posts, 3)
+
+        call_command("import_content", "posts", posts, "--resume", stdout=io.StringIO())
+        self.assertEqual(sorted(Post.objects.values_list("title", flat=True)), ["Post 3", "Post 4"])
+
+    def test_checkpoint_commits_with_its_batch(self):
+        User.objects.create_user(username="writer", email="writer@example.com", role="author")
+        posts = self.write("posts.ndjson", [{"title": f"Post {i}", "author": "writer"} for i in range(4)])
+
+        def crash(report):
+            raise KeyboardInterrupt
+        with self.assertRaises(KeyboardInterrupt):
+            run_import(posts, "posts", batch_size=2, progress=crash)
+        self.assertEqual(Checkpoint(posts + ".checkpoint").load(posts), 2)
+
+        # A batch that fails rolls back its checkpoint along with its rows
+        with mock.patch.object(PostImporter, "import_batch", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                run_import(posts, "posts", batch_size=2, resume=True)
+        self.assertEqual(Checkpoint(posts + ".checkpoint").load(posts), 2)
+
+        run_import(posts, "posts", batch_size=2, resume=True)
+        self.assertEqual(Post.objects.count(), 4)
+
+    def test_malformed_records_are_skipped_and_reported(self):
+        User.objects.create_user(username="writer", email="writer@example.com", role="author")
+        path = os.path.join(self.directory.name, "posts.ndjson")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"title": "Good", "author": "writer", "publication_date": "2024-05-01T12:00:00"}) + "\n")
+            f.write("{not json\n")
+            f.write(json.dumps({"id": "seven", "title": "Bad id", "author": "writer"}) + "\n")
+            f.write(json.dumps({"title": "Bad date", "author": "writer", "publication_date": "soon"}) + "\n")
+            f.write("[1, 2]\n")
+
+        report = run_import(path, "posts")
+        self.assertEqual((report["imported"], report["malformed"]), (1, 4))
+        self.assertEqual([error.split(":")[0] for error in report["errors"]], [f"Record {n}" for n in (2, 3, 4, 5)])
+        post = Post.objects.get()
+        self.assertEqual(post.publication_date, datetime(2024, 5, 1, 12, tzinfo=dt_timezone.utc))
+
+
+# ======================================================
+# Async read path
+# ======================================================
+class AsyncViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="author", email="author@example.com", password="pass", role="author"
+        )
+        cls.post = Post.objects.create(title="Async", content="Body", author=cls.author, status="published")
+        Comment.objects.create(post=cls.post, author=cls.author, content="First")
+        cls.token = Token.objects.create(user=cls.author).key
+
+    async def test_pages_render_for_signed_in_users(self):
+        await self.async_client.aforce_login(self.author)
+        for name, args in (("async-home", []), ("async-post-detail", [self.post.pk])):
+            response = await self.async_client.get(reverse(name, args=args))
+            self.assertContains(response, "Async")
+
+    async def test_api_matches_the_sync_viewsets(self):
+        headers = {"Authorization": f"Token {self.token}"}
+        for name, args in (("posts-detail", [self.post.pk]), ("posts-comments", [self.post.pk]), ("comments-list", [])):
+            sync_response = await sync_to_async(self.client.get)(reverse(f"api-{name}", args=args), headers=headers)
+            async_response = await self.async_client.get(reverse(f"async-api-{name}", args=args), headers=headers)
+            self.assertEqual(async_response.content, sync_response.content)
+
+    async def test_api_requires_a_token(self):
+        response = await self.async_client.get(reverse("async-api-posts-list"))
+        self.assertEqual(response.status_code, 401)
+
+
+class IndexAdvisorTests(TestCase):
+
+    def test_hot_queries_use_indexes(self):
+        author = User.objects.create_user(username="author", email="author@example.com", role="author")
+        post = Post.objects.create(title="Indexed", content="", author=author, status="published")
+        Comment.objects.create(post=post, author=author, content="First")
+
+        out = io.StringIO()
+        call_command("explain_queries", username="author", stdout=out)
+        self.assertIn("0 queries need an index", out.getvalue())
+
+
+class MetricsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="author", email="author@example.com", role="author")
+        cls.post = Post.objects.create(title="Measured", content="", author=cls.author, status="published")
+
+    def test_requests_report_server_timing_and_histograms(self):
+        self.client.force_login(self.author)
+        response = self.client.get(reverse("post_detail", args=[self.post.pk]))
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn("tpl;dur=", timing)
+
+        body = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('blog_request_queries_count{view="post_detail"}', body)
+        self.assertIn('blog_request_duration_seconds_recent{view="post_detail",quantile="0.99"}', body)
+
+    def test_metrics_are_not_public(self):
+        response = self.client.get(reverse("metrics"), REMOTE_ADDR="203.0.113.9")
+        self.assertEqual(response.status_code, 403)
+
+
+class BenchmarkSuiteTests(TestCase):
+
+    def test_corpus_and_scenarios(self):
+        hot = build_corpus(
+            users=10, posts=30, comments=60, hot_comments=40, depth=3, tags=5, categories=2,
+            tags_per_post=2, categories_per_post=1, seed=1,
+        )
+        self.assertEqual(Comment.objects.filter(post=hot).count(), 40)
+        self.assertEqual(max(Comment.objects.values_list("depth", flat=True)), 2)
+        self.assertEqual(Post.objects.get(pk=hot.pk).comment_count, 40)
+
+        results = run_scenarios(hot, ["home_page_1", "hot_post_detail", "search_page"], repeat=1)
+        self.assertEqual(set(results["home_page_1"]), {"queries", "ms", "peak_kib"})
+        self.assertEqual(compare(results, results), [])
+
+        slower = {"home_page_1": {**results["home_page_1"], "queries": results["home_page_1"]["queries"] + 1}}
+        self.assertEqual(len(compare(slower, results)), 1)
+
+
+class ReplicaRouterTests(SimpleTestCase):
+
+    def test_weighted_cycle_interleaves_replicas(self):
+        order = weighted_cycle({"replica1": 2, "replica2": 1})
+        self.assertEqual(
+            list(itertools.islice(order, 6)),
+            ["replica1", "replica2", "replica1", "replica1", "replica2", "replica1"],
+        )
+
+    def test_reads_leave_the_replicas_after_a_write(self):
+        router = ReplicaRouter(replicas={"replica1": 1, "replica2": 1})
+        token = routing_state.set(RoutingState())
+        try:
+            self.assertEqual([router.db_for_read(Post) for _ in range(3)], ["replica1", "replica2", "replica1"])
+            with use_primary():
+                self.assertEqual(router.db_for_read(Post), "default")
+            self.assertIsNone(router.db_for_read(Token))
+
+            self.assertEqual(router.db_for_write(Comment), "default")
+            self.assertEqual(router.db_for_read(Post), "default")
+            self.assertFalse(router.allow_migrate("replica1", "base"))
+        finally:
+            routing_state.reset(token)
+
+
+class ReplicaRoutingTests(TestCase):
+
+    @override_settings(DATABASE_REPLICAS={"replica1": 1}, REPLICA_STICKY_SECONDS=5)
+    def test_writing_pins_the_client_to_the_primary(self):
+        author = User.objects.create_user(username="writer", email="writer@example.com", role="author")
+        post = Post.objects.create(title="Sticky", content="", author=author, status="published")
+        self.client.force_login(author)
+
+        response = self.client.get(reverse("post_detail", args=[post.pk]))
+        self.assertNotIn(PRIMARY_COOKIE, response.cookies)
+
+        response = self.client.post(reverse("post_detail", args=[post.pk]), {"comment": "Hello"})
+        self.assertEqual(response.cookies[PRIMARY_COOKIE]["max-age"], 5)
+
+
+# ======================================================
+# Lean API serializers
+# ======================================================
+class ApiSerializerTests(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="author", email="author@example.com", role="author")
+        cls.tag = Tag.objects.create(name="Django")
+        cls.category = Category.objects.create(name="Web")
+        for i in range(3):
+            post = Post.objects.create(title=f"Post {i}", content="x" * 500, author=cls.author, status="published")
+            post.tags.add(cls.tag)
+            post.categories.add(cls.category)
+        cls.auth = {"HTTP_AUTHORIZATION": f"Token {Token.objects.create(user=cls.author).key}"}
+
+    def test_list_nests_summaries_without_per_post_queries(self):
+        # Token, user, page, categories, tags
+        with self.assertQueryBudget(5):
+            results = self.client.get(reverse("api-posts-list"), **self.auth).json()["results"]
+
+        post = results[0]
+        self.assertNotIn("content", post)
+        self.assertEqual(len(post["excerpt"]), 200)
+        self.assertEqual(post["author"], {"id": self.author.pk, "username": "author", "profile_picture": None})
+        self.assertEqual(post["tags"], [{"id": self.tag.pk, "name": "Django", "slug": "django"}])
+
+    def test_sparse_fieldsets(self):
+        url = reverse("api-posts-list") + "?fields=id,title"
+        results = self.client.get(url, **self.auth).json()["results"]
+        self.assertEqual(set(results[0]), {"id", "title"})
+
+    def test_renaming_a_tag_changes_the_etag(self):
+        url = reverse("api-posts-list")
+        etag = self.client.get(url, **self.auth)["ETag"]
+
+        self.tag.name = "Python"
+        self.tag.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["tags"][0]["name"], "Python")
+
+    def test_users_never_expose_passwords(self):
+        self.assertEqual(
+            set(UserSerializer(self.author).data), {"id", "username", "email", "role", "bio", "profile_picture"}
+        )
+
+
+# ======================================================
+# Fast JSON list path
+# Must stay byte for byte identical to the serializers.
+# ======================================================
+@override_settings(API_FAST_JSON=True)
+class FastJsonTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="author", email="author@example.com", role="author")
+        # A stored name only: no file to render variants from
+        User.objects.filter(pk=cls.author.pk).update(profile_picture="profile_pics/author.png")
+        cls.author.refresh_from_db()
+        tags = [Tag.objects.create(name=name) for name in ("Zeta", "Alpha", "Ünïcode")]
+        category = Category.objects.create(name="Web")
+        tricky = 'Quotes " and \\ slashes,   separators  , control \x01\t\n, emoji 🚀, ' + "ü" * 300
+        for i in range(3):
+            post = Post.objects.create(title=f"Post {i} {tricky[:40]}", content=tricky, author=cls.author, status="published")
+            post.tags.add(*reversed(tags))
+            post.categories.add(category)
+            Comment.objects.create(post=post, author=cls.author, content=tricky)
+        cls.headers = {"Authorization": f"Token {Token.objects.create(user=cls.author).key}"}
+
+    def both(self, url):
+        fast = self.client.get(url, headers=self.headers)
+        with override_settings(API_FAST_JSON=False):
+            slow = self.client.get(url, headers=self.headers)
+        self.assertEqual(fast.status_code, 200)
+        return fast, slow
+
+    def test_post_list_matches_the_serializer(self):
+        for query in ("", "?fields=id,tags,author,last_activity", "?fields=title"):
+            fast, slow = self.both(reverse("api-posts-list") + query)
+            self.assertEqual(fast.content, slow.content)
+            self.assertEqual(fast["ETag"], slow["ETag"])
+
+    def test_comment_list_matches_the_serializer(self):
+        for query in ("", "?fields=id,content,created_date"):
+            fast, slow = self.both(reverse("api-comments-list") + query)
+            self.assertEqual(fast.content, slow.content)
+
+    async def test_async_post_list_matches_the_sync_viewset(self):
+        url = reverse("api-posts-list")
+        sync_response = await sync_to_async(self.client.get)(url, headers=self.headers)
+        async_response = await self.async_client.get(reverse("async-api-posts-list"), headers=self.headers)
+        self.assertEqual(async_response.content, sync_response.content)
+
+    def test_fast_responses_keep_drf_headers(self):
+        for url in (reverse("api-posts-list"), reverse("api-comments-list")):
+            fast, slow = self.both(url)
+            self.assertEqual((fast["Allow"], fast["Vary"]), (slow["Allow"], slow["Vary"]))
+        self.assertEqual(fastjson.json_response([], "GET, HEAD")["Vary"], "Accept")
+
+    def test_stdlib_json_matches_orjson(self):
+        _, slow = self.both(reverse("api-posts-list"))
+        with mock.patch.object(fastjson, "orjson", None):
+            stdlib, _ = self.both(reverse("api-posts-list"))
+        self.assertEqual(stdlib.content, slow.content)
+        self.assertEqual(fastjson.dumps({"line": "\u2028", "float": 1.5}), b'{"line":"\\u2028","float":1.5}')
+
+    def test_browsable_api_uses_the_serializer(self):
+        response = self.client.get(reverse("api-posts-list"), headers={**self.headers, "Accept": "application/json; indent=2"})
+        self.assertIn(b'\n  "results"', response.content)
+
+
+# ======================================================
+# Cached token authentication
+# A transaction test: tokens read inside a transaction
+# are never cached.
+# ======================================================
+class TokenCacheTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="reader", email="reader@example.com", password="pass")
+        self.token = Token.objects.create(user=self.user)
+
+    def get(self, key=None):
+        return self.client.get(reverse("api-comments-list"), headers={"Authorization": f"Token {key or self.token.key}"})
+
+    def test_repeat_calls_skip_the_token_lookup(self):
+        with self.assertNumQueries(3):  # token + user, summary, comments
+            self.get()
+        with self.assertNumQueries(2):
+            self.assertEqual(self.get().status_code, 200)
+
+    def test_logout_revokes_the_token(self):
+        self.get()
+        self.assertIsNotNone(cache.get(token_cache_key(self.token.key)))
+        response = self.client.post(reverse("api-logout"), headers={"Authorization": f"Token {self.token.key}"})
+        self.assertEqual(response.status_code, 204)
+        # Deleted from the shared cache, so no worker accepts it any more
+        self.assertIsNone(cache.get(token_cache_key(self.token.key)))
+        self.assertEqual(self.get().status_code, 401)
+
+    def test_every_hit_gets_its_own_user(self):
+        self.get()
+        first, second = cached(self.token.key), cached(self.token.key)
+        self.assertEqual(first.user.pk, self.user.pk)
+        self.assertIsNot(first.user, second.user)
+        self.assertIsNot(first.user._state, second.user._state)
+
+    def test_rotation_replaces_the_token(self):
+        self.get()
+        response = self.client.post(reverse("api-token-rotate"), headers={"Authorization": f"Token {self.token.key}"})
+        new_key = response.json()["token"]
+        self.assertNotEqual(new_key, self.token.key)
+        self.assertEqual(self.get().status_code, 401)
+        self.assertEqual(self.get(new_key).status_code, 200)
+
+    def test_user_changes_drop_cached_tokens(self):
+        self.get()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get().status_code, 401)
+
+    @override_settings(AUTH_TOKEN_TTL=60)
+    def test_expired_tokens_are_replaced_on_login(self):
+        Token.objects.filter(pk=self.token.pk).update(created=timezone.now() - timedelta(minutes=2))
+        self.assertEqual(self.get().json()["detail"], "Token has expired.")
+
+        response = self.client.post(reverse("api-login"), {"username": "reader", "password": "pass"})
+        new_key = response.json()["token"]
+        self.assertNotEqual(new_key, self.token.key)
+        self.assertEqual(self.get(new_key).status_code, 200)
+
+
+# ======================================================
+# Password hashing and auth admission control
+# ======================================================
+class AuthAdmissionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="reader", email="reader@example.com", password="pass")
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, username="reader", password="pass"):
+        return self.client.post(reverse("api-login"), {"username": username, "password": password})
+
+    def test_registration_writes_the_user_once(self):
+        data = {"username": "new", "email": "new@example.com", "password": "s3cret-pass"}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("api-register"), data)
+        self.assertEqual(response.status_code, 201)
+        writes = [q["sql"] for q in queries if q["sql"].startswith(("INSERT INTO \"base_user\"", "UPDATE \"base_user\""))]
+        self.assertEqual(len(writes), 1)
+        self.assertTrue(User.objects.get(username="new").check_password("s3cret-pass"))
+
+    @override_settings(AUTH_RATE_PER_USERNAME=2)
+    def test_failed_logins_are_limited_per_username_and_address(self):
+        self.assertEqual(self.login(password="wrong").status_code, 401)
+        self.assertEqual(self.login(password="wrong").status_code, 401)
+
+        response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "60")
+        self.assertEqual(self.login("someone-else").status_code, 401)
+        # Failures from one address don't lock the user out elsewhere
+        response = self.client.post(
+            reverse("api-login"), {"username": "reader", "password": "pass"}, REMOTE_ADDR="10.0.0.2"
+        )
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(AUTH_RATE_PER_USERNAME=2)
+    def test_successful_logins_are_not_limited_per_username(self):
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, 200)
+
+    @override_settings(AUTH_RATE_PER_IP=2, AUTH_CLIENT_IP_HEADER="HTTP_X_FORWARDED_FOR", AUTH_TRUSTED_PROXIES=1)
+    def test_addresses_come_from_the_trusted_proxy_header(self):
+        def login(forwarded_for):
+            return self.client.post(
+                reverse("api-login"), {"username": "reader", "password": "pass"}, HTTP_X_FORWARDED_FOR=forwarded_for
+            )
+
+        self.assertEqual(login("1.1.1.1").status_code, 200)
+        # A client-supplied entry in front of the proxy's doesn't count
+        self.assertEqual(login("9.9.9.9, 1.1.1.1").status_code, 200)
+        self.assertEqual(login("1.1.1.1").status_code, 429)
+        self.assertEqual(login("2.2.2.2").status_code, 200)
+
+    def test_failed_logins_send_user_login_failed(self):
+        failures = []
+        handler = lambda sender, credentials, **kwargs: failures.append(credentials["username"])
+        user_login_failed.connect(handler)
+        self.addCleanup(user_login_failed.disconnect, handler)
+        self.login(password="wrong")
+        self.assertEqual(failures, ["reader"])
+
+    @override_settings(AUTH_RATE_PER_IP=1)
+    def test_web_login_is_limited_per_address(self):
+        self.client.post(reverse("login"), {"username": "reader", "password": "wrong"})
+        response = self.client.post(reverse("login"), {"username": "reader", "password": "pass"})
+        self.assertEqual(response.status_code, 429)
+
+    def test_a_full_pool_sheds_work(self):
+        pool = HashingPool(workers=1, queue=0)
+        release = threading.Event()
+        busy = pool.submit(release.wait)
+        with self.assertRaises(Overloaded):
+            pool.submit(len, "")
+        release.set()
+        busy.result()
+        self.assertEqual(pool.run(len, "ok"), 2)
+
+    async def test_async_login_matches_the_api(self):
+        response = await self.async_client.post(
+            reverse("async-api-login"), {"username": "reader", "password": "pass"}, content_type="application/json"
+        )
+        token = await sync_to_async(Token.objects.get)(user=self.user)
+        self.assertEqual(response.json(), {"message": "Login successful", "token": token.key})
+
+
+# ======================================================
+# Avatar pipeline
+# ======================================================
+@override_settings(JOBS_EAGER=True)
+class AvatarPipelineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="author", email="author@example.com", role="author")
+        Post.objects.create(title="Hello", content="Body", author=cls.user, status="published")
+
+    def setUp(self):
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        initials_avatar.cache_clear()
+
+    def upload(self):
+        exif = Image.Exif()
+        exif[0x010F] = "Camera maker"
+        buffer = io.BytesIO()
+        Image.new("RGB", (1200, 800), "red").save(buffer, "JPEG", exif=exif)
+        self.client.force_login(self.user)
+        picture = SimpleUploadedFile("me.jpg", buffer.getvalue(), content_type="image/jpeg")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("profile_edit"), {
+                "username": "author", "email": "author@example.com", "bio": "", "profile_picture": picture,
+            })
+        self.user.refresh_from_db()
+
+    def test_upload_renders_stripped_square_variants(self):
+        self.upload()
+        variants = self.user.avatar_variants
+        self.assertEqual(variants["source"], self.user.profile_picture.name)
+        for extension in ("webp", "jpeg"):
+            self.assertEqual(list(variants[extension]), [str(size) for size in AVATAR_SIZES])
+            for size, name in variants[extension].items():
+                with self.user.profile_picture.storage.open(name) as file, Image.open(file) as image:
+                    self.assertEqual(image.size, (int(size), int(size)))
+                    self.assertFalse(image.getexif())
+
+    def test_feed_cards_use_srcset_and_immutable_urls(self):
+        self.upload()
+        response = self.client.get(reverse("home"))
+        small = self.user.avatar_variants["webp"]["40"]
+        self.assertContains(response, f'srcset="/media/{small} 40w')
+        self.assertNotContains(response, self.user.profile_picture.url)
+
+        file = self.client.get(f"/media/{small}")
+        self.assertEqual(file["Cache-Control"], "public, max-age=31536000, immutable")
+
+    def test_users_without_pictures_get_local_initials(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("home"))
+        self.assertNotContains(response, "ui-avatars.com")
+
+        name = initials_avatar("author")
+        self.assertContains(response, f'src="/media/{name}"')
+        svg = self.client.get(f"/media/{name}")
+        self.assertEqual(svg["Content-Type"], "image/svg+xml")
+        self.assertIn(b">AU</text>", b"".join(svg.streaming_content))
+        self.assertEqual(svg["Cache-Control"], "public, max-age=31536000, immutable")
+
+    def test_initials(self):
+        self.assertEqual(initials("jane_doe"), "JD")
+        self.assertEqual(initials("Ünïcode"), "ÜN")
+
+
+# ======================================================
+# Static asset pipeline
+# ======================================================
+class StaticPipelineTests(SimpleTestCase):
+
+    def setUp(self):
+        source, root = tempfile.TemporaryDirectory(), tempfile.TemporaryDirectory()
+        self.addCleanup(source.cleanup)
+        self.addCleanup(root.cleanup)
+        os.makedirs(os.path.join(source.name, "css"))
+        with open(os.path.join(source.name, "css", "site.css"), "w") as file:
+            file.write(".card { margin: 0 auto; padding: 1rem; }\n" * 200)
+
+        self.enterContext(override_settings(
+            STATICFILES_DIRS=[source.name], STATIC_ROOT=root.name,
+            STORAGES={
+                "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+                "staticfiles": {"BACKEND": "base.staticfiles.CompressedManifestStaticFilesStorage"},
+            },
+        ))
+        call_command("collectstatic", interactive=False, verbosity=0)
+        staticfiles.found.clear()
+        self.url = static_url("css/site.css")
+
+    def test_hashed_files_are_served_precompressed_for_a_year(self):
+        self.assertRegex(self.url, r"^/static/css/site\.[0-9a-f]{12}\.css$")
+        response = self.client.get(self.url, headers={"Accept-Encoding": "gzip, deflate"})
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Cache-Control"], "public, max-age=31536000, immutable")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        body = b"".join(response.streaming_content)
+        self.assertLess(len(body), 1000)
+
+        plain = self.client.get(self.url)
+        self.assertNotIn("Content-Encoding", plain)
+        self.assertEqual(b"".join(plain.streaming_content), gzip.decompress(body))
+
+    def test_refused_encodings_are_not_sent(self):
+        for header in ("gzip;q=0", "gzip; q=0.0, deflate", "*;q=0", "identity"):
+            response = self.client.get(self.url, headers={"Accept-Encoding": header})
+            self.assertNotIn("Content-Encoding", response, header)
+        response = self.client.get(self.url, headers={"Accept-Encoding": "br;q=0, *;q=0.5"})
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+    def test_hashed_names_are_built_once_per_manifest(self):
+        names = staticfiles.hashed_names()
+        self.assertIs(staticfiles.hashed_names(), names)
+        self.assertIn(self.url.removeprefix("/static/"), names)
+
+    def test_revalidation_and_unhashed_names(self):
+        modified = self.client.get(self.url)["Last-Modified"]
+        self.assertEqual(self.client.get(self.url, headers={"If-Modified-Since": modified}).status_code, 304)
+        self.assertEqual(self.client.get("/static/css/site.css")["Cache-Control"], "public, max-age=60")
+        self.assertEqual(self.client.get("/static/../manage.py").status_code, 404)
+
+
+# ======================================================
+# Background jobs
+# ======================================================
+@override_settings(JOBS_EAGER=False)
+class JobQueueTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="author", email="author@example.com", role="author")
+
+    def register(self, fn, **options):
+        task(**options)(fn)
+        self.addCleanup(TASKS.pop, fn.__name__)
+
+    def test_post_indexing_waits_for_the_worker(self):
+        post = Post.objects.create(title="Zebra crossing", content="Body", author=self.author, status="published")
+        post.title = "Zebra crossings"
+        post.save()
+        self.assertEqual(Job.objects.filter(task="index_posts").count(), 1)
+        self.assertEqual(list(search_posts(Post.objects.all(), "zebra")), [])
+
+        out = io.StringIO()
+        call_command("run_jobs", "--once", stdout=out)
+        self.assertIn("Ran 1 jobs, 0 failed.", out.getvalue())
+        self.assertEqual(list(search_posts(Post.objects.all(), "zebra")), [post])
+        self.assertFalse(Job.objects.exists())
+
+    def test_failures_back_off_then_stop(self):
+        def flaky():
+            raise RuntimeError("backend down")
+        self.register(flaky, retries=1, backoff=60)
+
+        enqueue("flaky")
+        self.assertFalse(run_job(claim()))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=29))
+        self.assertIn("backend down", job.last_error)
+        self.assertIsNone(claim())
+
+        Job.objects.update(run_at=timezone.now())
+        self.assertFalse(run_job(claim()))
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+    def test_concurrency_limits_and_expired_leases(self):
+        self.register(len, concurrency=1)
+        first, second = enqueue("len", "a"), enqueue("len", "b")
+
+        self.assertEqual(claim().pk, first.pk)
+        self.assertIsNone(claim())
+
+        # The first worker died: its lease runs out and the job is claimed again
+        Job.objects.filter(pk=first.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(claim().pk, first.pk)
+        self.assertEqual(Job.objects.get(pk=first.pk).attempts, 2)
+        self.assertTrue(Job.objects.filter(pk=second.pk, status=Job.PENDING).exists())
+
+
+# ======================================================
+# Post editing
+# ======================================================
+class PostEditTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="author", email="author@example.com", password="pass", role="author"
+        )
+        cls.news, cls.misc = Category.objects.create(name="News"), Category.objects.create(name="Misc")
+        cls.red, cls.blue, cls.green = (Tag.objects.create(name=name) for name in ("Red", "Blue", "Green"))
+        cls.post = Post.objects.create(title="Old", content="Body", author=cls.author, status="published")
+        cls.post.categories.set([cls.news])
+        cls.post.tags.set([cls.red, cls.blue])
+        cls.auth = {"HTTP_AUTHORIZATION": f"Token {Token.objects.create(user=cls.author).key}"}
+
+    def edit(self, **changes):
+        form = {
+            "title": "Old", "content": "Body", "status": "published",
+            "categories": [self.news.pk], "tags": [self.red.pk, self.blue.pk],
+            **changes,
+        }
+        self.client.force_login(self.author)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse("post_edit", args=[self.post.pk]), form)
+        return [
+            q["sql"] for q in queries
+            if q["sql"].startswith(("UPDATE", "INSERT", "DELETE")) and '"base_post' in q["sql"]
+        ]
+
+    def post_updates(self, writes):
+        return [sql for sql in writes if sql.startswith('UPDATE "base_post" ')]
+
+    def test_title_edit_writes_only_the_title(self):
+        writes = self.edit(title="New")
+        self.assertEqual(len(writes), 1)
+        self.assertIn('SET "title"', writes[0])
+        self.assertNotIn('"content"', writes[0])
+        self.assertEqual(Post.objects.get(pk=self.post.pk).title, "New")
+
+    def test_unchanged_form_writes_nothing(self):
+        self.assertEqual(self.edit(), [])
+
+    def test_tag_edit_writes_only_the_difference(self):
+        before = Post.objects.get(pk=self.post.pk).updated_at
+        writes = self.edit(tags=[self.blue.pk, self.green.pk])
+        link_writes = [sql for sql in writes if '"base_post_tags"' in sql]
+        self.assertEqual([sql.split()[0] for sql in link_writes], ["DELETE", "INSERT"])
+        self.assertFalse(any('"base_post_categories"' in sql for sql in writes))
+        # The post row is written once, for updated_at alone
+        self.assertEqual(len(self.post_updates(writes)), 1)
+        self.assertEqual(len(writes), 3)
+        self.assertEqual(set(self.post.tags.values_list("name", flat=True)), {"Blue", "Green"})
+        self.assertGreater(Post.objects.get(pk=self.post.pk).updated_at, before)
+
+    def test_link_edits_still_reach_search_and_caches(self):
+        self.edit(categories=[self.news.pk, self.misc.pk])
+        self.assertEqual(list(search_posts(Post.objects.all(), "misc")), [self.post])
+
+    def test_patch_is_a_partial_update(self):
+        url = reverse("api-posts-detail", args=[self.post.pk])
+        response = self.client.patch(url, {"title": "Patched"}, content_type="application/json", **self.auth)
+        self.assertEqual(response.status_code, 200)
+
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual((post.title, post.content), ("Patched", "Body"))
+        self.assertEqual(set(post.tags.values_list("name", flat=True)), {"Red", "Blue"})
+
+        # PUT still needs every required field
+        response = self.client.put(url, {"title": "Put"}, content_type="application/json", **self.auth)
+        self.assertEqual(response.status_code, 400)
+
+    def test_comments_take_partial_updates_too(self):
+        comment = Comment.objects.create(post=self.post, author=self.author, content="Before")
+        url = reverse("api-comments-detail", args=[comment.pk])
+        response = self.client.patch(url, {"content": "After"}, content_type="application/json", **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Comment.objects.get(pk=comment.pk).content, "After")
+
+
+# ======================================================
+# Database profiles
+# ======================================================
+class DatabaseProfileTests(SimpleTestCase):
+
+    def profile(self, name, **env):
+        settings_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), "blog_platform", "settings.py")
+        with mock.patch.dict(os.environ, {"BLOG_DB_PROFILE": name, **env}):
+            return runpy.run_path(settings_file)["DATABASES"]["default"]
+
+    def test_sqlite_wal_applies_its_pragmas(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        database = self.profile("sqlite-wal", BLOG_DB_NAME=os.path.join(scratch.name, "wal.sqlite3"))
+        self.assertEqual(database["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+
+        wal = ConnectionHandler({"default": {}, "wal": database})["wal"]
+        self.addCleanup(wal.close)
+        with wal.cursor() as cursor:
+            pragmas = {}
+            for pragma in ("journal_mode", "synchronous", "temp_store", "cache_size"):
+                cursor.execute(f"PRAGMA {pragma}")
+                pragmas[pragma] = cursor.fetchone()[0]
+        # synchronous NORMAL is 1, temp_store MEMORY is 2
+        self.assertEqual(pragmas, {"journal_mode": "wal", "synchronous": 1, "temp_store": 2, "cache_size": -65536})
+
+    def test_postgres_pool_sets_the_pool_options(self):
+        database = self.profile("postgres-pool", BLOG_DB_POOL_MIN="3", BLOG_DB_POOL_MAX="7")
+        self.assertEqual(database["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(database["OPTIONS"]["pool"], {"min_size": 3, "max_size": 7})
+        # A pool replaces persistent connections; Django refuses both
+        self.assertNotIn("CONN_MAX_AGE", database)
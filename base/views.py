@@ -1,15 +1,39 @@
+import os
+
+from django.conf import settings
+from django.core.cache import cache
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth import authenticate, login, logout
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.hashers import make_password
 from django.core.paginator import Paginator
-from django.db.models import Q
-from django.http import HttpResponseForbidden
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.static import serve
 
+from .avatars import AVATAR_DIR
 from .models import User, Post, Comment, Category, Tag
+from .pagination import KeysetPaginator, InvalidCursor
+from .search import search_page
+from .counters import create_comment, delete_comment
+from .editing import edit_post
+from .caching import (
+    version_key, get_versions, fragment_key,
+    attach_card_versions, cache_page_on_version, recently_bumped,
+)
+from .routers import use_primary
+from .passwords import Overloaded, admit, authenticate_user, hash_password
+from .queries import feed_posts, dashboard_posts, post_comments, load_threads
+from . import metrics
 # Create your views here.
 
 
+def overloaded(request, template, error):
+    response = render(request, template, {"error": str(error)}, status=429)
+    response["Retry-After"] = str(error.retry_after)
+    return response
+
+
 # ======================================================
 # REGISTER USER (Author or Reader)
 # ======================================================
@@ -28,6 +52,11 @@ def register_view(request):
 
         error_message = ""
 
+        try:
+            admit(request)
+        except Overloaded as error:
+            return overloaded(request, "register.html", error)
+
         # Required field checks
         if not username:
             error_message += "Username required. "
@@ -50,10 +79,14 @@ def register_view(request):
 
         # Create user if no validation errors
         if not error_message:
+            try:
+                password = hash_password(password)
+            except Overloaded as error:
+                return overloaded(request, "register.html", error)
             User.objects.create(
                 username=username,
                 email=email,
-                password=make_password(password),
+                password=password,
                 role=role,
                 profile_picture=image
             )
@@ -85,7 +118,11 @@ def login_view(request):
         if not password: error_message += "Password required. "
         
         # Try authenticating the user
-        user = authenticate(username=username, password=password)
+        try:
+            admit(request, username)
+            user = authenticate_user(request, username, password)
+        except Overloaded as error:
+            return overloaded(request, "login.html", error)
         
         # Invalid credentials
         if user is None and not error_message:
@@ -120,32 +157,35 @@ def logout_view(request):
 # HOME VIEW — LIST OF PUBLISHED POSTS WITH SEARCH & PAGINATION
 # ======================================================
 @login_required(login_url="login")
+@cache_page_on_version(version_key("feed"))
 def home(request):
     """
     Display all published blog posts.
-    Supports search by title, content, or author.
-    Includes pagination (5 posts per page).
+    Supports full-text search by title, content, author or category.
+    Includes cursor pagination (5 posts per page).
+    Whole pages are cached until any post on the feed changes,
+    and each card is cached per post and author version.
     """
-    posts = Post.objects.filter(status="published").order_by("-publication_date")
+    posts = feed_posts()
     
-    # Search filter
+    # Full-text search: best matches first, paged by result offset
     search = request.GET.get("search")
     if search:
-        posts = posts.filter(
-            Q(title__icontains=search) |
-            Q(content__icontains=search) |
-            Q(author__username__icontains=search)
-        )
-    
-    # Paginate results
-    paginator = Paginator(posts, 5)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+        page_obj = search_page(posts, search, 5, request.GET.get("cursor"))
+
+    # Otherwise paginate results by (publication_date, id) cursor
+    else:
+        paginator = KeysetPaginator(posts, 5)
+        try:
+            page_obj = paginator.get_page(request.GET.get("cursor"))
+        except InvalidCursor:
+            page_obj = paginator.get_page()
+        attach_card_versions(page_obj.object_list)
 
     return render(request, "home.html", {
-        "posts": posts,
         "page_obj": page_obj,
         "search": search,
+        "cache_timeout": settings.CACHE_TIMEOUT,
     })
 
 
@@ -163,34 +203,46 @@ def post_detail(request, pk):
     """
     post = get_object_or_404(Post, id=pk)
 
-    # Get comments (only top-level)
-    comments_list = Comment.objects.filter(
-        post=post,
-        parent_comment=None
-    ).order_by("-created_date")
-
-    # Pagination for comments (5 per page)
-    paginator = Paginator(comments_list, 5)
-    page_number = request.GET.get("cpage")
-    comments = paginator.get_page(page_number)
-
     # Add new comment and reply
     if request.method == "POST":
         content = request.POST.get("comment")
         parent_id = request.POST.get("parent_id")
 
         if content:
-            Comment.objects.create(
+            create_comment(
                 post=post,
                 author=request.user,
                 content=content,
-                parent_comment_id=parent_id
+                parent_comment_id=parent_id or None
             )
             return redirect("post_detail", pk=pk)
 
+    # The comment section is cached per thread version and page
+    page_number = request.GET.get("cpage")
+    thread_version_key = version_key("thread", post.pk)
+    thread_version = get_versions(thread_version_key)[thread_version_key]
+    thread_key = fragment_key("thread", post.pk, thread_version, page_number)
+    thread_html = cache.get(thread_key)
+
+    if thread_html is None:
+        # Fresh versions are filled from the primary, ahead of replica lag
+        with use_primary(recently_bumped({thread_version_key: thread_version})):
+            # Get comments (only top-level)
+            comments_list = post_comments(post)
+
+            # Pagination for comments (5 per page)
+            paginator = Paginator(comments_list, 5)
+            comments = paginator.get_page(page_number)
+
+            # Load the full reply tree of this page in one query
+            comments.object_list = load_threads(comments.object_list)
+
+            thread_html = render_to_string("comment_thread.html", {"comments": comments})
+            cache.set(thread_key, thread_html, settings.CACHE_TIMEOUT)
+
     return render(request, "post_detail.html", {
         "post": post,
-        "comments": comments,   # Paginated comments
+        "thread_html": mark_safe(thread_html),   # Paginated comments, pre-rendered
     })
 
 
@@ -208,7 +260,7 @@ def dashboard(request):
     if request.user.role != "author":
         return redirect("home")
 
-    posts = Post.objects.filter(author=request.user).order_by("-publication_date")
+    posts = dashboard_posts(request.user)
     
     #paginate author post 
     paginator = Paginator(posts, 6)
@@ -286,17 +338,17 @@ def post_edit(request, pk):
 
     # Handle from submission
     if request.method == "POST":
-        # Update basic post fields
-        post.title = request.POST.get("title")
-        post.content = request.POST.get("content")
-        post.status = request.POST.get("status") or "draft"
-        
-        # Update many-to-many relationships
-        post.categories.set(request.POST.getlist("categories"))
-        post.tags.set(request.POST.getlist("tags"))
-        
-        # Save updated post back to the database
-        post.save()
+        # One transaction, writing only the changed fields and links
+        edit_post(
+            post,
+            {
+                "title": request.POST.get("title"),
+                "content": request.POST.get("content"),
+                "status": request.POST.get("status") or "draft",
+            },
+            categories=request.POST.getlist("categories"),
+            tags=request.POST.getlist("tags"),
+        )
         return redirect("dashboard")
 
     # Get categories and tags for the edit forms
@@ -410,10 +462,10 @@ def comment_delete_view(request, pk):
     if request.user != comment.author:
         return HttpResponseForbidden("You cannot delete this comment.")
 
-    post_id = comment.post.id
+    post_id = comment.post_id
 
-    #  Delete the comment
-    comment.delete()
+    #  Delete the comment with its replies and update the post counters
+    delete_comment(comment)
 
     return redirect("post_detail", pk=post_id)
 
@@ -438,12 +490,37 @@ def profile_edit_view(request):
         user.bio = request.POST.get("bio")
 
         #update profile picture if a new one is uploaded 
+        changed = ["username", "email", "bio"]
         if request.FILES.get("profile_picture"):
             user.profile_picture = request.FILES.get("profile_picture")
+            changed.append("profile_picture")
 
-        user.save()
+        user.save(update_fields=changed)
         #Render the page with a success message
         return render(request, "profile_edit.html", {"user": user, "success": "Profile updated!"})
 
     return render(request, "profile_edit.html", {"user": user})
 
+
+# ======================================================
+# AVATAR FILES
+# Named by content hash, so they never change: served in
+# every mode and cached by browsers and proxies for good.
+# ======================================================
+def avatar_file(request, name):
+    response = serve(request, name, document_root=os.path.join(settings.MEDIA_ROOT, AVATAR_DIR))
+    response["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
+# ======================================================
+# METRICS (Prometheus)
+# ======================================================
+def metrics_view(request):
+    """
+    Per-view request histograms in the Prometheus text format.
+    Open to staff and to scrapers at INTERNAL_IPS.
+    """
+    if not (request.user.is_staff or request.META.get("REMOTE_ADDR") in settings.INTERNAL_IPS):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.exposition(), content_type="text/plain; version=0.0.4; charset=utf-8")
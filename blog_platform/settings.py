@@ -10,20 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-# STATIC FILES
-STATIC_URL = '/static/'
-
-STATICFILES_DIRS = [
-    BASE_DIR / "static",      # Where your development static files are
-]
-
-STATIC_ROOT = BASE_DIR / "staticfiles"   # Where files will be collected in production
-
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
@@ -35,6 +27,9 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+# Addresses allowed to scrape /metrics without signing in
+INTERNAL_IPS = os.environ.get('BLOG_METRICS_IPS', '127.0.0.1').split(',')
+
 
 # Application definition
 
@@ -56,14 +51,50 @@ INSTALLED_APPS = [
 ]
 AUTH_USER_MODEL = 'base.User'
 
+# ModelBackend with password hashing on the bounded pool
+AUTHENTICATION_BACKENDS = ['base.passwords.PooledModelBackend']
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'base.authentication.CachedTokenAuthentication',
     ]
 }
 
+# API tokens expire BLOG_TOKEN_TTL seconds after they are issued (0: never);
+# logging in again issues a new one
+AUTH_TOKEN_TTL = int(os.environ.get('BLOG_TOKEN_TTL', 14 * 24 * 3600))
+
+# Resolved tokens are kept in the shared cache for up to this many seconds.
+# Logout, rotation and user changes delete them at once, for every worker
+AUTH_TOKEN_CACHE_SECONDS = int(os.environ.get('BLOG_TOKEN_CACHE_SECONDS', 300))
+
+# BLOG_API_FAST_JSON=1 renders list endpoints straight from .values()
+# rows (base.fastjson) instead of through the serializers
+API_FAST_JSON = os.environ.get('BLOG_API_FAST_JSON', '0') == '1'
+
+# Password hashing runs on BLOG_PASSWORD_WORKERS threads with up to
+# BLOG_PASSWORD_QUEUE requests waiting; beyond that, logins answer 429
+PASSWORD_WORKERS = int(os.environ.get('BLOG_PASSWORD_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+PASSWORD_QUEUE = int(os.environ.get('BLOG_PASSWORD_QUEUE', 16))
+
+# Login and registration attempts allowed per client address, and failed
+# logins allowed per username from one address, in each AUTH_RATE_WINDOW
+# seconds (0: unlimited)
+AUTH_RATE_WINDOW = int(os.environ.get('BLOG_AUTH_RATE_WINDOW', 60))
+AUTH_RATE_PER_IP = int(os.environ.get('BLOG_AUTH_RATE_PER_IP', 30))
+AUTH_RATE_PER_USERNAME = int(os.environ.get('BLOG_AUTH_RATE_PER_USERNAME', 10))
+
+# Behind a reverse proxy, the META header holding the client address
+# (e.g. HTTP_X_FORWARDED_FOR) and how many proxies append to it; empty
+# uses REMOTE_ADDR. Only set this when the proxy overwrites the header.
+AUTH_CLIENT_IP_HEADER = os.environ.get('BLOG_CLIENT_IP_HEADER', '')
+AUTH_TRUSTED_PROXIES = int(os.environ.get('BLOG_TRUSTED_PROXIES', 1))
+
 MIDDLEWARE = [
+    'base.middleware.static_files_middleware',
+    'base.middleware.metrics_middleware',
     'django.middleware.security.SecurityMiddleware',
+    'base.middleware.sticky_primary_middleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -76,7 +107,7 @@ ROOT_URLCONF = 'blog_platform.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'base.metrics.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'], 
         'APP_DIRS': True,
         'OPTIONS': {
@@ -95,14 +126,135 @@ WSGI_APPLICATION = 'blog_platform.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# BLOG_DB_PROFILE selects "sqlite" (default), "sqlite-wal", "postgres"
+# or "postgres-pool".
+# "sqlite-wal" is for single-node deployments: readers no longer wait
+# for the writer, and writers take the lock when their transaction
+# starts instead of failing halfway through.
+# "postgres" keeps each connection open for BLOG_DB_CONN_MAX_AGE seconds;
+# "postgres-pool" shares a psycopg connection pool per process instead.
+
+SQLITE_WAL_PRAGMAS = (
+    'PRAGMA journal_mode=WAL;'
+    'PRAGMA synchronous=NORMAL;'        # fsync at checkpoints, not every commit
+    'PRAGMA mmap_size=268435456;'       # 256 MB
+    'PRAGMA cache_size=-65536;'         # 64 MB
+    'PRAGMA temp_store=MEMORY;'
+)
+
+POSTGRES = {
+    'ENGINE': 'django.db.backends.postgresql',
+    'NAME': os.environ.get('BLOG_DB_NAME', 'blog_platform'),
+    'USER': os.environ.get('BLOG_DB_USER', 'blog_platform'),
+    'PASSWORD': os.environ.get('BLOG_DB_PASSWORD', ''),
+    'HOST': os.environ.get('BLOG_DB_HOST', '127.0.0.1'),
+    'PORT': os.environ.get('BLOG_DB_PORT', '5432'),
+}
 
-DATABASES = {
-    'default': {
+DATABASE_PROFILES = {
+    'sqlite': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'NAME': os.environ.get('BLOG_DB_NAME', BASE_DIR / 'db.sqlite3'),
+    },
+    'sqlite-wal': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('BLOG_DB_NAME', BASE_DIR / 'db.sqlite3'),
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            'init_command': SQLITE_WAL_PRAGMAS,
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+    },
+    'postgres': {
+        **POSTGRES,
+        'CONN_MAX_AGE': int(os.environ.get('BLOG_DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+    },
+    'postgres-pool': {
+        **POSTGRES,
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.environ.get('BLOG_DB_POOL_MIN', 2)),
+                'max_size': int(os.environ.get('BLOG_DB_POOL_MAX', 20)),
+            },
+        },
+    },
 }
 
+DATABASES = {
+    'default': DATABASE_PROFILES[os.environ.get('BLOG_DB_PROFILE', 'sqlite')],
+}
+
+# Read replicas
+# BLOG_DB_REPLICAS lists replica locations, each optionally weighted:
+# SQLite file paths ("replica1.sqlite3@3,replica2.sqlite3") or PostgreSQL
+# hosts ("10.0.0.2,10.0.0.3:5433@2"). Reads of blog content go to the
+# replicas; after writing, a client reads from the primary for
+# BLOG_DB_STICKY_SECONDS so it sees its own changes.
+
+DATABASE_REPLICAS = {}
+
+for number, entry in enumerate(filter(None, os.environ.get('BLOG_DB_REPLICAS', '').split(',')), start=1):
+    location, _, weight = entry.strip().partition('@')
+    replica = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    if replica['ENGINE'].endswith('sqlite3'):
+        replica['NAME'] = location
+    else:
+        replica['HOST'], _, port = location.partition(':')
+        replica['PORT'] = port or replica['PORT']
+    DATABASES[f'replica{number}'] = replica
+    DATABASE_REPLICAS[f'replica{number}'] = int(weight or 1)
+
+DATABASE_ROUTERS = ['base.routers.ReplicaRouter']
+
+# Also how long versioned caches are filled from the primary after a change
+REPLICA_STICKY_SECONDS = int(os.environ.get('BLOG_DB_STICKY_SECONDS', 10))
+
+
+# Cache
+# BLOG_CACHE_BACKEND selects "locmem" (default), "file" or "redis".
+# Any Redis-compatible server works for "redis", e.g. a local valkey.
+# Cache versions are bumped in the cache itself, so every server process
+# must share it: "locmem" is per process and only fits a single worker.
+# BLOG_WEB_WORKERS (or WEB_CONCURRENCY) is the number of server processes;
+# above 1 the system checks refuse a per-process cache (base.checks).
+WEB_WORKERS = int(os.environ.get('BLOG_WEB_WORKERS', os.environ.get('WEB_CONCURRENCY', 1)))
+
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'blog-platform',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('BLOG_CACHE_DIR', BASE_DIR / '.cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('BLOG_CACHE_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[os.environ.get('BLOG_CACHE_BACKEND', 'locmem')],
+}
+
+# Lifetime of cached pages and fragments; edits invalidate them sooner
+CACHE_TIMEOUT = int(os.environ.get('BLOG_CACHE_TIMEOUT', 600))
+
+
+# Background jobs
+# Slow side effects of writes (search indexing, avatar resizing, cache
+# fan-out) are queued in the Job table and run by `manage.py run_jobs`.
+# BLOG_JOBS_EAGER=1 (the default while DEBUG is on) runs them inline.
+JOBS_EAGER = os.environ.get('BLOG_JOBS_EAGER', '1' if DEBUG else '0') == '1'
+
+# A claimed job not finished within this many seconds is run again
+JOBS_LEASE_SECONDS = int(os.environ.get('BLOG_JOBS_LEASE_SECONDS', 300))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -138,17 +290,38 @@ USE_TZ = True
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Changing it gives every generated initials avatar a new colour
+AVATAR_COLOUR_SEED = os.environ.get('BLOG_AVATAR_SEED', '')
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
+# Production build: `npm run build` (minified Tailwind CSS into static/css),
+# then `python manage.py collectstatic`. With DEBUG off, collected files get
+# content-hashed names plus .gz/.br copies (brotli if installed), and
+# base.middleware.static_files_middleware serves them from STATIC_ROOT.
 
-STATIC_URL = 'static/'
+STATIC_URL = '/static/'
+
+STATICFILES_DIRS = [
+    BASE_DIR / "static",      # Where your development static files are
+]
+
+STATIC_ROOT = BASE_DIR / "staticfiles"   # Where files will be collected in production
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'base.staticfiles.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
-
-
-MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
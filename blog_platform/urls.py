@@ -20,8 +20,11 @@ from base.views import (
     logout_view,
     profile_edit_view, 
     comment_edit_view,   
-    comment_delete_view     
+    comment_delete_view,
+    metrics_view,
+    avatar_file,
 )
+from base.avatars import AVATAR_DIR
 
 
 # ----------------------------
@@ -40,6 +43,11 @@ urlpatterns = [
     # ----------------------------
     path('api/', include("base.api_urls")),
 
+    # ----------------------------
+    # ASYNC READ PATH (ASGI)
+    # ----------------------------
+    path('async/', include("base.async_urls")),
+
     # ----------------------------
     # FRONTEND
     # ----------------------------
@@ -68,6 +76,16 @@ urlpatterns = [
     path('comment/<int:pk>/edit/', comment_edit_view, name='comment_edit'),
     path('comment/<int:pk>/delete/', comment_delete_view, name='comment_delete'),
 
+    # ----------------------------
+    # AVATARS (content-hashed, served in production too)
+    # ----------------------------
+    path(f"{settings.MEDIA_URL.strip('/')}/{AVATAR_DIR}/<path:name>", avatar_file, name='avatar_file'),
+
+    # ----------------------------
+    # METRICS (Prometheus scrape target)
+    # ----------------------------
+    path('metrics', metrics_view, name='metrics'),
+
 ]
 
 